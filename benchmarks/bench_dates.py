@@ -0,0 +1,66 @@
+"""Date-column parsing throughput: _parse_date cascade vs _make_date_parser.
+
+Reports cells/second and seconds per million cells for typical column
+shapes (one format per column), before and after the fast-path parser.
+
+Usage:
+    python benchmarks/bench_dates.py [--cells 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from openpyxl.utils.datetime import WINDOWS_EPOCH  # noqa: E402
+
+from dataprocessing import io  # noqa: E402
+
+
+def _column(kind: str, cells: int) -> list[object]:
+    start = dt.date(2000, 1, 3)
+    days = [start + dt.timedelta(days=index % 9000) for index in range(cells)]
+    if kind == "iso text":
+        return [day.isoformat() for day in days]
+    if kind == "slash text":
+        return [day.strftime("%Y/%m/%d") for day in days]
+    if kind == "compact text":
+        return [day.strftime("%Y%m%d") for day in days]
+    if kind == "datetime text":
+        return [day.strftime("%Y/%m/%d 00:00:00") for day in days]
+    if kind == "excel serial":
+        return [(day - WINDOWS_EPOCH.date()).days for day in days]
+    raise ValueError(kind)
+
+
+def _time(parse: object, values: list[object]) -> float:
+    start = time.perf_counter()
+    for value in values:
+        parse(value)  # type: ignore[operator]
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'column':<14} {'before s/M':>11} {'after s/M':>10} {'before cells/s':>15} {'after cells/s':>14} {'speedup':>8}")
+    for kind in ("iso text", "slash text", "compact text", "datetime text", "excel serial"):
+        values = _column(kind, args.cells)
+        before = _time(lambda value: io._parse_date(value, epoch=WINDOWS_EPOCH), values)
+        after = _time(io._make_date_parser(WINDOWS_EPOCH), values)
+        per_million = 1_000_000 / len(values)
+        print(
+            f"{kind:<14} {before * per_million:>11.2f} {after * per_million:>10.2f} "
+            f"{len(values) / before:>15,.0f} {len(values) / after:>14,.0f} {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
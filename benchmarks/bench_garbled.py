@@ -0,0 +1,109 @@
+"""Garbled-text detection throughput on text-heavy columns.
+
+Compares the previous per-character ord() loop with the precompiled-regex
+checks: per cell (_is_garbled_text, with and without the shared-string
+cache) and per column (_find_garbled, one scan over the joined column).
+The last block times end-to-end numeric-text column validation.
+
+Usage:
+    python benchmarks/bench_garbled.py [--cells 1000000] [--distinct 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from dataprocessing import validation  # noqa: E402
+
+
+def _is_garbled_text_loop(text: str) -> bool:
+    if "�" in text:
+        return True
+    for char in text:
+        code_point = ord(char)
+        if code_point < 32 and char not in ("\t", "\n", "\r"):
+            return True
+    return False
+
+
+def _column(cells: int, distinct: int) -> list[str]:
+    rng = random.Random(7)
+    alphabet = "0123456789.,%-abcdefghij市值成交量融资融券收益率 "
+    pool = ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 24))) for _ in range(distinct)]
+    pool[0] += "\x07"
+    pool[1] += "�"
+    return [pool[rng.randrange(distinct)] for _ in range(cells)]
+
+
+def _time(label: str, func: object, baseline: float | None, cells: int) -> float:
+    start = time.perf_counter()
+    func()  # type: ignore[operator]
+    elapsed = time.perf_counter() - start
+    speedup = f"{baseline / elapsed:7.1f}x" if baseline else "      -"
+    print(f"{label:<40} {elapsed:8.3f}s {cells / elapsed:>14,.0f} cells/s {speedup}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=5000, help="distinct shared strings in the column")
+    args = parser.parse_args()
+
+    texts = _column(args.cells, args.distinct)
+    expected = [index for index, text in enumerate(texts) if _is_garbled_text_loop(text)]
+
+    baseline = _time("ord() loop per cell", lambda: [_is_garbled_text_loop(text) for text in texts], None, len(texts))
+
+    search = validation._GARBLED_CHARS.search
+    _time("regex per cell (no cache)", lambda: [search(text) is not None for text in texts], baseline, len(texts))
+    validation._garbled_cache.clear()
+    _time("regex per cell (shared-string cache)", lambda: [validation._is_garbled_text(t) for t in texts], baseline, len(texts))
+
+    chunk = validation.VALIDATION_CHUNK_ROWS
+    found: list[int] = []
+
+    def column_scan() -> None:
+        for start in range(0, len(texts), chunk):
+            found.extend(start + index for index in validation._find_garbled(texts[start : start + chunk]))
+
+    _time(f"_find_garbled column scan ({chunk}/chunk)", column_scan, baseline, len(texts))
+    if sorted(found) != expected:
+        raise SystemExit("mismatch between _find_garbled and the reference loop")
+
+    print()
+    numbers = [f"{index:,}.{index % 97}" for index in range(args.cells)]
+
+    for label, validator, values in (
+        ("numeric-text", validation._coerce_float, numbers),
+        ("free-text", validation._validate_text_or_number, texts),
+    ):
+
+        def validate_before() -> None:
+            original = validation._is_garbled_text
+            validation._is_garbled_text = _is_garbled_text_loop
+            try:
+                for value in values:
+                    try:
+                        validator(value)
+                    except ValueError:
+                        pass
+            finally:
+                validation._is_garbled_text = original
+
+        def validate_after() -> None:
+            for start in range(0, len(values), chunk):
+                validation._validate_column(values[start : start + chunk], validator)
+
+        before = _time(f"{label}: per cell, ord() loop", validate_before, None, len(values))
+        _time(f"{label}: _validate_column", validate_after, before, len(values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Cold-start import cost of the dataprocessing package, the app module, the CLI and the web layer.
+
+Each case runs in a fresh interpreter under ``python -X importtime``. The
+script reports the cumulative import time of everything the case loads
+beyond interpreter startup (best of ``--repeat`` runs) and checks two things:
+
+* the import time stays within the case's budget (scaled by ``--scale``);
+* modules that belong to a lazily imported layer are not loaded, e.g. the
+  numeric modules of the dataprocessing package must not pull in sqlite3,
+  csv or a process pool, and neither the app module nor the CLI may load
+  Flask or openpyxl.
+
+The sources are byte-compiled first so the numbers do not include compiling
+``app.py`` or the package modules (``PYTHONDONTWRITEBYTECODE`` would otherwise
+force that on every run).
+
+Exits non-zero if any check fails, so it doubles as a regression check.
+
+Usage:
+    python benchmarks/bench_import_time.py [--repeat 5] [--scale 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import compileall
+from pathlib import Path
+import subprocess
+import sys
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+_WEB = ("flask", "werkzeug", "jinja2", "web")
+_SPREADSHEETS = ("openpyxl", "pyarrow")
+_POOLS = ("concurrent.futures", "multiprocessing")
+_LIBRARY_IO = ("app", "dataprocessing.io", "sqlite3", "csv", "zipfile", "tempfile")
+# (名称, 导入语句, 预算毫秒数（None 表示只报告）, 不应加载的模块)
+CASES = (
+    ("package", "import dataprocessing", 5.0, (*_WEB, *_SPREADSHEETS, *_POOLS, "app", "dataprocessing.io")),
+    ("numeric", "from dataprocessing import rolling, thermometer", 15.0, (*_WEB, *_SPREADSHEETS, *_POOLS, *_LIBRARY_IO)),
+    ("app", "import app", 60.0, (*_WEB, *_SPREADSHEETS, *_POOLS, "zipfile", "tempfile")),
+    ("cli", "import cli; cli._parse_args(['erp', '--incremental'])", 40.0, (*_WEB, *_SPREADSHEETS, *_POOLS, "app")),
+    ("cli+app", "import cli; import app", 80.0, (*_WEB, *_SPREADSHEETS, *_POOLS)),
+    ("web", "import web", None, _SPREADSHEETS),
+)
+
+
+def _imports(code: str) -> tuple[list[tuple[str, int, int]], set[str]]:
+    # 返回 (顶层导入的 (模块, 层级, 累计微秒) 列表, 全部已加载模块名)。
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    entries: list[tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(cumulative)))
+    return entries, {name for name, _, _ in entries}
+
+
+def _measure(code: str, startup: set[str]) -> tuple[float, set[str]]:
+    entries, loaded = _imports(code)
+    total = sum(cumulative for name, depth, cumulative in entries if depth == 0 and name not in startup)
+    return total / 1000.0, loaded - startup
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = parser.parse_args()
+
+    compileall.compile_dir(str(SRC_DIR), quiet=1, maxlevels=1)
+    _, startup = _imports("pass")
+    failed = False
+
+    print(f"best of {args.repeat} runs, budgets x{args.scale:g}")
+    print(f"{'case':<8} {'import ms':>10} {'budget ms':>10} {'modules':>8}  unexpected")
+    for name, code, budget, forbidden in CASES:
+        runs = [_measure(code, startup) for _ in range(args.repeat)]
+        elapsed_ms = min(ms for ms, _ in runs)
+        loaded = runs[0][1]
+        unexpected = sorted(
+            module for module in loaded if any(module == item or module.startswith(f"{item}.") for item in forbidden)
+        )
+        limit = None if budget is None else budget * args.scale
+        budget_text = "-" if limit is None else f"{limit:.0f}"
+        print(f"{name:<8} {elapsed_ms:>10.1f} {budget_text:>10} {len(loaded):>8}  {', '.join(unexpected) or '-'}")
+        if unexpected or (limit is not None and elapsed_ms > limit):
+            failed = True
+
+    if failed:
+        print("FAILED: an import exceeded its budget or loaded a lazily imported layer")
+        sys.exit(1)
+    print("OK: all imports are within budget and keep the lazy layers unloaded")
+
+
+if __name__ == "__main__":
+    main()
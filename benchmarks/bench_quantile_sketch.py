@@ -0,0 +1,125 @@
+"""Rolling percentiles/median: exact sorted window vs the approximate sliding sketch.
+
+For each window size the script runs both paths over the same random-walk
+series, reports wall time and the number of values each keeps per window,
+and checks the approximate output against the exact one:
+
+* percentile: max |approx - exact| must not exceed the reported bound;
+* median: the rank of the approximate median inside the exact window must
+  be within the reported rank bound of the middle.
+
+Exits non-zero if any check fails, so it doubles as a regression check.
+
+Usage:
+    python benchmarks/bench_quantile_sketch.py [--length 60000] [--windows 250,4000,20000] [--max-error 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+from bisect import bisect_left, bisect_right, insort
+import math
+from pathlib import Path
+import random
+import sys
+import time
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from dataprocessing import rolling  # noqa: E402
+
+
+def _series(length: int, seed: int) -> list[float]:
+    rng = random.Random(seed)
+    value = 0.0
+    out: list[float] = []
+    for _ in range(length):
+        value += rng.gauss(0.0, 1.0)
+        # 少量重复值，覆盖并列排名的分支。
+        out.append(round(value, 1))
+    return out
+
+
+def _check_medians(values: list[float], window: int, max_error: float) -> tuple[float, float]:
+    # 返回 (观测到的最大秩偏差 %, 上界 %)；窗口太短时近似模式本就走精确路径，不检查。
+    if rolling._sketch_parameters(window, max_error) is None:
+        return 0.0, 0.0
+    sketch = rolling._SlidingQuantileSketch(window, max_error)
+    sorted_window: list[float] = []
+    worst = 0.0
+    for index, value in enumerate(values):
+        sketch.add(value)
+        insort(sorted_window, value)
+        if index >= window:
+            sorted_window.pop(bisect_left(sorted_window, values[index - window]))
+        if index < window - 1:
+            continue
+        median = sketch.quantile(0.5)
+        low = bisect_left(sorted_window, median)
+        high = bisect_right(sorted_window, median)
+        target = window / 2.0
+        deviation = 0.0 if low <= target <= high else min(abs(low - target), abs(high - target))
+        worst = max(worst, deviation)
+    return 100.0 * worst / window, 100.0 * sketch.rank_error / window
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--length", type=int, default=60_000)
+    parser.add_argument("--windows", default="250,4000,20000")
+    parser.add_argument("--max-error", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    values = _series(args.length, args.seed)
+    windows = [int(item) for item in args.windows.split(",") if item.strip()]
+    failed = False
+
+    print(f"{args.length:,} points, max_error={args.max_error:g} percentile points")
+    print(
+        f"{'window':>7} {'exact s':>8} {'approx s':>9} {'kept exact':>11} {'kept approx':>12}"
+        f" {'pct err':>8} {'bound':>7} {'median rank err %':>18} {'bound':>7}"
+    )
+    for window in windows:
+        start = time.perf_counter()
+        exact = rolling._rolling_percentiles(values, window)  # type: ignore[arg-type]
+        exact_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx = rolling._approximate_rolling_percentiles(values, window, args.max_error)  # type: ignore[arg-type]
+        approx_seconds = time.perf_counter() - start
+
+        bound = rolling._percentile_error_bounds(args.max_error, window=window)["window"]
+        if [value is None for value in exact] != [value is None for value in approx]:
+            print(f"window {window}: approximate output has a different shape")
+            failed = True
+            continue
+        worst = max(
+            (abs(a - e) for a, e in zip(approx, exact) if a is not None and e is not None),  # type: ignore[operator]
+            default=0.0,
+        )
+
+        kept = window
+        if rolling._sketch_parameters(window, args.max_error) is not None:
+            sketch = rolling._SlidingQuantileSketch(window, args.max_error)
+            for value in values[:window]:
+                sketch.add(value)
+            kept = sketch.stored_values
+
+        median_worst, median_bound = _check_medians(values, window, args.max_error)
+        print(
+            f"{window:>7} {exact_seconds:>8.2f} {approx_seconds:>9.2f} {window:>11,} {kept:>12,}"
+            f" {worst:>8.3f} {bound:>7.3f} {median_worst:>18.3f} {median_bound:>7.3f}"
+        )
+        if worst > bound + 1e-9 or median_worst > median_bound + 1e-9 or not math.isfinite(worst):
+            failed = True
+
+    if failed:
+        print("FAILED: approximate output exceeds the reported error bound")
+        sys.exit(1)
+    print("OK: all approximate outputs are within the reported bounds")
+
+
+if __name__ == "__main__":
+    main()
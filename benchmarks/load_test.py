@@ -0,0 +1,109 @@
+"""Load test for a running DataProcessing server.
+
+Measures requests/sec for one compute endpoint in two phases:
+
+- uncached: the input workbooks are touched before every request, so each
+  request re-parses the Excel files (run sequentially);
+- cached: inputs are left alone and requests are fired concurrently, so the
+  workers answer from their warm series cache.
+
+Usage:
+    python src/serve.py --workers 4 &
+    python benchmarks/load_test.py --endpoint /api/erp10y --requests 40 --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_PAYLOADS: dict[str, dict[str, object]] = {
+    "/api/erprolling": {"n": 250},
+    "/api/erpinterval": {"start_date": "2015-01-05", "end_date": ""},
+    "/api/thermometer/percentiles": {
+        "moving_average_gdp": 1,
+        "rolling_period_gdp": 52,
+        "moving_average_volume": 20,
+        "rolling_period_volume": 1000,
+        "moving_average_securities": 20,
+        "rolling_period_securities": 1000,
+        "moving_erp": 5,
+        "rolling_period_erp": 1000,
+    },
+}
+DEFAULT_PAYLOADS["/api/thermometer/merge"] = {
+    **DEFAULT_PAYLOADS["/api/thermometer/percentiles"],
+    "weight_gdp": 25,
+    "weight_volume": 25,
+    "weight_securities_lend": 25,
+    "weight_erp": 25,
+}
+
+
+def _post(url: str, payload: dict[str, object]) -> tuple[int, float]:
+    body = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=600) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return status, time.perf_counter() - start
+
+
+def _touch_inputs(input_dir: Path) -> None:
+    now = time.time()
+    for path in input_dir.glob("*.xlsx"):
+        os.utime(path, (now, now))
+
+
+def _report(label: str, results: list[tuple[int, float]], elapsed: float) -> None:
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{label:<9} requests={len(results):<4} errors={errors:<3} "
+        f"req/s={len(results) / elapsed:8.2f}  "
+        f"p50={statistics.median(latencies) * 1000:8.1f}ms  p95={p95 * 1000:8.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoint", default="/api/erp10y")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--input-dir", type=Path, default=BASE_DIR / "input")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + args.endpoint
+    payload = DEFAULT_PAYLOADS.get(args.endpoint, {})
+
+    uncached: list[tuple[int, float]] = []
+    start = time.perf_counter()
+    for _ in range(max(1, args.requests // 4)):
+        _touch_inputs(args.input_dir)
+        uncached.append(_post(url, payload))
+    _report("uncached", uncached, time.perf_counter() - start)
+
+    _post(url, payload)  # warm-up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        cached = list(pool.map(lambda _: _post(url, payload), range(args.requests)))
+    _report("cached", cached, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,10 @@ const maSecuritiesInput = document.getElementById("ma-securities");
 const rpSecuritiesInput = document.getElementById("rp-securities");
 const maErpInput = document.getElementById("ma-erp");
 const rpErpInput = document.getElementById("rp-erp");
+const smGdpSelect = document.getElementById("sm-gdp");
+const smVolumeSelect = document.getElementById("sm-volume");
+const smSecuritiesSelect = document.getElementById("sm-securities");
+const smErpSelect = document.getElementById("sm-erp");
 const wGdpInput = document.getElementById("w-gdp");
 const wVolumeInput = document.getElementById("w-volume");
 const wSecuritiesInput = document.getElementById("w-securities");
@@ -77,6 +81,10 @@ const updateControls = () => {
   rpSecuritiesInput.disabled = isBusy;
   maErpInput.disabled = isBusy;
   rpErpInput.disabled = isBusy;
+  smGdpSelect.disabled = isBusy;
+  smVolumeSelect.disabled = isBusy;
+  smSecuritiesSelect.disabled = isBusy;
+  smErpSelect.disabled = isBusy;
   wGdpInput.disabled = isBusy;
   wVolumeInput.disabled = isBusy;
   wSecuritiesInput.disabled = isBusy;
@@ -309,6 +317,10 @@ const generateThermoPercentiles = async () => {
       rolling_period_securities: parseIntInRange(rpSecuritiesInput.value, 1, 4000, "融资融券/总市值分位滚动周期"),
       moving_erp: parseIntInRange(maErpInput.value, 1, 4000, "股权风险溢价平均移动"),
       rolling_period_erp: parseIntInRange(rpErpInput.value, 1, 4000, "股权风险溢价分位滚动周期"),
+      smoothing_gdp: smGdpSelect.value,
+      smoothing_volume: smVolumeSelect.value,
+      smoothing_securities: smSecuritiesSelect.value,
+      smoothing_erp: smErpSelect.value,
     };
   } catch (error) {
     showModal("参数错误", error.message);
@@ -364,6 +376,10 @@ const generateThermoMerge = async () => {
       rolling_period_securities: parseIntInRange(rpSecuritiesInput.value, 1, 4000, "融资融券/总市值分位滚动周期"),
       moving_erp: parseIntInRange(maErpInput.value, 1, 4000, "股权风险溢价平均移动"),
       rolling_period_erp: parseIntInRange(rpErpInput.value, 1, 4000, "股权风险溢价分位滚动周期"),
+      smoothing_gdp: smGdpSelect.value,
+      smoothing_volume: smVolumeSelect.value,
+      smoothing_securities: smSecuritiesSelect.value,
+      smoothing_erp: smErpSelect.value,
 
       weight_gdp: parseFloatInRange(wGdpInput.value, 0, 100, "权重：市值/GDP（%）"),
       weight_volume: parseFloatInRange(wVolumeInput.value, 0, 100, "权重：成交量/市值（%）"),
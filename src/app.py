@@ -1,906 +1,1192 @@
 from __future__ import annotations
 
-from bisect import bisect_left, bisect_right, insort
-from collections import deque
-import csv
+from array import array
+import atexit
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 import datetime as dt
+import hashlib
+from itertools import product
+import json
 import math
 import os
 from pathlib import Path
-from typing import Iterable
-
-from flask import Flask, jsonify, request
-
-try:
-    import openpyxl
-    from openpyxl.utils.datetime import from_excel
-    from openpyxl.utils.cell import get_column_letter
-except ImportError as exc:  # pragma: no cover - runtime dependency check
-    raise SystemExit(
-        "缺少依赖：openpyxl。请先安装 requirements.txt 后再运行。"
-    ) from exc
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, NamedTuple, Sequence
+import zlib
+
+from dataprocessing import (
+    cached_erp_percentile_records,
+    cached_parsed_dates,
+    cached_percentile_records,
+    cached_smoothed_percentiles,
+    cell_to_text,
+    check_output_formats,
+    discover_indices,
+    erp_columns,
+    erp_from_pe,
+    erp_interval_bands,
+    ErpSeries,
+    exact_fallback_reason,
+    exact_fallbacks,
+    file_fingerprint,
+    find_input_parts,
+    INDICES_DIR_NAME,
+    INPUT_SUFFIXES,
+    iter_bond,
+    iter_erp_rolling_bands,
+    iter_erp_rows,
+    iter_index_pe,
+    iter_pe,
+    iter_ratio_table,
+    matches_input_stem,
+    median_rank_error_bound,
+    merge_by_bond_dates,
+    nearest_index,
+    parts_fingerprint,
+    pearson,
+    percentile_error_bounds,
+    PERCENTILE_MAX_ERROR_LIMIT,
+    ratio_columns,
+    read_ratio_rows,
+    rolling_band_stats,
+    round_for_output,
+    SMOOTHERS,
+    temperatures,
+    UNSAFE_FILE_CHARS,
+    validate_table,
+    write_table,
+)
+
+# 进程池与线程池只在用到时导入：命令行与工作进程的冷启动不为它们付出导入时间。
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 INPUT_DIR = BASE_DIR / "input"
 OUTPUT_DIR = BASE_DIR / "docs" / "data"
 DOCS_DIR = BASE_DIR / "docs"
 
-app = Flask(__name__, static_folder=str(DOCS_DIR), static_url_path="")
-
-OUTPUT_DECIMAL_PLACES = 6
-
-
-def _cell_to_text(value: object) -> str:
-    if value is None:
-        return ""
-    if isinstance(value, (dt.date, dt.datetime, dt.time)):
-        return value.isoformat()
-    if isinstance(value, float):
-        if math.isnan(value) or math.isinf(value):
-            return str(value)
-        rounded = round(value, OUTPUT_DECIMAL_PLACES)
-        text = f"{rounded:.{OUTPUT_DECIMAL_PLACES}f}"
-        return text.rstrip("0").rstrip(".")
-    return str(value)
-
-def _round_for_output(value: object) -> object:
-    if isinstance(value, float):
-        if math.isnan(value) or math.isinf(value):
-            return value
-        return round(value, OUTPUT_DECIMAL_PLACES)
-    return value
 
+def _in_worker_process() -> bool:
+    # 工作进程由 multiprocessing 启动，模块必然已导入；未导入时不必为这个判断加载它。
+    multiprocessing = sys.modules.get("multiprocessing")
+    return multiprocessing is not None and multiprocessing.parent_process() is not None
 
-def _is_garbled_text(text: str) -> bool:
-    if "\ufffd" in text:
-        return True
-    for char in text:
-        code_point = ord(char)
-        if code_point < 32 and char not in ("\t", "\n", "\r"):
-            return True
-    return False
 
+def _parts_executor(source_paths: Sequence[Path]) -> ProcessPoolExecutor | None:
+    # 多个分卷在工作进程池中并行解析；单个文件流式读取，已在工作进程内时顺序解析（不嵌套进程池）。
+    if len(source_paths) <= 1 or _in_worker_process():
+        return None
+    return _get_process_pool()
 
-def _parse_date(value: object, *, epoch: dt.datetime) -> dt.date:
-    if isinstance(value, dt.datetime):
-        return value.date()
-    if isinstance(value, dt.date) and not isinstance(value, dt.datetime):
-        return value
-    if isinstance(value, bool):
-        raise ValueError("布尔类型不是有效日期")
-    if isinstance(value, (int, float)):
-        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-            raise ValueError("数值为 NaN/Inf")
-        return from_excel(value, epoch=epoch).date()
-    if isinstance(value, str):
-        text = value.strip()
-        if not text:
-            raise ValueError("日期为空白")
-        candidates = (
-            "%Y-%m-%d",
-            "%Y/%m/%d",
-            "%Y.%m.%d",
-            "%Y%m%d",
-            "%Y-%m-%d %H:%M:%S",
-            "%Y/%m/%d %H:%M:%S",
-        )
-        for fmt in candidates:
-            try:
-                parsed = dt.datetime.strptime(text, fmt)
-                return parsed.date()
-            except ValueError:
-                continue
-        try:
-            return dt.date.fromisoformat(text)
-        except ValueError as exc:
-            raise ValueError(f"无法解析日期：{text}") from exc
-    raise ValueError(f"不支持的日期类型：{type(value).__name__}")
-
-
-def _validate_text_or_number(value: object) -> object:
-    if value is None:
-        raise ValueError("内容空白")
-    if isinstance(value, bool):
-        raise ValueError("不支持布尔类型")
-    if isinstance(value, str):
-        text = value.strip()
-        if not text:
-            raise ValueError("内容空白")
-        if _is_garbled_text(text):
-            raise ValueError("疑似乱码/控制字符")
-        return text
-    if isinstance(value, (int, float)):
-        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-            raise ValueError("数值为 NaN/Inf")
-        return value
-    raise ValueError(f"不支持的类型：{type(value).__name__}")
-
-
-def _validate_header_cell(value: object) -> str:
-    if value is None:
-        raise ValueError("标题空白")
-    if not isinstance(value, str):
-        raise ValueError("标题必须为文本")
-    text = value.strip()
-    if not text:
-        raise ValueError("标题空白")
-    if _is_garbled_text(text):
-        raise ValueError("标题疑似乱码/控制字符")
-    return text
-
-
-def process_xlsx_to_outputs(source_path: Path, output_csv_path: Path, output_xlsx_path: Path) -> None:
-    workbook = openpyxl.load_workbook(source_path, data_only=True, read_only=True)
-    sheet_name = workbook.sheetnames[0] if workbook.sheetnames else None
-    if not sheet_name:
-        raise ValueError("未找到可用工作表")
-
-    sheet = workbook[sheet_name]
-    rows_iter = sheet.iter_rows(values_only=True)
-    header_values = next(rows_iter, None)
-    if not header_values:
-        raise ValueError("未找到标题行")
-
-    def _is_blank(value: object) -> bool:
-        return value is None or (isinstance(value, str) and not value.strip())
-
-    last_col = 0
-    for column_index, value in enumerate(header_values, start=1):
-        if not _is_blank(value):
-            last_col = column_index
-
-    if last_col == 0:
-        raise ValueError("标题行为空")
-
-    columns_to_keep: list[int] = [col for col in range(1, last_col + 1) if col not in (2, 3, 4)]
-    if 1 not in columns_to_keep:
-        columns_to_keep.insert(0, 1)
-
-    output_rows: list[list[object]] = []
-    row_dates: list[dt.date] = []
-
-    kept_header: list[str] = []
-    for col in columns_to_keep:
-        value = header_values[col - 1] if col - 1 < len(header_values) else None
-        coordinate = f"{get_column_letter(col)}1"
-        try:
-            kept_header.append(_validate_header_cell(value))
-        except ValueError as exc:
-            raise ValueError(f"{coordinate} 标题错误：{exc}") from exc
 
-    output_rows.append(kept_header)
+def _find_input_parts(stem: str) -> list[Path]:
+    return find_input_parts(INPUT_DIR, stem)
 
-    for row_offset, row_values in enumerate(rows_iter, start=2):
-        values = list(row_values[:last_col])
-        if len(values) < last_col:
-            values.extend([None] * (last_col - len(values)))
 
-        kept_values = [values[col - 1] for col in columns_to_keep]
-        if all(_is_blank(value) for value in kept_values):
-            continue
+def _discover_indices(manifest: object = None) -> dict[str, list[Path]]:
+    return discover_indices(INPUT_DIR, manifest)
 
-        normalized_row: list[object] = []
-        for position, col in enumerate(columns_to_keep):
-            value = values[col - 1]
-            coordinate = f"{get_column_letter(col)}{row_offset}"
-            try:
-                if position == 0:
-                    parsed = _parse_date(value, epoch=workbook.epoch)
-                    normalized_row.append(parsed.isoformat())
-                else:
-                    normalized_row.append(_validate_text_or_number(value))
-            except ValueError as exc:
-                raise ValueError(f"{coordinate} 内容错误：{exc}") from exc
-
-        output_rows.append(normalized_row)
-        row_dates.append(dt.date.fromisoformat(normalized_row[0]))
-
-    if len(output_rows) <= 1:
-        raise ValueError("没有可导出的数据行")
-
-    data_rows = output_rows[1:]
-    if len(data_rows) != len(row_dates):
-        raise ValueError("内部错误：行数不一致")
-
-    sorted_data_rows = [row for _, row in sorted(zip(row_dates, data_rows), key=lambda item: item[0])]
-    final_rows = [output_rows[0], *sorted_data_rows]
-
-    output_csv_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_csv_path.open("w", encoding="utf-8-sig", newline="") as file_handle:
-        writer = csv.writer(file_handle)
-        for row in final_rows:
-            writer.writerow([_cell_to_text(value) for value in row])
-
-    workbook_out = openpyxl.Workbook()
-    sheet_out = workbook_out.active
-    sheet_out.title = "processed"
-    sheet_out.freeze_panes = "B2"
-    for row in final_rows:
-        sheet_out.append([_round_for_output(value) for value in row])
-    output_xlsx_path.parent.mkdir(parents=True, exist_ok=True)
-    workbook_out.save(output_xlsx_path)
-
-def _find_input_xlsx(stem: str) -> Path:
-    if not INPUT_DIR.exists():
-        raise FileNotFoundError("input/ 目录不存在")
 
-    def normalize(text: str) -> str:
-        return " ".join(text.strip().split()).lower()
+def _read_input_rows(read: Callable[..., Iterable[tuple[object, ...]]], stem: str) -> Iterable[tuple[object, ...]]:
+    paths = _find_input_parts(stem)
+    return read(paths, executor=_parts_executor(paths))
 
-    candidates: list[Path] = []
-    for path in INPUT_DIR.iterdir():
-        if not path.is_file():
-            continue
-        if path.name.startswith("~$"):
-            continue
-        if path.suffix.lower() != ".xlsx":
-            continue
-        if normalize(path.stem) == normalize(stem):
-            candidates.append(path)
-
-    if not candidates:
-        raise FileNotFoundError(f"未找到文件：{stem}.xlsx（请放入 input/）")
-    if len(candidates) > 1:
-        raise FileNotFoundError(f"找到多个匹配文件：{stem}.xlsx（请保留一个）")
-    return candidates[0]
-
-
-def _coerce_float(value: object) -> float:
-    if isinstance(value, bool):
-        raise ValueError("不支持布尔类型")
-    if value is None:
-        raise ValueError("内容空白")
-    if isinstance(value, (int, float)):
-        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-            raise ValueError("数值为 NaN/Inf")
-        return float(value)
-    if isinstance(value, str):
-        text = value.strip()
-        if not text:
-            raise ValueError("内容空白")
-        if _is_garbled_text(text):
-            raise ValueError("疑似乱码/控制字符")
-        cleaned = text.replace(",", "")
-        if cleaned.endswith("%"):
-            cleaned = cleaned[:-1].strip()
-        try:
-            return float(cleaned)
-        except ValueError as exc:
-            raise ValueError(f"无法解析为数值：{text}") from exc
-    raise ValueError(f"不支持的类型：{type(value).__name__}")
-
-
-def _normalize_yield(yield_raw: float) -> float:
-    if yield_raw > 1.0:
-        return yield_raw / 100.0
-    return yield_raw
-
-
-def _iter_rows_values(sheet: object, *, last_col: int) -> Iterable[tuple[object, ...]]:
-    for row_values in sheet.iter_rows(values_only=True):
-        values = tuple(row_values[:last_col])
-        if len(values) < last_col:
-            values = values + (None,) * (last_col - len(values))
-        yield values
-
-
-def _validate_expected_header(actual: object, expected: str, coordinate: str) -> None:
-    text = _validate_header_cell(actual)
-    if text != expected:
-        raise ValueError(f"{coordinate} 标题不匹配：期望“{expected}”，实际“{text}”")
-
-
-def _rolling_percentile(sorted_window: list[float], value: float) -> float:
-    window_size = len(sorted_window)
-    if window_size <= 0:
-        raise ValueError("窗口为空")
-    if window_size == 1:
-        return 50.0
-    left = bisect_left(sorted_window, value)
-    right = bisect_right(sorted_window, value)
-    rank_low = left + 1
-    rank_high = right
-    avg_rank = (rank_low + rank_high) / 2.0
-    return 100.0 * (avg_rank - 1.0) / (window_size - 1.0)
-
-
-def _moving_average(values: list[float], window: int) -> list[float | None]:
-    if window <= 0:
-        raise ValueError("移动平均窗口必须为正整数")
-    out: list[float | None] = []
-    q: deque[float] = deque()
-    sum_values = 0.0
-    for value in values:
-        q.append(value)
-        sum_values += value
-        if len(q) > window:
-            sum_values -= q.popleft()
-        if len(q) == window:
-            out.append(sum_values / window)
-        else:
-            out.append(None)
-    return out
 
+# 解析后的序列按输入文件指纹（路径、mtime、大小）缓存；常驻工作进程复用这些热缓存。
+SERIES_CACHE_SIZE = 16
 
-def _rolling_percentiles(values: list[float | None], window: int) -> list[float | None]:
-    if window <= 0:
-        raise ValueError("滚动窗口必须为正整数")
+_series_cache: dict[tuple[object, ...], object] = {}
+# 流水线线程、监视线程与请求线程共用缓存，淘汰与写入须在锁内完成。
+_series_cache_lock = threading.Lock()
 
-    first_valid = 0
-    while first_valid < len(values) and values[first_valid] is None:
-        first_valid += 1
 
-    out: list[float | None] = [None] * len(values)
-    if first_valid >= len(values):
-        return out
+def _cache_get(key: tuple[object, ...]) -> object | None:
+    with _series_cache_lock:
+        return _series_cache.get(key)
 
-    sorted_window: list[float] = []
-    q: deque[float] = deque()
 
-    for index in range(first_valid, len(values)):
-        current = values[index]
-        if current is None:
-            out[index] = None
-            continue
+def _cache_put(key: tuple[object, ...], value: object) -> None:
+    with _series_cache_lock:
+        while len(_series_cache) >= SERIES_CACHE_SIZE:
+            _series_cache.pop(next(iter(_series_cache)), None)
+        _series_cache[key] = value
 
-        insort(sorted_window, float(current))
-        q.append(float(current))
-        if len(q) > window:
-            leaving = q.popleft()
-            remove_index = bisect_left(sorted_window, leaving)
-            if remove_index >= len(sorted_window) or sorted_window[remove_index] != leaving:
-                raise ValueError("内部错误：滚动窗口移除失败")
-            sorted_window.pop(remove_index)
-
-        if len(q) < window:
-            out[index] = None
-            continue
 
-        out[index] = _rolling_percentile(sorted_window, float(current))
+# 序列库：校验后的输入序列按日期序数（INTEGER PRIMARY KEY，即聚簇索引）存入 SQLite，每个序列一张表，
+# 目录表记录其输入指纹与列名。进程内缓存未命中时（刚启动的服务或工作进程）直接从库中读取，
+# 不必重新解析 Excel；按日期区间的查询只读取区间内的行。WAL 模式下写入新版本不阻塞读取。
+# 序列库只是缓存：读写失败时退回解析输入文件。
+SERIES_STORE_DIR = BASE_DIR / "store"
+SERIES_STORE_ENABLED = os.environ.get("DP_SERIES_STORE", "1").strip() != "0"
+_SERIES_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series_catalog (
+    name TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+)
+"""
+# 流水线输出任务的最近一次运行：按 (任务, 输出目录) 只保留一条，输出文件会被下一次运行覆盖。
+_PIPELINE_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    task TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    result TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (task, output_dir)
+)
+"""
+
 
-    return out
+def _series_store_connect() -> sqlite3.Connection:
+    SERIES_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(SERIES_STORE_DIR / "series.sqlite", timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(_SERIES_CATALOG_SCHEMA)
+    connection.execute(_PIPELINE_STATE_SCHEMA)
+    return connection
 
 
-def _load_ratio_series(source_path: Path) -> tuple[list[str], list[float]]:
-    workbook = openpyxl.load_workbook(source_path, data_only=True, read_only=True)
+# 计算代码分布在 app 与 dataprocessing 包中，任一文件改动都使序列库中的序列与已记录的输出失效。
+_CODE_FINGERPRINT = tuple(
+    file_fingerprint(path) for path in (Path(__file__), *sorted(Path(__file__).with_name("dataprocessing").glob("*.py")))
+)
+
+
+def _series_fingerprint(*parts: Sequence[Path]) -> str:
+    # 序列库条目的版本：输入文件指纹加上代码指纹，解析或清洗规则改动后不会读到旧代码算出的序列。
+    key = [_CODE_FINGERPRINT, *(parts_fingerprint(paths) for paths in parts)]
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16]
+
+
+def _store_series(name: str, fingerprint: str, dates: list[str], columns: dict[str, list[float]]) -> None:
+    # 目录中已是同一指纹时不重写；整张表在一个写事务内替换，读者看到的要么是旧版本要么是新版本。
+    if not SERIES_STORE_ENABLED or not dates:
+        return
+    table = "series_" + re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_")
     try:
-        sheet_name = workbook.sheetnames[0] if workbook.sheetnames else None
-        if not sheet_name:
-            raise ValueError(f"{source_path.name}：未找到可用工作表")
-        sheet = workbook[sheet_name]
-        epoch = workbook.epoch
-
-        last_col = 4  # A-D
-        rows_iter = _iter_rows_values(sheet, last_col=last_col)
-        header = next(rows_iter, None)
-        if not header:
-            raise ValueError(f"{source_path.name}：未找到标题行")
-
-        header_a = _validate_header_cell(header[0])
-        _ = _validate_header_cell(header[3])
-        if "日期" not in header_a and header_a.lower() != "date":
-            raise ValueError(f"{source_path.name}：A1 标题应为“日期”")
-
-        rows: list[tuple[dt.date, float]] = []
-        for _, values in enumerate(rows_iter, start=2):
-            try:
-                date = _parse_date(values[0], epoch=epoch)
-                ratio = _coerce_float(values[3])
-                rows.append((date, ratio))
-            except Exception:
-                continue
+        connection = _series_store_connect()
+    except (OSError, sqlite3.Error):
+        return
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            current = connection.execute("SELECT fingerprint FROM series_catalog WHERE name = ?", (name,)).fetchone()
+            if current is None or current[0] != fingerprint:
+                value_columns = ", ".join(f"c{index} REAL NOT NULL" for index in range(len(columns)))
+                connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+                connection.execute(f'CREATE TABLE "{table}" (day INTEGER PRIMARY KEY, {value_columns})')
+                connection.executemany(
+                    f'INSERT INTO "{table}" VALUES ({", ".join("?" * (len(columns) + 1))})',
+                    zip((dt.date.fromisoformat(text).toordinal() for text in dates), *columns.values()),
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO series_catalog VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        name,
+                        table,
+                        fingerprint,
+                        json.dumps(list(columns), ensure_ascii=False),
+                        len(dates),
+                        dates[0],
+                        dates[-1],
+                        dt.datetime.now().isoformat(timespec="seconds"),
+                    ),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    except sqlite3.Error:
+        pass
+    finally:
+        connection.close()
 
-        if not rows:
-            raise ValueError(f"{source_path.name}：清洗后没有可用数据行")
 
-        rows.sort(key=lambda item: item[0])
-        dates = [date.isoformat() for date, _ in rows]
-        metrics = [metric for _, metric in rows]
-        return dates, metrics
+def _stored_series(
+    name: str, fingerprint: str, start: dt.date | None = None, end: dt.date | None = None
+) -> tuple[str, str, list[str], list[list[float]]] | None:
+    # 返回 (最早日期, 最近日期, 区间内日期, 区间内各列)；库中没有该指纹的版本时返回 None。
+    if not SERIES_STORE_ENABLED:
+        return None
+    try:
+        connection = _series_store_connect()
+    except (OSError, sqlite3.Error):
+        return None
+    try:
+        # 目录与数据表在同一读事务（同一快照）中读取。
+        connection.execute("BEGIN")
+        entry = connection.execute(
+            "SELECT table_name, fingerprint, columns, first_date, last_date FROM series_catalog WHERE name = ?", (name,)
+        ).fetchone()
+        if entry is None or entry[1] != fingerprint:
+            return None
+        table, _, columns_text, first_date, last_date = entry
+        rows = connection.execute(
+            f'SELECT * FROM "{table}" WHERE day BETWEEN ? AND ? ORDER BY day',
+            (start.toordinal() if start else 0, end.toordinal() if end else dt.date.max.toordinal()),
+        ).fetchall()
+        connection.execute("COMMIT")
+    except sqlite3.Error:
+        return None
     finally:
-        workbook.close()
+        connection.close()
+    dates = [dt.date.fromordinal(row[0]).isoformat() for row in rows]
+    columns = [[row[position] for row in rows] for position in range(1, len(json.loads(columns_text)) + 1)]
+    return first_date, last_date, dates, columns
+
+
+def _cached_ratio_series(source_paths: Sequence[Path]) -> tuple[list[str], list[float]] | None:
+    cache_key = ("ratio", parts_fingerprint(source_paths))
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached  # type: ignore[return-value]
+
+    stored = _stored_series(f"ratio:{source_paths[0].stem}", _series_fingerprint(source_paths))
+    if stored is None:
+        return None
+    _, _, dates, (metrics,) = stored
+    _cache_put(cache_key, (dates, metrics))
+    return dates, metrics
+
+
+def _ratio_series_from_rows(
+    source_paths: Sequence[Path], rows: Sequence[tuple[dt.date, float, str]]
+) -> tuple[list[str], list[float]]:
+    dates, metrics = ratio_columns(rows)
+    _store_series(f"ratio:{source_paths[0].stem}", _series_fingerprint(source_paths), dates, {"metric": metrics})
+    _cache_put(("ratio", parts_fingerprint(source_paths)), (dates, metrics))
+    return dates, metrics
+
+
+def _load_ratio_series(source_paths: Sequence[Path]) -> tuple[list[str], list[float]]:
+    cached = _cached_ratio_series(source_paths)
+    if cached is not None:
+        return cached
+    return _ratio_series_from_rows(source_paths, read_ratio_rows(source_paths, executor=_parts_executor(source_paths)))
+
+
+def _cached_erp_series() -> ErpSeries | None:
+    # 进程内缓存或序列库中有当前输入版本的 ERP 序列时直接返回，否则返回 None。
+    pe_paths = _find_input_parts("data_PE")
+    bond_paths = _find_input_parts("data_bond")
+    cache_key = ("erp", parts_fingerprint(pe_paths), parts_fingerprint(bond_paths))
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached  # type: ignore[return-value]
+
+    stored = _stored_series("erp", _series_fingerprint(pe_paths, bond_paths))
+    if stored is None:
+        return None
+    _, _, dates, (erp_values, bond_yield_values, pe_values, close_values) = stored
+    result = (dates, erp_values, bond_yield_values, pe_values, close_values)
+    _cache_put(cache_key, result)
+    return result
+
+
+def _erp_series_from_rows(erp_rows: Iterable[Sequence[object]]) -> ErpSeries:
+    # 校验 iter_erp_rows 的输出（含表头）并转为列，同时写入进程内缓存与序列库。
+    pe_paths = _find_input_parts("data_PE")
+    bond_paths = _find_input_parts("data_bond")
+    result = erp_columns(erp_rows)
+    dates, erp_values, bond_yield_values, pe_values, close_values = result
+    _store_series(
+        "erp",
+        _series_fingerprint(pe_paths, bond_paths),
+        dates, {"erp": erp_values, "bond_yield": bond_yield_values, "pe": pe_values, "close": close_values}
+    )
+    _cache_put(("erp", parts_fingerprint(pe_paths), parts_fingerprint(bond_paths)), result)
+    return result
 
 
-def _load_erp_series() -> tuple[list[str], list[float], list[float], list[float], list[float]]:
-    pe_path = _find_input_xlsx("data_PE")
-    bond_path = _find_input_xlsx("data_bond")
+def _load_erp_series() -> ErpSeries:
+    return _run_pipeline({"erp_series": {}})["erp_series"]  # type: ignore[return-value]
 
-    pe_rows = _process_data_pe(pe_path)
-    bond_rows = _process_data_bond(bond_path)
-    merged_rows = _merge_by_bond_dates(bond_rows, pe_rows)
-    erp_rows = _compute_erp_rows(merged_rows, bond_rows)
 
-    dates: list[str] = []
-    erp_values: list[float] = []
-    bond_yield_values: list[float] = []
-    pe_values: list[float] = []
-    close_values: list[float] = []
-    for row_index, row in enumerate(erp_rows[1:], start=2):
-        try:
-            date_text = str(row[0])
-            _ = dt.date.fromisoformat(date_text)
-            value = row[4]
-            if not isinstance(value, (int, float)):
-                raise ValueError("数值类型不合法")
-            dates.append(date_text)
-            erp_values.append(float(value))
-
-            yield_value = row[1]
-            if not isinstance(yield_value, (int, float)):
-                raise ValueError("十年期收益率类型不合法")
-            bond_yield_values.append(float(yield_value))
-
-            pe_value = row[2]
-            if not isinstance(pe_value, (int, float)):
-                raise ValueError("PE 类型不合法")
-            pe_values.append(float(pe_value))
-
-            close_value = row[3]
-            if not isinstance(close_value, (int, float)):
-                raise ValueError("收盘点位类型不合法")
-            close_values.append(float(close_value))
-        except Exception as exc:
-            raise ValueError(f"ERP 第 {row_index} 行数据不合法：{exc}") from exc
-
-    if not dates:
-        raise ValueError("ERP 数据为空")
-    return dates, erp_values, bond_yield_values, pe_values, close_values
-
-
-def _nearest_index(dates: list[dt.date], target: dt.date) -> int:
-    if not dates:
-        raise ValueError("日期序列为空")
-    index = bisect_left(dates, target)
-    if index <= 0:
-        return 0
-    if index >= len(dates):
-        return len(dates) - 1
-    before = dates[index - 1]
-    after = dates[index]
-    diff_before = abs((target - before).days)
-    diff_after = abs((after - target).days)
-    if diff_before <= diff_after:
-        return index - 1
-    return index
-
-
-def _build_percentile_records(
-    dates: list[str],
-    values: list[float],
-    *,
-    ma_window: int,
-    rp_window: int,
-) -> list[tuple[dt.date, float]]:
-    ma_values = _moving_average(values, ma_window)
-    pct_values = _rolling_percentiles(ma_values, rp_window)
-    out: list[tuple[dt.date, float]] = []
-    for index, date_text in enumerate(dates):
-        pct = pct_values[index]
-        if pct is None:
-            continue
-        out.append((dt.date.fromisoformat(date_text), float(pct)))
-    return out
+def _erp_rows_between(
+    series: ErpSeries, start_date: dt.date, end_date: dt.date
+) -> tuple[dt.date, dt.date, list[list[object]]]:
+    # 返回 ERP 的最早、最近日期与区间内的行（列同 iter_erp_rows），按日期二分切片。
+    dates = series[0]
+    begin = bisect_left(dates, start_date.isoformat())
+    end = bisect_right(dates, end_date.isoformat())
+    rows = list(_erp_series_rows(series, begin, end))
+    return dt.date.fromisoformat(dates[0]), dt.date.fromisoformat(dates[-1]), rows
 
 
-def _build_erp_percentile_records(
-    dates: list[str],
-    erp_values: list[float],
-    yields: list[float],
-    closes: list[float],
+def _erp_series_rows(series: ErpSeries, begin: int = 0, end: int | None = None) -> Iterator[list[object]]:
+    # 按 iter_erp_rows 的列顺序逐行还原 ERP 序列（不含表头）。
+    dates, erp_values, yield_values, pe_values, close_values = series
+    for index in range(begin, len(dates) if end is None else end):
+        yield [dates[index], yield_values[index], pe_values[index], close_values[index], erp_values[index]]
+
+
+def _erp_series_table(series: ErpSeries) -> Iterator[list[object]]:
+    # 带表头的 ERP 表，供按行计算的输出直接从缓存的序列生成，无需重新解析输入。
+    yield next(iter_erp_rows(()))
+    yield from _erp_series_rows(series)
+
+
+def process_xlsx_to_outputs(
+    source_path: Path,
+    output_csv_path: Path,
+    output_xlsx_path: Path,
+    formats: Sequence[str] = ("csv", "xlsx"),
+) -> list[str]:
+    return _write_outputs(
+        validate_table(source_path), output_csv_path, formats, xlsx_path=output_xlsx_path, sheet_title="processed"
+    )
+
+
+def _write_outputs(
+    rows: Iterable[Sequence[object]],
+    csv_path: Path,
+    formats: Sequence[str],
     *,
-    ma_window: int,
-    rp_window: int,
-) -> list[dict[str, object]]:
-    ma_values = _moving_average(erp_values, ma_window)
-    pct_values = _rolling_percentiles(ma_values, rp_window)
-    out: list[dict[str, object]] = []
-    for index, date_text in enumerate(dates):
-        pct = pct_values[index]
-        if pct is None:
-            continue
-        out.append(
-            {
-                "date": dt.date.fromisoformat(date_text),
-                "erp_percentile": float(pct),
-                "erp": float(erp_values[index]),
-                "yield": float(yields[index]),
-                "close": float(closes[index]),
-            }
+    xlsx_path: Path | None = None,
+    sheet_title: str | None = None,
+) -> list[str]:
+    # 任务在快照记录下运行时，同一遍写出中也把每一行写入快照库。
+    recorder = _snapshot_recorder.get()
+    sinks = () if recorder is None else (recorder.sink(_snapshot_name(csv_path)),)
+    return write_table(rows, csv_path, formats, xlsx_path=xlsx_path, sheet_title=sheet_title, sinks=sinks)
+
+
+def _write_output_tables(tables: Sequence[tuple[Iterable[Sequence[object]], Path]], formats: Sequence[str]) -> list[str]:
+    # 同一任务的多张表在线程池中并发写出（线程数同 PIPELINE_THREADS），返回的文件名保持 tables 的顺序。
+    if len(tables) <= 1:
+        return [name for rows, path in tables for name in _write_outputs(rows, path, formats)]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(PIPELINE_THREADS, len(tables))) as executor:
+        futures = [executor.submit(copy_context().run, _write_outputs, rows, path, formats) for rows, path in tables]
+        return [name for future in futures for name in future.result()]
+
+
+def _csv_output(csv_name: str, formats: Sequence[str]) -> str | None:
+    return csv_name if "csv" in formats else None
+
+
+# 快照库：每次任务成功后，把它写出的每张表记为一个版本（任务名 + 参数 + 输入指纹），存入 SQLite。
+# 行按内容切块（某行的 CRC 低位为 0 时断开），块以摘要为主键只存一份，各版本只记录块摘要列表，
+# 因此相邻版本间未变化的行（包括中间插入或末尾追加数据后的其余行）不会重复存储。
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+SNAPSHOTS_ENABLED = os.environ.get("DP_SNAPSHOTS", "1").strip() != "0"
+SNAPSHOT_CHUNK_MASK = 0xFF
+SNAPSHOT_CHUNK_MAX_ROWS = 2048
+SNAPSHOT_LIST_LIMIT = 1000
+_SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (digest TEXT PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    job TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_fingerprint TEXT NOT NULL,
+    run_key TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_run ON versions (run_key, digest);
+CREATE INDEX IF NOT EXISTS versions_job ON versions (job, created_at);
+CREATE TABLE IF NOT EXISTS version_outputs (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    name TEXT NOT NULL,
+    header TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    chunks TEXT NOT NULL,
+    PRIMARY KEY (version_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS version_outputs_name ON version_outputs (name);
+"""
+
+
+def _snapshot_connect() -> sqlite3.Connection:
+    # WAL：工作进程写入新版本时，查询接口的读取不被阻塞。
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(SNAPSHOT_DIR / "snapshots.sqlite", timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SNAPSHOT_SCHEMA)
+    return connection
+
+
+def _input_fingerprint() -> str:
+    # 与 file_fingerprint 相同的口径（修改时间 + 大小），覆盖 input/ 下的全部文件（含 indices/ 子目录）。
+    digest = hashlib.sha256()
+    if INPUT_DIR.exists():
+        for path in sorted(INPUT_DIR.rglob("*")):
+            if path.is_file() and not path.name.startswith("~$"):
+                stat = path.stat()
+                digest.update(f"{path.relative_to(INPUT_DIR).as_posix()}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _snapshot_value(value: object) -> object:
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float) and math.isfinite(value):
+        return round_for_output(value)
+    return cell_to_text(value)
+
+
+class _SnapshotRecorder:
+    def __init__(self, job: str, payload: dict[str, object]) -> None:
+        self.job = job
+        self.params = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        self.input_fingerprint = _input_fingerprint()
+        self.outputs: dict[str, tuple[list[object], int, list[list[str]]]] = {}
+        self.error: str | None = None
+        self._connection: sqlite3.Connection | None = None
+        # 流水线中相互独立的任务在线程池中并发写出，共用同一个记录器与连接。
+        self._lock = threading.Lock()
+
+    def _store_chunk(self, rows: list[str]) -> list[str]:
+        # 返回 [摘要, 首行首列, 末行首列]；首列（通常为日期）用于按区间查询时跳过无关的块。
+        data = ("[" + ",".join(rows) + "]").encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = zlib.compress(data, 6)
+        with self._lock:
+            if self._connection is None:
+                self._connection = _snapshot_connect()
+            self._connection.execute("INSERT OR IGNORE INTO chunks (digest, data) VALUES (?, ?)", (digest, compressed))
+        keys = [json.loads(rows[0])[0], json.loads(rows[-1])[0]]
+        return [digest, *("" if key is None else str(key) for key in keys)]
+
+    @contextmanager
+    def sink(self, name: str) -> Iterator[Callable[[Sequence[object]], None]]:
+        header: list[object] | None = None
+        pending: list[str] = []
+        chunks: list[list[str]] = []
+        row_count = 0
+
+        def append(row: Sequence[object]) -> None:
+            nonlocal header, row_count
+            if self.error is not None:
+                return
+            encoded = [_snapshot_value(value) for value in row]
+            if header is None:
+                header = encoded
+                return
+            text = json.dumps(encoded, ensure_ascii=False, allow_nan=False)
+            pending.append(text)
+            row_count += 1
+            if zlib.crc32(text.encode("utf-8")) & SNAPSHOT_CHUNK_MASK == 0 or len(pending) >= SNAPSHOT_CHUNK_MAX_ROWS:
+                try:
+                    chunks.append(self._store_chunk(pending))
+                except sqlite3.Error as exc:
+                    self.error = str(exc)
+                pending.clear()
+
+        yield append
+        if self.error is None:
+            try:
+                if pending:
+                    chunks.append(self._store_chunk(pending))
+                self.outputs[name] = (header or [], row_count, chunks)
+            except sqlite3.Error as exc:
+                self.error = str(exc)
+
+    def commit(self) -> int | None:
+        # 同一任务、参数、输入下输出完全相同的版本已存在时不再追加，返回已有版本号。
+        if self.error is not None or not self.outputs:
+            self.close()
+            return None
+        run_key = hashlib.sha256(f"{self.job}\0{self.params}\0{self.input_fingerprint}".encode("utf-8")).hexdigest()
+        manifest = json.dumps(
+            [[name, header, count, [chunk[0] for chunk in chunks]] for name, (header, count, chunks) in sorted(self.outputs.items())],
+            ensure_ascii=False,
         )
-    return out
-
-def _process_data_pe(source_path: Path) -> list[tuple[dt.date, float, float]]:
-    workbook = openpyxl.load_workbook(source_path, data_only=True, read_only=True)
-    sheet_name = workbook.sheetnames[0] if workbook.sheetnames else None
-    if not sheet_name:
-        raise ValueError("data_PE：未找到可用工作表")
-    sheet = workbook[sheet_name]
-
-    last_col = 8
-    rows_iter = _iter_rows_values(sheet, last_col=last_col)
-    header = next(rows_iter, None)
-    if not header:
-        raise ValueError("data_PE：未找到标题行")
-
-    _validate_expected_header(header[0], "日期", "A1")
-    _validate_expected_header(header[3], "PE-TTM-S", "D1")
-    _validate_expected_header(header[7], "收盘点位", "H1")
-
-    fill_dates = [
-        "2018-08-03",
-        "2018-08-06",
-        "2018-08-07",
-        "2018-08-08",
-        "2018-08-09",
-        "2018-08-10",
-        "2018-08-13",
-        "2018-08-14",
-        "2018-08-15",
-        "2018-08-16",
-        "2018-08-17",
-        "2018-08-20",
-        "2018-08-21",
-        "2018-08-22",
-        "2018-08-23",
-        "2018-08-24",
-    ]
-    fill_values = [
-        3892.88,
-        3828.14,
-        3933.12,
-        3871.35,
-        3963.8,
-        3979.61,
-        3978.56,
-        3962.88,
-        3876.46,
-        3846.75,
-        3785.01,
-        3814.7,
-        3870.75,
-        3838.79,
-        3856.65,
-        3854.99,
-    ]
-    fill_close_by_date = {
-        dt.date.fromisoformat(date): value for date, value in zip(fill_dates, fill_values)
+        digest = hashlib.sha256(manifest.encode("utf-8")).hexdigest()
+        try:
+            connection = self._connection or _snapshot_connect()
+            self._connection = connection
+            with connection:
+                existing = connection.execute(
+                    "SELECT id FROM versions WHERE run_key = ? AND digest = ? ORDER BY id LIMIT 1", (run_key, digest)
+                ).fetchone()
+                if existing is not None:
+                    return int(existing[0])
+                cursor = connection.execute(
+                    "INSERT INTO versions (created_at, job, params, input_fingerprint, run_key, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        dt.datetime.now().isoformat(timespec="seconds"),
+                        self.job,
+                        self.params,
+                        self.input_fingerprint,
+                        run_key,
+                        digest,
+                    ),
+                )
+                version_id = int(cursor.lastrowid or 0)
+                connection.executemany(
+                    "INSERT INTO version_outputs (version_id, name, header, row_count, chunks) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (version_id, name, json.dumps(header, ensure_ascii=False), count, json.dumps(chunks, ensure_ascii=False))
+                        for name, (header, count, chunks) in self.outputs.items()
+                    ],
+                )
+                return version_id
+        except sqlite3.Error as exc:
+            self.error = str(exc)
+            return None
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+_snapshot_recorder: ContextVar[_SnapshotRecorder | None] = ContextVar("snapshot_recorder", default=None)
+
+
+def _snapshot_name(csv_path: Path) -> str:
+    try:
+        return csv_path.relative_to(OUTPUT_DIR).as_posix()
+    except ValueError:
+        return csv_path.name
+
+
+def _snapshot_versions(
+    *, job: str | None = None, output: str | None = None, fingerprint: str | None = None, as_of: str | None = None, limit: int = 50
+) -> list[dict[str, object]]:
+    # 新版本在前；as_of 为日期时取当天结束前的版本。
+    conditions: list[str] = []
+    params: list[object] = []
+    if job:
+        conditions.append("job = ?")
+        params.append(job)
+    if fingerprint:
+        conditions.append("input_fingerprint = ?")
+        params.append(fingerprint)
+    if output:
+        conditions.append("id IN (SELECT version_id FROM version_outputs WHERE name = ?)")
+        params.append(output)
+    if as_of:
+        conditions.append("created_at <= ?")
+        params.append(as_of + "T23:59:59" if len(as_of) == 10 else as_of)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    connection = _snapshot_connect()
+    try:
+        versions = connection.execute(
+            f"SELECT id, created_at, job, params, input_fingerprint FROM versions {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        result: list[dict[str, object]] = []
+        for version_id, created_at, job_name, params_text, input_fingerprint in versions:
+            outputs = connection.execute(
+                "SELECT name, row_count FROM version_outputs WHERE version_id = ? ORDER BY name", (version_id,)
+            ).fetchall()
+            result.append(
+                {
+                    "id": version_id,
+                    "created_at": created_at,
+                    "job": job_name,
+                    "params": json.loads(params_text),
+                    "input_fingerprint": input_fingerprint,
+                    "outputs": [{"name": name, "rows": row_count} for name, row_count in outputs],
+                }
+            )
+        return result
+    finally:
+        connection.close()
+
+
+def _snapshot_rows(
+    version_id: int, name: str, *, start: str | None = None, end: str | None = None
+) -> dict[str, object]:
+    # 读取某个版本的一张表；start/end 按首列（日期）过滤，只解压与区间相交的块。
+    connection = _snapshot_connect()
+    try:
+        found = connection.execute(
+            "SELECT v.created_at, v.job, o.header, o.row_count, o.chunks FROM version_outputs o "
+            "JOIN versions v ON v.id = o.version_id WHERE o.version_id = ? AND o.name = ?",
+            (version_id, name),
+        ).fetchone()
+        if found is None:
+            raise FileNotFoundError(f"快照不存在：版本 {version_id} 中没有 {name}")
+        created_at, job_name, header_text, row_count, chunks_text = found
+        rows: list[object] = []
+        for digest, first_key, last_key in json.loads(chunks_text):
+            if (start and last_key < start) or (end and first_key > end):
+                continue
+            data = connection.execute("SELECT data FROM chunks WHERE digest = ?", (digest,)).fetchone()
+            if data is None:
+                raise ValueError(f"快照数据损坏：缺少数据块 {digest[:12]}")
+            for row in json.loads(zlib.decompress(data[0])):
+                key = "" if row[0] is None else str(row[0])
+                if (start and key < start) or (end and key > end):
+                    continue
+                rows.append(row)
+    finally:
+        connection.close()
+    return {
+        "version": version_id,
+        "created_at": created_at,
+        "job": job_name,
+        "output": name,
+        "header": json.loads(header_text),
+        "total_rows": row_count,
+        "rows": rows,
     }
 
-    rows: list[tuple[dt.date, float, float]] = []
-    for row_index, values in enumerate(rows_iter, start=2):
-        if all(value is None or (isinstance(value, str) and not value.strip()) for value in values):
-            continue
 
-        date = _parse_date(values[0], epoch=workbook.epoch)
-        try:
-            pe = _coerce_float(values[3])
-        except ValueError as exc:
-            raise ValueError(f"data_PE D{row_index} 内容错误：{exc}") from exc
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise SystemExit(f"环境变量 {name} 必须为整数") from exc
+    if value <= 0:
+        raise SystemExit(f"环境变量 {name} 必须为正整数")
+    return value
+
+
+# 执行后端：inline 在请求线程内计算；process 把任务提交到常驻工作进程池，
+# 计算与 CSV 写出都在工作进程内完成，只把很小的结果摘要传回 Web 线程。
+EXECUTION_BACKEND = os.environ.get("DP_BACKEND", "inline").strip().lower() or "inline"
+EXECUTION_WORKERS = _env_int("DP_WORKERS", os.cpu_count() or 1)
+# 每个计算接口同时运行的任务上限，避免多个温度计合并同时抢占全部 CPU；
+# 等待名额最多 JOB_SLOT_WAIT_SECONDS（很短，繁忙时尽快返回 503，不长时间占用 HTTP 线程），
+# 任务执行受 JOB_TIMEOUT_SECONDS 限制；执行超时的任务在真正结束前仍占用名额。
+JOB_CONCURRENCY = _env_int("DP_JOB_CONCURRENCY", max(1, EXECUTION_WORKERS // 2))
+JOB_SLOT_WAIT_SECONDS = _env_int("DP_SLOT_WAIT", 5)
+JOB_TIMEOUT_SECONDS = _env_int("DP_JOB_TIMEOUT", 300)
+
+_Job = Callable[[dict[str, object]], dict[str, object]]
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+# 每个任务最近一次成功运行的参数，输入变化后由监视线程按原参数重算。
+_last_payloads: dict[str, dict[str, object]] = {}
+
+
+def _init_worker(input_dir: str, output_dir: str, snapshot_dir: str, series_store_dir: str) -> None:
+    global INPUT_DIR, OUTPUT_DIR, SNAPSHOT_DIR, SERIES_STORE_DIR
+    INPUT_DIR = Path(input_dir)
+    OUTPUT_DIR = Path(output_dir)
+    SNAPSHOT_DIR = Path(snapshot_dir)
+    SERIES_STORE_DIR = Path(series_store_dir)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+
+            _process_pool = ProcessPoolExecutor(
+                max_workers=EXECUTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(str(INPUT_DIR), str(OUTPUT_DIR), str(SNAPSHOT_DIR), str(SERIES_STORE_DIR)),
+            )
+            atexit.register(shutdown_execution_backend, wait=False)
+        return _process_pool
 
-        close_value = values[7]
-        if date in fill_close_by_date and (
-            close_value is None or (isinstance(close_value, str) and not close_value.strip())
-        ):
-            close_value = fill_close_by_date[date]
+
+def _execute_job(job: _Job, payload: dict[str, object]) -> dict[str, object]:
+    # 在当前进程内执行任务；启用快照时任务写出的表同时记入快照库，任务成功后提交为一个版本。
+    # 快照库出错不影响任务本身，只在结果中附带 snapshot_error。
+    if not SNAPSHOTS_ENABLED:
+        return job(payload)
+    recorder = _SnapshotRecorder(job.__name__.removeprefix("_job_"), payload)
+    token = _snapshot_recorder.set(recorder)
+    try:
+        result = job(payload)
+    except BaseException:
+        recorder.close()
+        raise
+    finally:
+        _snapshot_recorder.reset(token)
+    version_id = recorder.commit()
+    if version_id is not None:
+        result["snapshot_version"] = version_id
+    elif recorder.error is not None:
+        result["snapshot_error"] = recorder.error
+    return result
+
+
+class _WorkerPoolBroken(RuntimeError):
+    # 工作进程异常退出（如内存不足被杀），本次任务失败；进程池已丢弃，重试时自动重建。
+    def __init__(self) -> None:
+        super().__init__("计算进程异常退出，已重启工作进程池，请重试")
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    # 进程池一旦损坏就不可再用：只丢弃仍在使用的这一个（并发请求可能已换上新池），下次提交时重建。
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_inline(job: _Job, payload: dict[str, object]) -> dict[str, object]:
+    pool = _process_pool
+    try:
+        return _execute_job(job, payload)
+    except RuntimeError as exc:
+        # 内联任务也可能把分卷解析或情景计算分发到进程池；BrokenProcessPool 是 RuntimeError 的子类，
+        # 只在进程池存在时才导入比较，纯内联任务不加载 concurrent.futures。
+        pool = pool or _process_pool
+        if pool is None:
+            raise
+        from concurrent.futures.process import BrokenProcessPool
+
+        if not isinstance(exc, BrokenProcessPool):
+            raise
+        _discard_process_pool(pool)
+        raise _WorkerPoolBroken() from exc
+
+
+class _JobStillRunning(TimeoutError):
+    # 执行超时时任务已在工作进程中运行：运行中的任务无法取消，调用方据 future 判断它何时真正结束。
+    def __init__(self, future: Future[dict[str, object]]) -> None:
+        super().__init__(f"计算超时（超过 {JOB_TIMEOUT_SECONDS} 秒）")
+        self.future = future
+
+
+def _run_in_process_pool(job: _Job, payload: dict[str, object]) -> dict[str, object]:
+    # 超时只保证调用方在 JOB_TIMEOUT_SECONDS 内得到 TimeoutError：仍在排队的任务被取消；
+    # 已开始的任务会在工作进程中继续算完并照常写出输出，此时抛出 _JobStillRunning。
+    # 工作进程异常退出时丢弃损坏的进程池并抛出 _WorkerPoolBroken，后续请求使用重建的进程池。
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool = _get_process_pool()
+    try:
+        future = pool.submit(_execute_job, job, payload)
         try:
-            close = _coerce_float(close_value)
-        except ValueError as exc:
-            raise ValueError(f"data_PE H{row_index} 内容错误：{exc}") from exc
+            return future.result(timeout=JOB_TIMEOUT_SECONDS)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            raise _JobStillRunning(future) from None
+    except BrokenProcessPool as exc:
+        _discard_process_pool(pool)
+        raise _WorkerPoolBroken() from exc
 
-        if pe <= 0:
-            raise ValueError(f"data_PE D{row_index} 内容错误：PE 必须为正数")
 
-        rows.append((date, pe, close))
+def shutdown_execution_backend(*, wait: bool = True) -> None:
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
 
-    if not rows:
-        raise ValueError("data_PE：没有可用数据行")
 
-    rows.sort(key=lambda item: item[0])
-    return rows
+EXECUTION_BACKENDS: dict[str, Callable[[_Job, dict[str, object]], dict[str, object]]] = {
+    "inline": _run_inline,
+    "process": _run_in_process_pool,
+}
+if EXECUTION_BACKEND not in EXECUTION_BACKENDS:
+    raise SystemExit(f"环境变量 DP_BACKEND 不合法：{EXECUTION_BACKEND}（可选：{'/'.join(EXECUTION_BACKENDS)}）")
 
 
-def _process_data_bond(source_path: Path) -> list[tuple[dt.date, float, float]]:
-    workbook = openpyxl.load_workbook(source_path, data_only=True, read_only=True)
-    sheet_name = workbook.sheetnames[0] if workbook.sheetnames else None
-    if not sheet_name:
-        raise ValueError("data_bond：未找到可用工作表")
-    sheet = workbook[sheet_name]
+def _input_files() -> list[str]:
+    if not INPUT_DIR.exists():
+        return []
+    return sorted(
+        p.name
+        for p in INPUT_DIR.iterdir()
+        if p.is_file() and p.suffix.lower() in INPUT_SUFFIXES
+        if not p.name.startswith("~$")
+    )
 
-    last_col = 5
-    rows_iter = _iter_rows_values(sheet, last_col=last_col)
-    header = next(rows_iter, None)
-    if not header:
-        raise ValueError("data_bond：未找到标题行")
 
-    _validate_expected_header(header[0], "日期", "A1")
-    _validate_expected_header(header[4], "十年期收益率", "E1")
+def _checked_input_name(filename: object) -> str:
+    # 只接受 input/ 下的文件名（不含目录）。
+    if not filename:
+        raise ValueError("缺少文件名")
+    safe_name = Path(str(filename)).name
+    if safe_name != filename or Path(safe_name).suffix.lower() not in INPUT_SUFFIXES or safe_name.startswith("~$"):
+        raise ValueError("文件名不合法")
+    if not (INPUT_DIR / safe_name).exists():
+        raise FileNotFoundError("文件不存在")
+    return safe_name
+
+
+def _job_convert(payload: dict[str, object]) -> dict[str, object]:
+    # 与流水线的输出任务相同：源文件、参数与代码都未变化且上次的输出未被改动时直接返回上次的结果。
+    force = _payload_bool(payload, "force", False)
+    formats = _payload_formats(payload, default=("csv", "xlsx"))
+    source_path = INPUT_DIR / str(payload["filename"])
+    state_name = f"convert:{source_path.name}"
+    fingerprint = _output_fingerprint(
+        state_name, {key: value for key, value in payload.items() if key != "force"}, [file_fingerprint(source_path)]
+    )
+    previous = None if force else _pipeline_up_to_date(state_name, fingerprint)
+    if previous is not None:
+        return {**previous, "up_to_date": True}
 
-    rows: list[tuple[dt.date, float, float]] = []
-    for row_index, values in enumerate(rows_iter, start=2):
-        if all(value is None or (isinstance(value, str) and not value.strip()) for value in values):
-            continue
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    output_csv_path = OUTPUT_DIR / f"{source_path.stem}.csv"
+    output_xlsx_path = OUTPUT_DIR / f"{source_path.stem}_processed.xlsx"
+    output_files = process_xlsx_to_outputs(source_path, output_csv_path, output_xlsx_path, formats)
+    result: dict[str, object] = {
+        "output_csv": _csv_output(output_csv_path.name, formats),
+        "output_xlsx": output_xlsx_path.name if "xlsx" in formats else None,
+        "output_files": output_files,
+    }
+    _record_pipeline_state(state_name, fingerprint, result)
+    return result
 
-        date = _parse_date(values[0], epoch=workbook.epoch)
+
+def _payload_int(payload: dict[str, object], name: str, *, min_value: int, max_value: int) -> int:
+    raw = payload.get(name)
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            raise ValueError(f"缺少参数：{name}")
         try:
-            yield_raw = _coerce_float(values[4])
+            raw = int(raw)
         except ValueError as exc:
-            raise ValueError(f"data_bond E{row_index} 内容错误：{exc}") from exc
-
-        rows.append((date, yield_raw, _normalize_yield(yield_raw)))
+            raise ValueError(f"{name} 必须为整数") from exc
+    if not isinstance(raw, int):
+        raise ValueError(f"{name} 必须为整数")
+    if raw < min_value or raw > max_value:
+        raise ValueError(f"{name} 超出范围（{min_value}-{max_value}）")
+    return raw
+
+
+def _payload_float(payload: dict[str, object], name: str, *, min_value: float, max_value: float) -> float:
+    raw = payload.get(name)
+    if isinstance(raw, str):
+        raw = raw.strip()
+    try:
+        value = float(raw)  # type: ignore[arg-type]
+    except Exception as exc:
+        raise ValueError(f"{name} 必须为数值") from exc
+    if not min_value <= value <= max_value:
+        raise ValueError(f"{name} 超出范围（{min_value:g}-{max_value:g}）")
+    return value
 
-    if not rows:
-        raise ValueError("data_bond：没有可用数据行")
 
-    rows.sort(key=lambda item: item[0])
-    return rows
+def _payload_weight(payload: dict[str, object], name: str) -> float:
+    return _payload_float(payload, name, min_value=0, max_value=100)
 
 
-def _merge_by_bond_dates(
-    bond_rows: list[tuple[dt.date, float, float]],
-    pe_rows: list[tuple[dt.date, float, float]],
-) -> list[tuple[dt.date, float, float, float]]:
-    merged: list[tuple[dt.date, float, float, float]] = []
-    pe_index = 0
+def _payload_bool(payload: dict[str, object], name: str, default: bool) -> bool:
+    raw = payload.get(name)
+    if raw is None:
+        return default
+    if isinstance(raw, bool):
+        return raw
+    if isinstance(raw, str):
+        text = raw.strip().lower()
+        if text in ("1", "true", "yes", "y", "on"):
+            return True
+        if text in ("0", "false", "no", "n", "off"):
+            return False
+    raise ValueError(f"{name} 必须为布尔值")
+
+
+def _payload_smoothing(payload: dict[str, object], name: str) -> str:
+    raw = payload.get(name)
+    if raw is None:
+        return "sma"
+    if not isinstance(raw, str) or raw.strip().lower() not in SMOOTHERS:
+        raise ValueError(f"{name} 必须为 {'/'.join(SMOOTHERS)} 之一")
+    return raw.strip().lower()
+
+
+def _report_exact_fallback(result: dict[str, object], max_error: float, windows: Sequence[int]) -> None:
+    # 近似模式下窗口太短、实际按精确分位计算时，在结果中说明原因，而不是只报告为 0 的误差上界。
+    reason = exact_fallback_reason(max_error, windows)
+    if reason is not None:
+        result["percentile_exact_fallback"] = reason
+
+
+def _payload_percentile_error(payload: dict[str, object]) -> float | None:
+    # percentile_mode=approx 时返回允许的分位误差（分位点，默认 1），精确模式返回 None。
+    mode = payload.get("percentile_mode")
+    if mode is None or (isinstance(mode, str) and mode.strip().lower() == "exact"):
+        return None
+    if not isinstance(mode, str) or mode.strip().lower() != "approx":
+        raise ValueError("percentile_mode 必须为 exact/approx 之一")
+    raw = payload.get("percentile_max_error", 1.0)
+    if isinstance(raw, str):
+        raw = raw.strip()
+    try:
+        value = float(raw)  # type: ignore[arg-type]
+    except Exception as exc:
+        raise ValueError("percentile_max_error 必须为数值") from exc
+    if not 0 < value <= PERCENTILE_MAX_ERROR_LIMIT:
+        raise ValueError(f"percentile_max_error 超出范围（0-{PERCENTILE_MAX_ERROR_LIMIT:g}）")
+    return value
 
-    for bond_date, bond_yield_raw, bond_yield_decimal in bond_rows:
-        while pe_index < len(pe_rows) and pe_rows[pe_index][0] < bond_date:
-            pe_index += 1
 
-        if pe_index >= len(pe_rows):
-            raise ValueError("合并失败：data_PE 数据不足，无法继续对齐日期")
+def _payload_formats(payload: dict[str, object], default: Sequence[str] = ("csv",)) -> tuple[str, ...]:
+    raw = payload.get("output_formats")
+    if raw is None:
+        return tuple(default)
+    if isinstance(raw, str):
+        items = raw.split(",")
+    elif isinstance(raw, list) and all(isinstance(item, str) for item in raw):
+        items = raw
+    else:
+        raise ValueError("output_formats 必须为格式列表或逗号分隔的字符串")
+    formats = tuple(dict.fromkeys(item.strip().lower() for item in items if item.strip()))
+    if not formats:
+        raise ValueError("output_formats 不能为空")
+    check_output_formats(formats)
+    return formats
+
+
+def _task_erp(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    formats = _payload_formats(payload)
+    pe_rows: list[tuple[dt.date, float, float]] = values["pe_rows"]  # type: ignore[assignment]
+    bond_rows: list[tuple[dt.date, float, float]] = values["bond_rows"]  # type: ignore[assignment]
+    merged_rows: list[tuple[dt.date, float, float, float]] = values["merged_rows"]  # type: ignore[assignment]
+
+    pe_clean_rows: list[list[object]] = [["日期", "PE-TTM-S", "全A点位"]] + [
+        [date.isoformat(), pe, close] for date, pe, close in pe_rows
+    ]
+    bond_clean_rows: list[list[object]] = [["日期", "十年国债收益率"]] + [
+        [date.isoformat(), yield_raw] for date, yield_raw, _ in bond_rows
+    ]
+    merged_clean_rows: list[list[object]] = [["日期", "十年国债收益率", "PE-TTM-S", "全A点位"]] + [
+        [date.isoformat(), yield_raw, pe, close] for date, yield_raw, pe, close in merged_rows
+    ]
+    erp_rows: list[list[object]] = values["erp_rows"]  # type: ignore[assignment]
 
-        pe_date, pe_value, pe_close = pe_rows[pe_index]
-        if pe_date >= bond_date:
-            merged.append((bond_date, bond_yield_raw, pe_value, pe_close))
-            pe_index += 1
-            continue
+    output = {
+        "data_PE_clean": "data_PE_clean.csv",
+        "data_bond_clean": "data_bond_clean.csv",
+        "merged": "merged.csv",
+        "erp": "ERP.csv",
+    }
 
-    if not merged:
-        raise ValueError("合并失败：未生成任何对齐行")
+    output_files = _write_output_tables(
+        [
+            (pe_clean_rows, OUTPUT_DIR / output["data_PE_clean"]),
+            (bond_clean_rows, OUTPUT_DIR / output["data_bond_clean"]),
+            (merged_clean_rows, OUTPUT_DIR / output["merged"]),
+            (erp_rows, OUTPUT_DIR / output["erp"]),
+        ],
+        formats,
+    )
 
-    return merged
+    return {
+        "outputs": {
+            "data_PE_clean_csv": _csv_output(output["data_PE_clean"], formats),
+            "data_bond_clean_csv": _csv_output(output["data_bond_clean"], formats),
+            "merged_csv": _csv_output(output["merged"], formats),
+            "erp_csv": _csv_output(output["erp"], formats),
+        },
+        "output_files": output_files,
+    }
 
 
-def _compute_erp_rows(
-    merged_rows: list[tuple[dt.date, float, float, float]],
-    bond_rows: list[tuple[dt.date, float, float]],
-) -> list[list[object]]:
-    bond_decimal_by_date = {date: decimal for date, _, decimal in bond_rows}
-    output: list[list[object]] = [["日期", "十年国债收益率", "PE-TTM-S", "全A点位", "股权风险溢价"]]
+def _task_erp_10year(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    formats = _payload_formats(payload)
+    bands_rows = iter_erp_rolling_bands(_erp_series_table(values["erp_series"]), window=2000)  # type: ignore[arg-type]
 
-    for date, yield_raw, pe_value, close_value in merged_rows:
-        bond_yield_decimal = bond_decimal_by_date.get(date)
-        if bond_yield_decimal is None:
-            raise ValueError("内部错误：未找到收益率小数值")
-        erp = (1.0 + 1.0 / pe_value) / (1.0 + bond_yield_decimal) - 1.0
-        output.append([date.isoformat(), yield_raw, pe_value, close_value, erp])
+    csv_name = "ERP_10Year.csv"
+    output_files = _write_outputs(bands_rows, OUTPUT_DIR / csv_name, formats)
 
-    return output
+    return {"output_csv": _csv_output(csv_name, formats), "output_files": output_files}
 
 
-def _write_csv(rows: list[list[object]], path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8-sig", newline="") as file_handle:
-        writer = csv.writer(file_handle)
-        for row in rows:
-            writer.writerow([_cell_to_text(value) for value in row])
+def _task_erp_rolling(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    n = payload.get("n")
 
+    if isinstance(n, str):
+        try:
+            n = int(n.strip())
+        except ValueError as exc:
+            raise ValueError("n 必须为整数") from exc
+    if not isinstance(n, int):
+        raise ValueError("n 必须为整数")
+    if n < 1 or n > 4000:
+        raise ValueError("n 超出范围（1-4000）")
+
+    max_error = _payload_percentile_error(payload)
+    formats = _payload_formats(payload)
+    bands_rows = iter_erp_rolling_bands(
+        _erp_series_table(values["erp_series"]),  # type: ignore[arg-type]
+        window=n,
+        include_percentile=True,
+        max_error=max_error,
+    )
 
-def _write_xlsx(rows: list[list[object]], path: Path, sheet_title: str) -> None:
-    workbook_out = openpyxl.Workbook()
-    sheet_out = workbook_out.active
-    sheet_out.title = sheet_title
-    sheet_out.freeze_panes = "B2"
-    for row in rows:
-        sheet_out.append([_round_for_output(value) for value in row])
-    path.parent.mkdir(parents=True, exist_ok=True)
-    workbook_out.save(path)
+    csv_name = "ERP_Rolling Calculation.csv"
+    output_files = _write_outputs(bands_rows, OUTPUT_DIR / csv_name, formats)
 
+    result: dict[str, object] = {"output_csv": _csv_output(csv_name, formats), "output_files": output_files, "n": n}
+    if max_error is not None:
+        # 中位数的误差以秩计：所取值在窗口中的排位与真实中位数相差不超过该百分比。
+        result["percentile_error_bound"] = percentile_error_bounds(max_error, erp=n)["erp"]
+        result["median_rank_error_bound"] = median_rank_error_bound(n, max_error)
+        _report_exact_fallback(result, max_error, [n])
+    return result
 
-def _process_ratio_file(source_path: Path, *, metric_header: str) -> list[list[object]]:
-    workbook = openpyxl.load_workbook(source_path, data_only=True, read_only=True)
-    sheet_name = workbook.sheetnames[0] if workbook.sheetnames else None
-    if not sheet_name:
-        raise ValueError(f"{source_path.name}：未找到可用工作表")
-    sheet = workbook[sheet_name]
 
-    last_col = 4  # A-D
-    rows_iter = _iter_rows_values(sheet, last_col=last_col)
-    header = next(rows_iter, None)
-    if not header:
-        raise ValueError(f"{source_path.name}：未找到标题行")
+def _task_erp_interval(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    start_date_raw = payload.get("start_date")
+    end_date_raw = payload.get("end_date")
 
-    header_a = _validate_header_cell(header[0])
-    _ = _validate_header_cell(header[3])
-    if "日期" not in header_a and header_a.lower() != "date":
-        raise ValueError(f"{source_path.name}：A1 标题应为“日期”")
+    if not isinstance(start_date_raw, str) or not start_date_raw.strip():
+        raise ValueError("缺少起始日期 start_date")
+    try:
+        start_date = dt.date.fromisoformat(start_date_raw.strip())
+    except ValueError as exc:
+        raise ValueError("起始日期格式必须为 YYYY-MM-DD") from exc
 
-    rows: list[tuple[dt.date, float]] = []
-    for row_index, values in enumerate(rows_iter, start=2):
+    if end_date_raw is None or (isinstance(end_date_raw, str) and not end_date_raw.strip()):
+        end_date = dt.date.today()
+    else:
+        if not isinstance(end_date_raw, str):
+            raise ValueError("终止日期格式必须为 YYYY-MM-DD")
         try:
-            date = _parse_date(values[0], epoch=workbook.epoch)
-            ratio = _coerce_float(values[3])
-            rows.append((date, ratio))
-        except Exception:
-            continue
-
-    if not rows:
-        raise ValueError(f"{source_path.name}：清洗后没有可用数据行")
-
-    rows.sort(key=lambda item: item[0])
-    output: list[list[object]] = [[header_a, metric_header]]
-    output.extend([[date.isoformat(), ratio] for date, ratio in rows])
-    return output
-
-def _rolling_median(sorted_window: list[float]) -> float:
-    size = len(sorted_window)
-    if size == 0:
-        raise ValueError("窗口为空")
-    mid = size // 2
-    if size % 2 == 1:
-        return float(sorted_window[mid])
-    return (float(sorted_window[mid - 1]) + float(sorted_window[mid])) / 2.0
-
-
-def _rolling_stddevp(sum_values: float, sum_squares: float, size: int) -> float:
-    if size <= 0:
-        raise ValueError("窗口为空")
-    mean = sum_values / size
-    variance = (sum_squares / size) - (mean * mean)
-    if variance < 0 and variance > -1e-12:
-        variance = 0.0
-    if variance < 0:
-        raise ValueError("方差为负数（数值异常）")
-    return math.sqrt(variance)
-
-
-def _compute_erp_rolling_bands(
-    erp_rows: list[list[object]],
-    *,
-    window_size: int = 2000,
-    include_percentile: bool = False,
-) -> list[list[object]]:
-    if not isinstance(window_size, int) or window_size <= 0:
-        raise ValueError("滚动窗口 n 必须为正整数")
-    if not erp_rows or len(erp_rows) < 2:
-        raise ValueError("ERP 数据为空")
-
-    header = erp_rows[0]
-    if len(header) < 5 or header[4] != "股权风险溢价":
-        raise ValueError("ERP 表头不符合预期")
-
-    data_rows = erp_rows[1:]
-    if len(data_rows) < window_size:
-        raise ValueError(f"数据不足：至少需要 {window_size} 行交易日数据")
-
-    header = ["日期", "十年国债收益率", "PE-TTM-S", "全A点位", "股权风险溢价"]
-    if include_percentile:
-        header.append("股权风险溢价分位")
-    header.extend(["+2σ", "+1σ", "中位数", "-1σ", "-2σ"])
-    output: list[list[object]] = [header]
-
-    sorted_window: list[float] = []
-    queue: deque[float] = deque()
-    sum_values = 0.0
-    sum_squares = 0.0
-
-    for index, row in enumerate(data_rows):
-        erp_value = row[4]
-        if not isinstance(erp_value, (int, float)):
-            raise ValueError(f"ERP 第 {index + 2} 行数值类型不合法")
-        erp_float = float(erp_value)
-
-        insort(sorted_window, erp_float)
-        queue.append(erp_float)
-        sum_values += erp_float
-        sum_squares += erp_float * erp_float
-
-        if len(queue) > window_size:
-            leaving = queue.popleft()
-            sum_values -= leaving
-            sum_squares -= leaving * leaving
-            remove_index = bisect_left(sorted_window, leaving)
-            if remove_index >= len(sorted_window) or sorted_window[remove_index] != leaving:
-                raise ValueError("内部错误：滚动窗口移除失败")
-            sorted_window.pop(remove_index)
-
-        if len(queue) < window_size:
-            continue
+            end_date = dt.date.fromisoformat(end_date_raw.strip())
+        except ValueError as exc:
+            raise ValueError("终止日期格式必须为 YYYY-MM-DD") from exc
 
-        median = _rolling_median(sorted_window)
-        stddevp = _rolling_stddevp(sum_values, sum_squares, window_size)
-        upper2 = median + 2 * stddevp
-        upper1 = median + stddevp
-        lower1 = median - stddevp
-        lower2 = median - 2 * stddevp
+    formats = _payload_formats(payload)
+    earliest, latest, interval_rows = _erp_rows_between(values["erp_series"], start_date, end_date)  # type: ignore[arg-type]
+    erp_rows = [next(iter_erp_rows(())), *interval_rows]
 
-        row_out: list[object] = [row[0], row[1], row[2], row[3], erp_float]
-        if include_percentile:
-            row_out.append(round(_rolling_percentile(sorted_window, erp_float), 1))
-        row_out.extend([upper2, upper1, median, lower1, lower2])
-        output.append(row_out)
+    earliest, latest, actual_start, actual_end, output_rows, median, stddevp = erp_interval_bands(
+        erp_rows, start_date=start_date, end_date=end_date, earliest=earliest, latest=latest
+    )
 
-    return output
+    csv_name = "ERP_Interval.csv"
+    output_files = _write_outputs(output_rows, OUTPUT_DIR / csv_name, formats)
+
+    adjusted = actual_start != start_date
+    adjusted_end = actual_end != end_date
+    return {
+        "output_csv": _csv_output(csv_name, formats),
+        "output_files": output_files,
+        "input_start_date": start_date.isoformat(),
+        "used_start_date": actual_start.isoformat(),
+        "input_end_date": end_date.isoformat(),
+        "used_end_date": actual_end.isoformat(),
+        "earliest_date": earliest.isoformat(),
+        "latest_date": latest.isoformat(),
+        "adjusted_to_trading_day": adjusted,
+        "adjusted_end_to_trading_day": adjusted_end,
+        "median": median,
+        "stddevp": stddevp,
+    }
 
 
-def _compute_erp_interval_bands(
-    erp_rows: list[list[object]],
-    *,
-    start_date: dt.date,
-    end_date: dt.date,
-) -> tuple[dt.date, dt.date, dt.date, dt.date, list[list[object]], float, float]:
-    if not erp_rows or len(erp_rows) < 2:
-        raise ValueError("ERP 数据为空")
-
-    header = erp_rows[0]
-    if len(header) < 5 or header[4] != "股权风险溢价":
-        raise ValueError("ERP 表头不符合预期")
-
-    data_rows = erp_rows[1:]
-    dates: list[dt.date] = []
-    for index, row in enumerate(data_rows, start=2):
+INDEX_SUMMARY_HEADER = [
+    "指数",
+    "起始日期",
+    "最新日期",
+    "交易日数",
+    "PE-TTM-S",
+    "指数点位",
+    "股权风险溢价",
+    "股权风险溢价分位",
+    "中位数",
+    "+2σ",
+    "-2σ",
+]
+
+
+class _ErpMatrix:
+    # 日期 × 指数的 ERP 矩阵：所有指数共用按 data_bond 日期排列的序数日期索引与收益率列，
+    # 每个指数的每个字段是一列与日期索引等长的 array('d')，不在该指数日期范围内的位置为 NaN。
+    FIELDS = ("pe", "close", "erp", "percentile", "median", "stddev")
+
+    def __init__(self, bond_rows: Iterable[tuple[dt.date, float, float]]) -> None:
+        self.ordinals = array("l")
+        self.yield_raw = array("d")
+        self.yield_decimal = array("d")
+        for date, yield_raw, yield_decimal in bond_rows:
+            self.ordinals.append(date.toordinal())
+            self.yield_raw.append(yield_raw)
+            self.yield_decimal.append(yield_decimal)
+        self.names: list[str] = []
+        self.ranges: list[tuple[int, int]] = []
+        self.columns: dict[str, list[array]] = {field: [] for field in self.FIELDS}
+
+    def _bond_rows(self, start: int, stop: int) -> Iterator[tuple[dt.date, float, float]]:
+        for position in range(start, stop):
+            yield dt.date.fromordinal(self.ordinals[position]), self.yield_raw[position], self.yield_decimal[position]
+
+    def index_columns(
+        self, name: str, pe_paths: Sequence[Path], *, window_size: int, max_error: float | None
+    ) -> tuple[int, int, dict[str, array]]:
+        # 单个指数：只把落在其 PE 日期范围内的国债日期交给 merge_by_bond_dates 做一次对齐，
+        # 再在该段上按列计算滚动中位数、标准差与分位。可在工作进程中执行，只传回几列 array。
         try:
-            dates.append(dt.date.fromisoformat(str(row[0])))
+            pe_rows = list(iter_index_pe(pe_paths, label=name, executor=_parts_executor(pe_paths)))
+            start = bisect_left(self.ordinals, pe_rows[0][0].toordinal())
+            stop = bisect_right(self.ordinals, pe_rows[-1][0].toordinal())
+            if start >= stop:
+                raise ValueError("与 data_bond 没有重叠的日期")
+            if stop - start < window_size:
+                raise ValueError(f"数据不足：至少需要 {window_size} 行交易日数据")
+
+            columns = {field: array("d", [math.nan]) * len(self.ordinals) for field in self.FIELDS}
+            pe_column, close_column, erp_column = columns["pe"], columns["close"], columns["erp"]
+            aligned = merge_by_bond_dates(self._bond_rows(start, stop), pe_rows)
+            for position, (_, _, pe_value, close_value) in enumerate(aligned, start=start):
+                pe_column[position] = pe_value
+                close_column[position] = close_value
+                erp_column[position] = erp_from_pe(pe_value, self.yield_decimal[position])
+
+            stats_iter = rolling_band_stats(
+                (erp_column[position] for position in range(start, stop)),
+                window_size,
+                include_percentile=True,
+                max_error=max_error,
+            )
+            for position, stats in enumerate(stats_iter, start=start):
+                if stats is not None:
+                    columns["median"][position], columns["stddev"][position], columns["percentile"][position] = stats  # type: ignore[assignment]
         except ValueError as exc:
-            raise ValueError(f"ERP 第 {index} 行日期无法解析") from exc
-
-    if not dates:
-        raise ValueError("ERP 数据为空")
-
-    earliest = dates[0]
-    latest = dates[-1]
-    if start_date < earliest:
-        raise ValueError(f"起始日期过早：最早日期为 {earliest.isoformat()}")
-    if start_date > latest:
-        raise ValueError(f"起始日期过晚：最近日期为 {latest.isoformat()}")
-    if end_date < earliest:
-        raise ValueError(f"终止日期过早：最早日期为 {earliest.isoformat()}")
-    if end_date > latest:
-        raise ValueError(f"终止日期过晚：最近日期为 {latest.isoformat()}")
-
-    start_index = bisect_left(dates, start_date)
-    if start_index >= len(dates):
-        raise ValueError(f"起始日期过晚：最近日期为 {latest.isoformat()}")
-
-    end_index = bisect_right(dates, end_date) - 1
-    if end_index < 0:
-        raise ValueError(f"终止日期过早：最早日期为 {earliest.isoformat()}")
-
-    actual_start = dates[start_index]
-    actual_end = dates[end_index]
-    if actual_start > actual_end:
-        raise ValueError("起始日期不能晚于终止日期（自动调整后）")
-
-    interval_rows = data_rows[start_index : end_index + 1]
-    if not interval_rows:
-        raise ValueError("区间内没有数据")
-
-    erp_values: list[float] = []
-    sum_values = 0.0
-    sum_squares = 0.0
-    for index, row in enumerate(interval_rows, start=start_index + 2):
-        value = row[4]
-        if not isinstance(value, (int, float)):
-            raise ValueError(f"ERP 第 {index} 行数值类型不合法")
-        value_float = float(value)
-        erp_values.append(value_float)
-        sum_values += value_float
-        sum_squares += value_float * value_float
-
-    sorted_values = sorted(erp_values)
-    median = _rolling_median(sorted_values)
-    stddevp = _rolling_stddevp(sum_values, sum_squares, len(erp_values))
-    upper2 = median + 2 * stddevp
-    upper1 = median + stddevp
-    lower1 = median - stddevp
-    lower2 = median - 2 * stddevp
-
-    output: list[list[object]] = [
-        [
+            raise ValueError(f"{name}：{exc}") from exc
+        return start, stop, columns
+
+    def add(self, name: str, start: int, stop: int, columns: dict[str, array]) -> None:
+        self.names.append(name)
+        self.ranges.append((start, stop))
+        for field in self.FIELDS:
+            self.columns[field].append(columns[field])
+
+    def _date_text(self, position: int) -> str:
+        return dt.date.fromordinal(self.ordinals[position]).isoformat()
+
+    def erp_rows(self, index: int) -> Iterator[list[object]]:
+        yield ["日期", "十年国债收益率", "PE-TTM-S", "指数点位", "股权风险溢价"]
+        pe_column, close_column, erp_column = (self.columns[field][index] for field in ("pe", "close", "erp"))
+        for position in range(*self.ranges[index]):
+            yield [
+                self._date_text(position),
+                self.yield_raw[position],
+                pe_column[position],
+                close_column[position],
+                erp_column[position],
+            ]
+
+    def band_rows(self, index: int) -> Iterator[list[object]]:
+        yield [
             "日期",
             "十年国债收益率",
             "PE-TTM-S",
-            "全A点位",
+            "指数点位",
             "股权风险溢价",
             "股权风险溢价分位",
             "+2σ",
@@ -909,611 +1195,1726 @@ def _compute_erp_interval_bands(
             "-1σ",
             "-2σ",
         ]
-    ]
-    for row in interval_rows:
-        erp_value = float(row[4])
-        percentile = round(_rolling_percentile(sorted_values, erp_value), 1)
-        output.append([row[0], row[1], row[2], row[3], erp_value, percentile, upper2, upper1, median, lower1, lower2])
+        pe_column, close_column, erp_column, pct_column, median_column, stddev_column = (
+            self.columns[field][index] for field in self.FIELDS
+        )
+        for position in range(*self.ranges[index]):
+            percentile = pct_column[position]
+            if math.isnan(percentile):
+                continue
+            median = median_column[position]
+            stddevp = stddev_column[position]
+            yield [
+                self._date_text(position),
+                self.yield_raw[position],
+                pe_column[position],
+                close_column[position],
+                erp_column[position],
+                round(percentile, 1),
+                median + 2 * stddevp,
+                median + stddevp,
+                median,
+                median - stddevp,
+                median - 2 * stddevp,
+            ]
+
+    def wide_rows(self, field: str, *, digits: int | None = None) -> Iterator[list[object]]:
+        # 横截面表：每个日期一行、每个指数一列；所有指数都缺失的日期不输出，单个缺失留空。
+        yield ["日期", *self.names]
+        columns = self.columns[field]
+        first = min((start for start, _ in self.ranges), default=0)
+        last = max((stop for _, stop in self.ranges), default=0)
+        for position in range(first, last):
+            values = [column[position] for column in columns]
+            if all(math.isnan(value) for value in values):
+                continue
+            yield [
+                self._date_text(position),
+                *(None if math.isnan(value) else value if digits is None else round(value, digits) for value in values),
+            ]
+
+    def summary_rows(self) -> Iterator[list[object]]:
+        yield INDEX_SUMMARY_HEADER
+        for index, name in enumerate(self.names):
+            start, stop = self.ranges[index]
+            last = stop - 1
+            pe_column, close_column, erp_column, pct_column, median_column, stddev_column = (
+                self.columns[field][index] for field in self.FIELDS
+            )
+            median = median_column[last]
+            stddevp = stddev_column[last]
+            yield [
+                name,
+                self._date_text(start),
+                self._date_text(last),
+                stop - start,
+                pe_column[last],
+                close_column[last],
+                erp_column[last],
+                round(pct_column[last], 1),
+                median,
+                median + 2 * stddevp,
+                median - 2 * stddevp,
+            ]
+
+
+def _job_indices(payload: dict[str, object]) -> dict[str, object]:
+    n = 2000 if payload.get("n") is None else _payload_int(payload, "n", min_value=1, max_value=4000)
+    max_error = _payload_percentile_error(payload)
+    formats = _payload_formats(payload)
+    indices = _discover_indices(payload.get("indices"))
+    bond_paths = _find_input_parts("data_bond")
+
+    # 十年国债收益率只解析一次，作为所有指数共用的日期索引。
+    matrix = _ErpMatrix(iter_bond(bond_paths, executor=_parts_executor(bond_paths)))
+    options = {"window_size": n, "max_error": max_error}
+
+    # 多个指数在工作进程池中并行计算各自的列（已在工作进程内时顺序计算）。
+    if len(indices) == 1 or _in_worker_process():
+        results = [matrix.index_columns(name, paths, **options) for name, paths in indices.items()]  # type: ignore[arg-type]
+    else:
+        futures = [
+            _get_process_pool().submit(matrix.index_columns, name, paths, **options)
+            for name, paths in indices.items()
+        ]
+        try:
+            results = [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    for name, (start, stop, columns) in zip(indices, results):
+        matrix.add(name, start, stop, columns)
+
+    output_dir = OUTPUT_DIR / INDICES_DIR_NAME
+    output_files: list[str] = []
+    for index, name in enumerate(matrix.names):
+        directory = output_dir / UNSAFE_FILE_CHARS.sub("_", name)
+        for rows, file_name in ((matrix.erp_rows(index), "ERP.csv"), (matrix.band_rows(index), "ERP_Rolling.csv")):
+            output_files += [
+                f"{INDICES_DIR_NAME}/{directory.name}/{written}"
+                for written in _write_outputs(rows, directory / file_name, formats)
+            ]
+
+    outputs = {
+        "summary": "Index_Summary.csv",
+        "erp_matrix": "ERP_Matrix.csv",
+        "percentile_matrix": "ERP_Percentile_Matrix.csv",
+    }
+    tables = {
+        "summary": matrix.summary_rows(),
+        "erp_matrix": matrix.wide_rows("erp"),
+        "percentile_matrix": matrix.wide_rows("percentile", digits=1),
+    }
+    for key, file_name in outputs.items():
+        output_files += [
+            f"{INDICES_DIR_NAME}/{written}" for written in _write_outputs(tables[key], output_dir / file_name, formats)
+        ]
 
-    return earliest, latest, actual_start, actual_end, output, median, stddevp
+    result: dict[str, object] = {
+        "indices": matrix.names,
+        "outputs": {
+            f"{key}_csv": f"{INDICES_DIR_NAME}/{file_name}" if "csv" in formats else None
+            for key, file_name in outputs.items()
+        },
+        "output_files": output_files,
+        "n": n,
+    }
+    if max_error is not None:
+        result["percentile_error_bound"] = percentile_error_bounds(max_error, erp=n)["erp"]
+        _report_exact_fallback(result, max_error, [n])
+    return result
+
+
+def _task_thermometer_clean(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    formats = _payload_formats(payload)
+    gdp_rows = iter_ratio_table(values["ratio_gdp_rows"], metric_header="总市值/GDP")  # type: ignore[arg-type]
+    volume_rows = iter_ratio_table(values["ratio_volume_rows"], metric_header="成交量/总市值")  # type: ignore[arg-type]
+    lend_rows = iter_ratio_table(values["ratio_securities_rows"], metric_header="融资融券/总市值")  # type: ignore[arg-type]
+
+    outputs = {
+        "ratio_gdp": "Ratio_GDP.csv",
+        "ratio_volume": "Ratio_Volume.csv",
+        "ratio_securities_lend": "Ratio_Securities_Lend.csv",
+    }
 
+    output_files = _write_output_tables(
+        [
+            (gdp_rows, OUTPUT_DIR / outputs["ratio_gdp"]),
+            (volume_rows, OUTPUT_DIR / outputs["ratio_volume"]),
+            (lend_rows, OUTPUT_DIR / outputs["ratio_securities_lend"]),
+        ],
+        formats,
+    )
 
-@app.get("/")
-def index() -> object:
-    return app.send_static_file("index.html")
+    return {
+        "outputs": {
+            "ratio_gdp_csv": _csv_output(outputs["ratio_gdp"], formats),
+            "ratio_volume_csv": _csv_output(outputs["ratio_volume"], formats),
+            "ratio_securities_lend_csv": _csv_output(outputs["ratio_securities_lend"], formats),
+        },
+        "output_files": output_files,
+    }
 
 
-@app.get("/api/files")
-def list_files() -> object:
-    if not INPUT_DIR.exists():
-        return jsonify({"files": []})
+def _task_thermometer_percentiles(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    ma_gdp = _payload_int(payload, "moving_average_gdp", min_value=1, max_value=1000)
+    rp_gdp = _payload_int(payload, "rolling_period_gdp", min_value=1, max_value=1000)
+    ma_volume = _payload_int(payload, "moving_average_volume", min_value=1, max_value=4000)
+    rp_volume = _payload_int(payload, "rolling_period_volume", min_value=1, max_value=4000)
+    ma_securities = _payload_int(payload, "moving_average_securities", min_value=1, max_value=4000)
+    rp_securities = _payload_int(payload, "rolling_period_securities", min_value=1, max_value=4000)
+    ma_erp = _payload_int(payload, "moving_erp", min_value=1, max_value=4000)
+    rp_erp = _payload_int(payload, "rolling_period_erp", min_value=1, max_value=4000)
+    smoothing_gdp = _payload_smoothing(payload, "smoothing_gdp")
+    smoothing_volume = _payload_smoothing(payload, "smoothing_volume")
+    smoothing_securities = _payload_smoothing(payload, "smoothing_securities")
+    smoothing_erp = _payload_smoothing(payload, "smoothing_erp")
+    max_error = _payload_percentile_error(payload)
+
+    formats = _payload_formats(payload)
+    gdp_dates, gdp_values = values["ratio_gdp"]  # type: ignore[misc]
+    vol_dates, vol_values = values["ratio_volume"]  # type: ignore[misc]
+    sec_dates, sec_values = values["ratio_securities"]  # type: ignore[misc]
+    erp_dates, erp_values, erp_yields, erp_pes, erp_closes = values["erp_series"]  # type: ignore[misc]
+
+    def build_output(
+        dates: list[str],
+        values: list[float],
+        *,
+        metric_header: str,
+        ma_window: int,
+        rp_window: int,
+        smoothing: str,
+    ) -> list[list[object]]:
+        ma_values, pct_values = cached_smoothed_percentiles(
+            values, ma_window=ma_window, rp_window=rp_window, smoothing=smoothing, max_error=max_error
+        )
+        out: list[list[object]] = [["日期", metric_header, "平均移动", "分位"]]
+        for index, date_text in enumerate(dates):
+            if pct_values[index] is None:
+                continue
+            out.append([date_text, values[index], ma_values[index], pct_values[index]])
+        return out
 
-    files = sorted(
-        p.name
-        for p in INPUT_DIR.iterdir()
-        if p.is_file() and p.suffix.lower() == ".xlsx"
-        if not p.name.startswith("~$")
+    gdp_out = build_output(
+        gdp_dates,
+        gdp_values,
+        metric_header="总市值/GDP",
+        ma_window=ma_gdp,
+        rp_window=rp_gdp,
+        smoothing=smoothing_gdp,
+    )
+    vol_out = build_output(
+        vol_dates,
+        vol_values,
+        metric_header="成交量/总市值",
+        ma_window=ma_volume,
+        rp_window=rp_volume,
+        smoothing=smoothing_volume,
+    )
+    sec_out = build_output(
+        sec_dates,
+        sec_values,
+        metric_header="融资融券/总市值",
+        ma_window=ma_securities,
+        rp_window=rp_securities,
+        smoothing=smoothing_securities,
     )
-    return jsonify({"files": files})
+    erp_ma_values, erp_pct_values = cached_smoothed_percentiles(
+        erp_values, ma_window=ma_erp, rp_window=rp_erp, smoothing=smoothing_erp, max_error=max_error
+    )
+    erp_out: list[list[object]] = [
+        ["日期", "股权风险溢价", "平均移动", "分位", "十年国债收益率", "PE-TTM-S", "全A点位"]
+    ]
+    for index, date_text in enumerate(erp_dates):
+        if erp_pct_values[index] is None:
+            continue
+        erp_out.append(
+            [
+                date_text,
+                erp_values[index],
+                erp_ma_values[index],
+                round(float(erp_pct_values[index]), 1),
+                erp_yields[index],
+                erp_pes[index],
+                erp_closes[index],
+            ]
+        )
 
+    outputs = {
+        "ratio_gdp": "Ratio_GDP_Percentile.csv",
+        "ratio_volume": "Ratio_Volume_Percentile.csv",
+        "ratio_securities_lend": "Ratio_Securities_Lend_Percentile.csv",
+        "erp": "ERP_Percentile.csv",
+    }
 
-@app.post("/api/convert")
-def convert_file() -> object:
-    payload = request.get_json(silent=True) or {}
-    filename = payload.get("filename")
+    output_files = _write_output_tables(
+        [
+            (gdp_out, OUTPUT_DIR / outputs["ratio_gdp"]),
+            (vol_out, OUTPUT_DIR / outputs["ratio_volume"]),
+            (sec_out, OUTPUT_DIR / outputs["ratio_securities_lend"]),
+            (erp_out, OUTPUT_DIR / outputs["erp"]),
+        ],
+        formats,
+    )
 
-    if not filename:
-        return jsonify({"error": "缺少文件名"}), 400
+    result: dict[str, object] = {
+        "outputs": {
+            "ratio_gdp_csv": _csv_output(outputs["ratio_gdp"], formats),
+            "ratio_volume_csv": _csv_output(outputs["ratio_volume"], formats),
+            "ratio_securities_lend_csv": _csv_output(outputs["ratio_securities_lend"], formats),
+            "erp_csv": _csv_output(outputs["erp"], formats),
+        },
+        "output_files": output_files,
+    }
+    if max_error is not None:
+        windows = {"gdp": rp_gdp, "volume": rp_volume, "securities": rp_securities, "erp": rp_erp}
+        result["percentile_error_bounds"] = percentile_error_bounds(max_error, **windows)
+        fallbacks = exact_fallbacks(max_error, **windows)
+        if fallbacks:
+            result["percentile_exact_fallbacks"] = fallbacks
+    return result
+
+
+def _task_thermometer_merge(values: dict[str, object], payload: dict[str, object]) -> dict[str, object]:
+    ma_gdp = _payload_int(payload, "moving_average_gdp", min_value=1, max_value=1000)
+    rp_gdp = _payload_int(payload, "rolling_period_gdp", min_value=1, max_value=1000)
+    ma_volume = _payload_int(payload, "moving_average_volume", min_value=1, max_value=4000)
+    rp_volume = _payload_int(payload, "rolling_period_volume", min_value=1, max_value=4000)
+    ma_securities = _payload_int(payload, "moving_average_securities", min_value=1, max_value=4000)
+    rp_securities = _payload_int(payload, "rolling_period_securities", min_value=1, max_value=4000)
+    ma_erp = _payload_int(payload, "moving_erp", min_value=1, max_value=4000)
+    rp_erp = _payload_int(payload, "rolling_period_erp", min_value=1, max_value=4000)
+    smoothing_gdp = _payload_smoothing(payload, "smoothing_gdp")
+    smoothing_volume = _payload_smoothing(payload, "smoothing_volume")
+    smoothing_securities = _payload_smoothing(payload, "smoothing_securities")
+    smoothing_erp = _payload_smoothing(payload, "smoothing_erp")
+    max_error = _payload_percentile_error(payload)
+
+    weight_gdp = _payload_weight(payload, "weight_gdp")
+    weight_volume = _payload_weight(payload, "weight_volume")
+    weight_securities = _payload_weight(payload, "weight_securities_lend")
+    weight_erp = _payload_weight(payload, "weight_erp")
+    weight_sum = weight_gdp + weight_volume + weight_securities + weight_erp
+    if weight_sum > 100.0 + 1e-9:
+        raise ValueError("权重之和不能超过 100%")
+
+    include_gdp = _payload_bool(payload, "include_gdp_percentile", True)
+    include_volume = _payload_bool(payload, "include_volume_percentile", True)
+    include_securities = _payload_bool(payload, "include_securities_percentile", True)
+    include_erp = _payload_bool(payload, "include_erp", True)
+    include_yield = _payload_bool(payload, "include_bond_yield", True)
+
+    formats = _payload_formats(payload)
+    gdp_dates, gdp_values = values["ratio_gdp"]  # type: ignore[misc]
+    vol_dates, vol_values = values["ratio_volume"]  # type: ignore[misc]
+    sec_dates, sec_values = values["ratio_securities"]  # type: ignore[misc]
+    erp_dates, erp_values, erp_yields, _, erp_closes = values["erp_series"]  # type: ignore[misc]
+
+    gdp_records = cached_percentile_records(
+        gdp_dates, gdp_values, ma_window=ma_gdp, rp_window=rp_gdp, smoothing=smoothing_gdp, max_error=max_error
+    )
+    vol_records = cached_percentile_records(
+        vol_dates, vol_values, ma_window=ma_volume, rp_window=rp_volume, smoothing=smoothing_volume, max_error=max_error
+    )
+    sec_records = cached_percentile_records(
+        sec_dates,
+        sec_values,
+        ma_window=ma_securities,
+        rp_window=rp_securities,
+        smoothing=smoothing_securities,
+        max_error=max_error,
+    )
+    erp_records = cached_erp_percentile_records(
+        erp_dates,
+        erp_values,
+        erp_yields,
+        erp_closes,
+        ma_window=ma_erp,
+        rp_window=rp_erp,
+        smoothing=smoothing_erp,
+        max_error=max_error,
+    )
 
-    safe_name = Path(filename).name
-    if safe_name != filename or not safe_name.lower().endswith(".xlsx") or safe_name.startswith("~$"):
-        return jsonify({"error": "文件名不合法"}), 400
+    if not (gdp_records and vol_records and sec_records and erp_records):
+        raise ValueError("数据不足：请检查移动平均与滚动周期参数是否过大")
+
+    vol_start = vol_records[0][0]
+    sec_start = sec_records[0][0]
+    erp_start = erp_records[0]["date"]  # type: ignore[assignment]
+    assert isinstance(erp_start, dt.date)
+
+    date_begin = max(vol_start, sec_start, erp_start)
+    gdp_dates_only = [d for d, _ in gdp_records]
+    gdp_start_index = nearest_index(gdp_dates_only, date_begin)
+    start_date_used = gdp_dates_only[gdp_start_index]
+
+    vol_end = vol_records[-1][0]
+    sec_end = sec_records[-1][0]
+    erp_end = erp_records[-1]["date"]  # type: ignore[assignment]
+    assert isinstance(erp_end, dt.date)
+    gdp_end = gdp_dates_only[-1]
+    date_end = min(gdp_end, vol_end, sec_end, erp_end)
+    gdp_end_index = bisect_right(gdp_dates_only, date_end) - 1
+    if gdp_end_index < gdp_start_index:
+        raise ValueError("合并失败：有效时间区间为空")
+
+    vol_dates_only = [d for d, _ in vol_records]
+    sec_dates_only = [d for d, _ in sec_records]
+    erp_dates_only = [record["date"] for record in erp_records]
+    assert all(isinstance(d, dt.date) for d in erp_dates_only)
+    erp_dates_only_typed: list[dt.date] = [d for d in erp_dates_only if isinstance(d, dt.date)]
+
+    header = ["日期", "股权风险溢价分位", "全A点位", "市场温度"]
+    if include_gdp:
+        header.insert(1, "市值/GDP分位")
+    if include_volume:
+        header.insert(2 if include_gdp else 1, "成交量/市值分位")
+    if include_securities:
+        insert_at = 3 if include_gdp and include_volume else 2 if (include_gdp or include_volume) else 1
+        header.insert(insert_at, "融资融券/市值分位")
+    if include_erp:
+        header.append("股权风险溢价")
+    if include_yield:
+        header.append("十年国债收益率")
+
+    rows: list[list[object]] = [header]
+    one_decimal_columns = {
+        "市值/GDP分位",
+        "成交量/市值分位",
+        "融资融券/市值分位",
+        "股权风险溢价分位",
+        "市场温度",
+        "全A点位",
+    }
 
-    source_path = INPUT_DIR / safe_name
-    if not source_path.exists():
-        return jsonify({"error": "文件不存在"}), 404
+    def _get_percentile(records: list[tuple[dt.date, float]], dates_only: list[dt.date], target: dt.date) -> float:
+        idx = nearest_index(dates_only, target)
+        return float(records[idx][1])
+
+    for gdp_idx in range(gdp_start_index, gdp_end_index + 1):
+        date_value = gdp_dates_only[gdp_idx]
+        gdp_pct = float(gdp_records[gdp_idx][1])
+        vol_pct = _get_percentile(vol_records, vol_dates_only, date_value)
+        sec_pct = _get_percentile(sec_records, sec_dates_only, date_value)
+
+        erp_idx = nearest_index(erp_dates_only_typed, date_value)
+        erp_record = erp_records[erp_idx]
+        erp_pct = float(erp_record["erp_percentile"])
+        close_value = float(erp_record["close"])
+        erp_value = float(erp_record["erp"])
+        yield_value = float(erp_record["yield"])
+
+        temperature = (
+            weight_gdp * gdp_pct
+            + weight_volume * vol_pct
+            + weight_securities * sec_pct
+            + weight_erp * (100.0 - erp_pct)
+        ) / 100.0
+
+        row: dict[str, object] = {
+            "日期": date_value.isoformat(),
+            "市值/GDP分位": gdp_pct,
+            "成交量/市值分位": vol_pct,
+            "融资融券/市值分位": sec_pct,
+            "股权风险溢价分位": erp_pct,
+            "股权风险溢价": erp_value,
+            "十年国债收益率": yield_value,
+            "全A点位": close_value,
+            "市场温度": temperature,
+        }
+        output_row: list[object] = []
+        for col in header:
+            value = row.get(col, "")
+            if col in one_decimal_columns and isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = round(float(value), 1)
+            output_row.append(value)
+        rows.append(output_row)
+
+    output_name = "Market_Thermometer.csv"
+    output_files = _write_outputs(rows, OUTPUT_DIR / output_name, formats)
+    result: dict[str, object] = {
+        "output_csv": _csv_output(output_name, formats),
+        "output_files": output_files,
+        "date_begin": date_begin.isoformat(),
+        "date_begin_used": start_date_used.isoformat(),
+        "date_end": date_end.isoformat(),
+        "columns": header,
+    }
+    if max_error is not None:
+        windows = {"gdp": rp_gdp, "volume": rp_volume, "securities": rp_securities, "erp": rp_erp}
+        result["percentile_error_bounds"] = percentile_error_bounds(max_error, **windows)
+        fallbacks = exact_fallbacks(max_error, **windows)
+        if fallbacks:
+            result["percentile_exact_fallbacks"] = fallbacks
+    return result
+
+
+# 流水线：ERP 与温度计的各输出任务连同它们共享的中间结果（清洗后的行、合并行、ERP 行、各序列）
+# 组成一张有名任务的 DAG。一次运行中每个中间任务只算一次，相互独立的分支在线程池中并发执行；
+# 输出任务按“代码版本 + 参数 + 依赖的输入文件”计算指纹，与上次运行相同且输出文件未被改动时直接返回上次的结果。
+PIPELINE_THREADS = _env_int("DP_PIPELINE_THREADS", 4)
+_THERMOMETER_RATIO_STEMS = {
+    "gdp": "data_Ratio GDP",
+    "volume": "data_Ratio Volume",
+    "securities": "data_Ratio Securities Lend",
+}
+_THERMOMETER_SERIES = tuple(f"ratio_{factor}" for factor in _THERMOMETER_RATIO_STEMS) + ("erp_series",)
+
+
+class _PipelineTask(NamedTuple):
+    run: Callable[[dict[str, object], dict[str, object]], object]
+    deps: tuple[str, ...] = ()
+    inputs: tuple[str, ...] = ()
+    # 输出任务写出的文件；为空的是只在内存中传递的中间任务。
+    outputs: tuple[str, ...] = ()
+    required: tuple[str, ...] = ()
+    # 结果依赖当天日期（缺省终止日期为今天）时，指纹中计入日期。
+    volatile: bool = False
+    # 中间任务可先在进程内缓存与序列库中查找，命中时不再展开其依赖。
+    lookup: Callable[[], object | None] | None = None
+    # 结果为迭代器：本次运行只有一个下游任务时原样交给它流式消费，多个下游或作为目标时才物化为列表。
+    lazy: bool = False
+
+
+def _ratio_pipeline_tasks(factor: str, stem: str) -> dict[str, _PipelineTask]:
+    return {
+        f"ratio_{factor}_rows": _PipelineTask(
+            lambda values, payload: _read_input_rows(read_ratio_rows, stem), inputs=(stem,)
+        ),
+        f"ratio_{factor}": _PipelineTask(
+            lambda values, payload: _ratio_series_from_rows(_find_input_parts(stem), values[f"ratio_{factor}_rows"]),  # type: ignore[arg-type]
+            deps=(f"ratio_{factor}_rows",),
+            lookup=lambda: _cached_ratio_series(_find_input_parts(stem)),
+        ),
+    }
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    output_csv_path = OUTPUT_DIR / f"{source_path.stem}.csv"
-    output_xlsx_path = OUTPUT_DIR / f"{source_path.stem}_processed.xlsx"
 
-    try:
-        process_xlsx_to_outputs(source_path, output_csv_path, output_xlsx_path)
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover - surfaced to UI
-        return jsonify({"error": f"转换失败：{exc}"}), 500
+PIPELINE_TASKS: dict[str, _PipelineTask] = {
+    "pe_rows": _PipelineTask(
+        lambda values, payload: _read_input_rows(iter_pe, "data_PE"), inputs=("data_PE",), lazy=True
+    ),
+    "bond_rows": _PipelineTask(
+        lambda values, payload: _read_input_rows(iter_bond, "data_bond"), inputs=("data_bond",), lazy=True
+    ),
+    "merged_rows": _PipelineTask(
+        lambda values, payload: merge_by_bond_dates(values["bond_rows"], values["pe_rows"]),  # type: ignore[arg-type]
+        deps=("pe_rows", "bond_rows"),
+        lazy=True,
+    ),
+    "erp_rows": _PipelineTask(
+        lambda values, payload: iter_erp_rows(values["merged_rows"]),  # type: ignore[arg-type]
+        deps=("merged_rows",),
+        lazy=True,
+    ),
+    "erp_series": _PipelineTask(
+        lambda values, payload: _erp_series_from_rows(values["erp_rows"]),  # type: ignore[arg-type]
+        deps=("erp_rows",),
+        lookup=_cached_erp_series,
+    ),
+    **{
+        name: task
+        for factor, stem in _THERMOMETER_RATIO_STEMS.items()
+        for name, task in _ratio_pipeline_tasks(factor, stem).items()
+    },
+    "erp": _PipelineTask(
+        _task_erp,
+        deps=("pe_rows", "bond_rows", "merged_rows", "erp_rows"),
+        outputs=("data_PE_clean.csv", "data_bond_clean.csv", "merged.csv", "ERP.csv"),
+    ),
+    "erp_10year": _PipelineTask(_task_erp_10year, deps=("erp_series",), outputs=("ERP_10Year.csv",)),
+    "erp_rolling": _PipelineTask(
+        _task_erp_rolling, deps=("erp_series",), outputs=("ERP_Rolling Calculation.csv",), required=("n",)
+    ),
+    "erp_interval": _PipelineTask(
+        _task_erp_interval,
+        deps=("erp_series",),
+        outputs=("ERP_Interval.csv",),
+        required=("start_date",),
+        volatile=True,
+    ),
+    "thermometer_clean": _PipelineTask(
+        _task_thermometer_clean,
+        deps=tuple(f"ratio_{factor}_rows" for factor in _THERMOMETER_RATIO_STEMS),
+        outputs=("Ratio_GDP.csv", "Ratio_Volume.csv", "Ratio_Securities_Lend.csv"),
+    ),
+    "thermometer_percentiles": _PipelineTask(
+        _task_thermometer_percentiles,
+        deps=_THERMOMETER_SERIES,
+        outputs=(
+            "Ratio_GDP_Percentile.csv",
+            "Ratio_Volume_Percentile.csv",
+            "Ratio_Securities_Lend_Percentile.csv",
+            "ERP_Percentile.csv",
+        ),
+        required=(
+            "moving_average_gdp",
+            "rolling_period_gdp",
+            "moving_average_volume",
+            "rolling_period_volume",
+            "moving_average_securities",
+            "rolling_period_securities",
+            "moving_erp",
+            "rolling_period_erp",
+        ),
+    ),
+    "thermometer_merge": _PipelineTask(
+        _task_thermometer_merge,
+        deps=_THERMOMETER_SERIES,
+        outputs=("Market_Thermometer.csv",),
+        required=(
+            "moving_average_gdp",
+            "rolling_period_gdp",
+            "moving_average_volume",
+            "rolling_period_volume",
+            "moving_average_securities",
+            "rolling_period_securities",
+            "moving_erp",
+            "rolling_period_erp",
+            "weight_gdp",
+            "weight_volume",
+            "weight_securities_lend",
+            "weight_erp",
+        ),
+    ),
+}
+
+
+def _pipeline_closure(names: Iterable[str]) -> list[str]:
+    # names 及其全部上游任务，按依赖顺序排列。
+    order: list[str] = []
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        for dep in PIPELINE_TASKS[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def _pipeline_inputs(name: str) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(stem for upstream in _pipeline_closure([name]) for stem in PIPELINE_TASKS[upstream].inputs))
+
+
+def _output_fingerprint(
+    name: str, payload: dict[str, object], inputs: Sequence[object], *, volatile: bool = False
+) -> str:
+    key: list[object] = [
+        name,
+        _CODE_FINGERPRINT,
+        json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str),
+        list(inputs),
+    ]
+    if volatile:
+        key.append(dt.date.today().isoformat())
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16]
 
-    return jsonify({"output_csv": output_csv_path.name, "output_xlsx": output_xlsx_path.name})
+
+def _pipeline_fingerprint(name: str, payload: dict[str, object]) -> str:
+    return _output_fingerprint(
+        name,
+        payload,
+        [parts_fingerprint(_find_input_parts(stem)) for stem in _pipeline_inputs(name)],
+        volatile=PIPELINE_TASKS[name].volatile,
+    )
+
+
+def _pipeline_output_stats(names: Iterable[str]) -> list[list[object]] | None:
+    stats: list[list[object]] = []
+    for name in names:
+        try:
+            stat = (OUTPUT_DIR / name).stat()
+        except OSError:
+            return None
+        stats.append([name, stat.st_mtime_ns, stat.st_size])
+    return stats
 
 
-@app.post("/api/erp")
-def generate_erp() -> object:
+def _pipeline_state(name: str) -> tuple[str, list[list[object]], dict[str, object]] | None:
+    if not SERIES_STORE_ENABLED or not (SERIES_STORE_DIR / "series.sqlite").exists():
+        return None
     try:
-        pe_path = _find_input_xlsx("data_PE")
-        bond_path = _find_input_xlsx("data_bond")
+        connection = _series_store_connect()
+        try:
+            row = connection.execute(
+                "SELECT fingerprint, outputs, result FROM pipeline_state WHERE task = ? AND output_dir = ?",
+                (name, str(OUTPUT_DIR)),
+            ).fetchone()
+        finally:
+            connection.close()
+    except (OSError, sqlite3.Error):
+        return None
+    if row is None:
+        return None
+    return row[0], json.loads(row[1]), json.loads(row[2])
+
+
+def _pipeline_up_to_date(name: str, fingerprint: str) -> dict[str, object] | None:
+    # 指纹相同且上次写出的文件都还在、未被改动时返回上次的结果。
+    state = _pipeline_state(name)
+    if state is None or state[0] != fingerprint:
+        return None
+    _, outputs, result = state
+    if _pipeline_output_stats(str(item[0]) for item in outputs) != outputs:
+        return None
+    return result
+
+
+def _record_pipeline_state(name: str, fingerprint: str, result: dict[str, object]) -> None:
+    if not SERIES_STORE_ENABLED:
+        return
+    outputs = _pipeline_output_stats(result.get("output_files", ()))  # type: ignore[arg-type]
+    if outputs is None:
+        return
+    try:
+        connection = _series_store_connect()
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO pipeline_state (task, output_dir, fingerprint, outputs, result, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    str(OUTPUT_DIR),
+                    fingerprint,
+                    json.dumps(outputs, ensure_ascii=False),
+                    json.dumps(result, ensure_ascii=False, default=str),
+                    dt.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+        finally:
+            connection.close()
+    except (OSError, sqlite3.Error, TypeError, ValueError):
+        return
 
-        pe_rows = _process_data_pe(pe_path)
-        bond_rows = _process_data_bond(bond_path)
-        merged_rows = _merge_by_bond_dates(bond_rows, pe_rows)
 
-        pe_clean_rows: list[list[object]] = [["日期", "PE-TTM-S", "全A点位"]] + [
-            [date.isoformat(), pe, close] for date, pe, close in pe_rows
-        ]
-        bond_clean_rows: list[list[object]] = [["日期", "十年国债收益率"]] + [
-            [date.isoformat(), yield_raw] for date, yield_raw, _ in bond_rows
-        ]
-        merged_clean_rows: list[list[object]] = [["日期", "十年国债收益率", "PE-TTM-S", "全A点位"]] + [
-            [date.isoformat(), yield_raw, pe, close] for date, yield_raw, pe, close in merged_rows
-        ]
-        erp_rows = _compute_erp_rows(merged_rows, bond_rows)
+def _timed_task(
+    name: str, values: dict[str, object], payload: dict[str, object], *, materialize: bool = False
+) -> tuple[object, float]:
+    started = time.perf_counter()
+    result = PIPELINE_TASKS[name].run(values, payload)
+    if materialize:
+        result = list(result)  # type: ignore[call-overload]
+    return result, time.perf_counter() - started
+
 
-        output = {
-            "data_PE_clean": "data_PE_clean.csv",
-            "data_bond_clean": "data_bond_clean.csv",
-            "merged": "merged.csv",
-            "erp": "ERP.csv",
+def _run_pipeline(
+    targets: dict[str, dict[str, object]],
+    *,
+    force: bool = False,
+    computed: dict[str, float] | None = None,
+    errors: dict[str, str] | None = None,
+) -> dict[str, object]:
+    # targets：任务名 → 参数。返回各目标任务的结果；已是最新而未重算的输出任务结果带 up_to_date。
+    # computed 非 None 时记录本次实际执行的任务及其耗时（秒）。errors 为 None 时第一个出错的任务
+    # 取消其余任务并抛出；否则出错的目标任务（含因上游出错而无法运行的）记入 errors，其余分支照常完成。
+    results: dict[str, object] = {}
+    fingerprints: dict[str, str] = {}
+    failed: dict[str, str] = {}
+    for name, payload in targets.items():
+        if not PIPELINE_TASKS[name].outputs:
+            continue
+        try:
+            fingerprints[name] = _pipeline_fingerprint(name, payload)
+        except Exception as exc:
+            if errors is None:
+                raise
+            failed[name] = str(exc)
+            continue
+        previous = None if force else _pipeline_up_to_date(name, fingerprints[name])
+        if previous is not None:
+            results[name] = {**previous, "up_to_date": True}
+
+    values: dict[str, object] = {}
+    pending: list[str] = []
+
+    def resolve(name: str) -> None:
+        if name in values or name in pending:
+            return
+        task = PIPELINE_TASKS[name]
+        if task.lookup is not None:
+            try:
+                found = task.lookup()
+            except Exception:
+                # 查找失败（如输入缺失）时照常计算，由任务本身报告错误。
+                if errors is None:
+                    raise
+                found = None
+            if found is not None:
+                values[name] = found
+                return
+        for dep in task.deps:
+            resolve(dep)
+        pending.append(name)
+
+    for name in targets:
+        if name not in results and name not in failed:
+            resolve(name)
+
+    if pending:
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        # 惰性任务的迭代器只能被消费一次：有多个下游或本身是目标时在本任务线程内物化。
+        consumers = Counter(dep for name in pending for dep in PIPELINE_TASKS[name].deps)
+        materialize = {
+            name for name in pending if PIPELINE_TASKS[name].lazy and (consumers[name] > 1 or name in targets)
         }
 
-        _write_csv(pe_clean_rows, OUTPUT_DIR / output["data_PE_clean"])
-        _write_csv(bond_clean_rows, OUTPUT_DIR / output["data_bond_clean"])
-        _write_csv(merged_clean_rows, OUTPUT_DIR / output["merged"])
-        _write_csv(erp_rows, OUTPUT_DIR / output["erp"])
+        # 任务在提交线程的上下文副本中执行，快照记录器等上下文变量随之传递。
+        with ThreadPoolExecutor(max_workers=min(PIPELINE_THREADS, len(pending))) as executor:
+            running: dict[Future[object], str] = {}
+            try:
+                while pending or running:
+                    for name in list(pending):
+                        deps = PIPELINE_TASKS[name].deps
+                        upstream_error = next((failed[dep] for dep in deps if dep in failed), None)
+                        if upstream_error is not None:
+                            pending.remove(name)
+                            failed[name] = upstream_error
+                        elif all(dep in values for dep in deps):
+                            pending.remove(name)
+                            future = executor.submit(
+                                copy_context().run,
+                                _timed_task,
+                                name,
+                                values,
+                                targets.get(name, {}),
+                                materialize=name in materialize,
+                            )
+                            running[future] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            values[name], seconds = future.result()
+                        except Exception as exc:
+                            if errors is None:
+                                raise
+                            failed[name] = str(exc)
+                            continue
+                        if computed is not None:
+                            computed[name] = round(seconds, 3)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+    for name in targets:
+        if name in results:
+            continue
+        if name in failed:
+            errors[name] = failed[name]  # type: ignore[index]
+            continue
+        results[name] = values[name]
+        if name in fingerprints:
+            _record_pipeline_state(name, fingerprints[name], values[name])  # type: ignore[arg-type]
+    return results
+
 
-        return jsonify(
-            {
-                "outputs": {
-                    "data_PE_clean_csv": output["data_PE_clean"],
-                    "data_bond_clean_csv": output["data_bond_clean"],
-                    "merged_csv": output["merged"],
-                    "erp_csv": output["erp"],
-                }
-            }
-        )
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
+def _run_pipeline_job(name: str, payload: dict[str, object]) -> dict[str, object]:
+    # 单个输出任务的接口：force 为真时忽略“已是最新”重新计算；force 本身不计入任务参数。
+    force = _payload_bool(payload, "force", False)
+    task_payload = {key: value for key, value in payload.items() if key != "force"}
+    return _run_pipeline({name: task_payload}, force=force)[name]  # type: ignore[return-value]
 
-@app.post("/api/erp10y")
-def generate_erp_10year() -> object:
-    try:
-        pe_path = _find_input_xlsx("data_PE")
-        bond_path = _find_input_xlsx("data_bond")
 
-        pe_rows = _process_data_pe(pe_path)
-        bond_rows = _process_data_bond(bond_path)
-        merged_rows = _merge_by_bond_dates(bond_rows, pe_rows)
-        erp_rows = _compute_erp_rows(merged_rows, bond_rows)
+def _job_erp(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("erp", payload)
 
-        bands_rows = _compute_erp_rolling_bands(erp_rows, window_size=2000)
 
-        csv_name = "ERP_10Year.csv"
-        _write_csv(bands_rows, OUTPUT_DIR / csv_name)
+def _job_erp_10year(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("erp_10year", payload)
 
-        return jsonify({"output_csv": csv_name})
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
 
+def _job_erp_rolling(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("erp_rolling", payload)
 
-@app.post("/api/erprolling")
-def generate_erp_rolling() -> object:
-    payload = request.get_json(silent=True) or {}
-    n = payload.get("n")
 
-    try:
-        if isinstance(n, str):
-            try:
-                n = int(n.strip())
-            except ValueError as exc:
-                raise ValueError("n 必须为整数") from exc
-        if not isinstance(n, int):
-            raise ValueError("n 必须为整数")
-        if n < 1 or n > 4000:
-            raise ValueError("n 超出范围（1-4000）")
-
-        pe_path = _find_input_xlsx("data_PE")
-        bond_path = _find_input_xlsx("data_bond")
-
-        pe_rows = _process_data_pe(pe_path)
-        bond_rows = _process_data_bond(bond_path)
-        merged_rows = _merge_by_bond_dates(bond_rows, pe_rows)
-        erp_rows = _compute_erp_rows(merged_rows, bond_rows)
-
-        bands_rows = _compute_erp_rolling_bands(erp_rows, window_size=n, include_percentile=True)
-
-        csv_name = "ERP_Rolling Calculation.csv"
-        _write_csv(bands_rows, OUTPUT_DIR / csv_name)
-
-        return jsonify({"output_csv": csv_name, "n": n})
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
+def _job_erp_interval(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("erp_interval", payload)
 
 
-@app.post("/api/erpinterval")
-def generate_erp_interval() -> object:
-    payload = request.get_json(silent=True) or {}
-    start_date_raw = payload.get("start_date")
-    end_date_raw = payload.get("end_date")
+def _job_thermometer_clean(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("thermometer_clean", payload)
 
-    try:
-        if not isinstance(start_date_raw, str) or not start_date_raw.strip():
-            raise ValueError("缺少起始日期 start_date")
-        try:
-            start_date = dt.date.fromisoformat(start_date_raw.strip())
-        except ValueError as exc:
-            raise ValueError("起始日期格式必须为 YYYY-MM-DD") from exc
 
-        if end_date_raw is None or (isinstance(end_date_raw, str) and not end_date_raw.strip()):
-            end_date = dt.date.today()
-        else:
-            if not isinstance(end_date_raw, str):
-                raise ValueError("终止日期格式必须为 YYYY-MM-DD")
-            try:
-                end_date = dt.date.fromisoformat(end_date_raw.strip())
-            except ValueError as exc:
-                raise ValueError("终止日期格式必须为 YYYY-MM-DD") from exc
+def _job_thermometer_percentiles(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("thermometer_percentiles", payload)
 
-        pe_path = _find_input_xlsx("data_PE")
-        bond_path = _find_input_xlsx("data_bond")
 
-        pe_rows = _process_data_pe(pe_path)
-        bond_rows = _process_data_bond(bond_path)
-        merged_rows = _merge_by_bond_dates(bond_rows, pe_rows)
-        erp_rows = _compute_erp_rows(merged_rows, bond_rows)
+def _job_thermometer_merge(payload: dict[str, object]) -> dict[str, object]:
+    return _run_pipeline_job("thermometer_merge", payload)
 
-        earliest, latest, actual_start, actual_end, output_rows, median, stddevp = _compute_erp_interval_bands(
-            erp_rows, start_date=start_date, end_date=end_date
-        )
 
-        csv_name = "ERP_Interval.csv"
-        _write_csv(output_rows, OUTPUT_DIR / csv_name)
+# 参数网格 / 情景分析：各因子的平滑与滚动分位按不同的（平均移动, 滚动周期）组合各算一次，
+# 在工作进程池中并行；每个窗口组合只对齐一次，权重组合在对齐后的四列分位上直接加权。
+SCENARIO_MAX_COMBINATIONS = 5000
+# 权重网格的候选组合（剔除权重之和超过 100% 之前）只计数不保存，此上限约束遍历耗时。
+SCENARIO_MAX_WEIGHT_CANDIDATES = 1_000_000
+SCENARIO_TOP_COUNT = 10
+THERMOMETER_FACTORS = {
+    "gdp": ("moving_average_gdp", "rolling_period_gdp", 1000),
+    "volume": ("moving_average_volume", "rolling_period_volume", 4000),
+    "securities": ("moving_average_securities", "rolling_period_securities", 4000),
+    "erp": ("moving_erp", "rolling_period_erp", 4000),
+}
+THERMOMETER_WEIGHTS = {
+    "gdp": "weight_gdp",
+    "volume": "weight_volume",
+    "securities": "weight_securities_lend",
+    "erp": "weight_erp",
+}
 
-        adjusted = actual_start != start_date
-        adjusted_end = actual_end != end_date
-        return jsonify(
-            {
-                "output_csv": csv_name,
-                "input_start_date": start_date.isoformat(),
-                "used_start_date": actual_start.isoformat(),
-                "input_end_date": end_date.isoformat(),
-                "used_end_date": actual_end.isoformat(),
-                "earliest_date": earliest.isoformat(),
-                "latest_date": latest.isoformat(),
-                "adjusted_to_trading_day": adjusted,
-                "adjusted_end_to_trading_day": adjusted_end,
-                "median": median,
-                "stddevp": stddevp,
-            }
-        )
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
 
+def _thermometer_factor_series(factor: str) -> tuple[list[str], list[float]]:
+    if factor == "erp":
+        dates, erp_values, _, _, _ = _load_erp_series()
+        return dates, erp_values
+    return _load_ratio_series(_find_input_parts(_THERMOMETER_RATIO_STEMS[factor]))
 
-@app.post("/api/thermometer/clean")
-def generate_thermometer_clean() -> object:
-    try:
-        gdp_path = _find_input_xlsx("data_Ratio GDP")
-        volume_path = _find_input_xlsx("data_Ratio Volume")
-        lend_path = _find_input_xlsx("data_Ratio Securities Lend")
-
-        gdp_rows = _process_ratio_file(gdp_path, metric_header="总市值/GDP")
-        volume_rows = _process_ratio_file(volume_path, metric_header="成交量/总市值")
-        lend_rows = _process_ratio_file(lend_path, metric_header="融资融券/总市值")
-
-        outputs = {
-            "ratio_gdp": "Ratio_GDP.csv",
-            "ratio_volume": "Ratio_Volume.csv",
-            "ratio_securities_lend": "Ratio_Securities_Lend.csv",
-        }
 
-        _write_csv(gdp_rows, OUTPUT_DIR / outputs["ratio_gdp"])
-        _write_csv(volume_rows, OUTPUT_DIR / outputs["ratio_volume"])
-        _write_csv(lend_rows, OUTPUT_DIR / outputs["ratio_securities_lend"])
+def _scenario_factor_percentiles(
+    factor: str, ma_window: int, rp_window: int, smoothing: str, max_error: float | None
+) -> tuple[int, array]:
+    # 返回 (首个有效分位的位置, 该位置起的分位列)；可在工作进程中执行，只传回一列 array('d')。
+    dates, values = _thermometer_factor_series(factor)
+    _, pct_values = cached_smoothed_percentiles(
+        values, ma_window=ma_window, rp_window=rp_window, smoothing=smoothing, max_error=max_error
+    )
+    start = next((index for index, pct in enumerate(pct_values) if pct is not None), len(pct_values))
+    return start, array("d", (float(pct) for pct in pct_values[start:]))  # type: ignore[arg-type]
 
-        return jsonify(
-            {
-                "outputs": {
-                    "ratio_gdp_csv": outputs["ratio_gdp"],
-                    "ratio_volume_csv": outputs["ratio_volume"],
-                    "ratio_securities_lend_csv": outputs["ratio_securities_lend"],
-                }
-            }
-        )
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
 
+def _thermometer_nearest_maps(dates: dict[str, list[dt.date]]) -> dict[str, list[int]]:
+    # GDP 周频日期到其他因子最近日期的映射与窗口无关，只算一次。
+    return {
+        factor: [nearest_index(dates[factor], date) for date in dates["gdp"]] for factor in ("volume", "securities", "erp")
+    }
 
-@app.post("/api/thermometer/percentiles")
-def generate_thermometer_percentiles() -> object:
-    payload = request.get_json(silent=True) or {}
 
-    def get_int(name: str, *, min_value: int, max_value: int) -> int:
-        raw = payload.get(name)
-        if isinstance(raw, str):
-            raw = raw.strip()
-            if not raw:
-                raise ValueError(f"缺少参数：{name}")
-            try:
-                raw = int(raw)
-            except ValueError as exc:
-                raise ValueError(f"{name} 必须为整数") from exc
-        if not isinstance(raw, int):
-            raise ValueError(f"{name} 必须为整数")
-        if raw < min_value or raw > max_value:
-            raise ValueError(f"{name} 超出范围（{min_value}-{max_value}）")
-        return raw
+def _align_thermometer(
+    factor_pct: dict[str, tuple[int, array]],
+    dates: dict[str, list[dt.date]],
+    nearest: dict[str, list[int]],
+    erp_closes: list[float],
+) -> tuple[int, int, dict[str, list[float]], list[float]]:
+    # 与 _job_thermometer_merge 相同的区间规则：起点取其他三个因子起点的最大值并对齐到最近的 GDP 日期。
+    # 某个窗口下，在有效段（起点 s 之后）中的最近位置即 max(全序列最近位置, s)。
+    # 返回 GDP 日期上的 [first, last] 区间、区间内四个因子的分位列与对应的全A点位。
+    if any(len(column) == 0 for _, column in factor_pct.values()):
+        raise ValueError("数据不足：请检查移动平均与滚动周期参数是否过大")
+    starts = {factor: start for factor, (start, _) in factor_pct.items()}
+    gdp_dates = dates["gdp"]
+    date_begin = max(dates[factor][starts[factor]] for factor in ("volume", "securities", "erp"))
+    first = max(nearest_index(gdp_dates, date_begin), starts["gdp"])
+    date_end = min(dates[factor][-1] for factor in THERMOMETER_FACTORS)
+    last = bisect_right(gdp_dates, date_end) - 1
+    if last < first:
+        raise ValueError("合并失败：有效时间区间为空")
+
+    components: dict[str, list[float]] = {}
+    for factor, (start, column) in factor_pct.items():
+        if factor == "gdp":
+            components[factor] = [column[position - start] for position in range(first, last + 1)]
+        else:
+            mapping = nearest[factor]
+            components[factor] = [column[max(mapping[position], start) - start] for position in range(first, last + 1)]
+    erp_mapping = nearest["erp"]
+    closes = [erp_closes[max(erp_mapping[position], starts["erp"])] for position in range(first, last + 1)]
+    return first, last, components, closes
 
-    try:
-        ma_gdp = get_int("moving_average_gdp", min_value=1, max_value=1000)
-        rp_gdp = get_int("rolling_period_gdp", min_value=1, max_value=1000)
-        ma_volume = get_int("moving_average_volume", min_value=1, max_value=4000)
-        rp_volume = get_int("rolling_period_volume", min_value=1, max_value=4000)
-        ma_securities = get_int("moving_average_securities", min_value=1, max_value=4000)
-        rp_securities = get_int("rolling_period_securities", min_value=1, max_value=4000)
-        ma_erp = get_int("moving_erp", min_value=1, max_value=4000)
-        rp_erp = get_int("rolling_period_erp", min_value=1, max_value=4000)
-
-        gdp_path = _find_input_xlsx("data_Ratio GDP")
-        volume_path = _find_input_xlsx("data_Ratio Volume")
-        lend_path = _find_input_xlsx("data_Ratio Securities Lend")
-
-        gdp_dates, gdp_values = _load_ratio_series(gdp_path)
-        vol_dates, vol_values = _load_ratio_series(volume_path)
-        sec_dates, sec_values = _load_ratio_series(lend_path)
-        erp_dates, erp_values, erp_yields, erp_pes, erp_closes = _load_erp_series()
-
-        def build_output(
-            dates: list[str],
-            values: list[float],
-            *,
-            metric_header: str,
-            ma_window: int,
-            rp_window: int,
-        ) -> list[list[object]]:
-            ma_values = _moving_average(values, ma_window)
-            pct_values = _rolling_percentiles(ma_values, rp_window)
-            out: list[list[object]] = [["日期", metric_header, "平均移动", "分位"]]
-            for index, date_text in enumerate(dates):
-                if pct_values[index] is None:
-                    continue
-                out.append([date_text, values[index], ma_values[index], pct_values[index]])
-            return out
-
-        gdp_out = build_output(
-            gdp_dates,
-            gdp_values,
-            metric_header="总市值/GDP",
-            ma_window=ma_gdp,
-            rp_window=rp_gdp,
-        )
-        vol_out = build_output(
-            vol_dates,
-            vol_values,
-            metric_header="成交量/总市值",
-            ma_window=ma_volume,
-            rp_window=rp_volume,
-        )
-        sec_out = build_output(
-            sec_dates,
-            sec_values,
-            metric_header="融资融券/总市值",
-            ma_window=ma_securities,
-            rp_window=rp_securities,
+
+def _payload_grid(
+    payload: dict[str, object],
+    name: str,
+    *,
+    min_value: float = 0,
+    max_value: float = 100,
+    integer: bool = True,
+    default: object = None,
+) -> list[float]:
+    # 单个值、值列表，或 {"start", "stop", "step"}（含 stop）均可；整数参数沿用 _payload_int 的校验，其余沿用 _payload_float。
+    raw = payload.get(name, default)
+    if isinstance(raw, dict):
+        try:
+            start, stop, step = (float(raw[key]) for key in ("start", "stop", "step"))  # type: ignore[arg-type]
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"{name} 范围需包含数值 start/stop/step") from exc
+        if step <= 0 or stop < start:
+            raise ValueError(f"{name} 范围不合法：需 step > 0 且 stop ≥ start")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        if count > SCENARIO_MAX_COMBINATIONS:
+            raise ValueError(f"{name} 取值过多")
+        items: list[object] = [round(start + index * step, 10) for index in range(count)]
+        if integer:
+            items = [int(item) if float(item).is_integer() else item for item in items]  # type: ignore[arg-type]
+    elif isinstance(raw, list):
+        items = raw
+    else:
+        items = [raw]
+    if not items:
+        raise ValueError(f"{name} 不能为空")
+
+    values: list[float] = []
+    for item in items:
+        if integer:
+            value: float = _payload_int({name: item}, name, min_value=int(min_value), max_value=int(max_value))
+        else:
+            value = _payload_float({name: item}, name, min_value=min_value, max_value=max_value)
+        if value not in values:
+            values.append(value)
+    return values
+
+
+def _job_thermometer_scenarios(payload: dict[str, object]) -> dict[str, object]:
+    window_grids: dict[str, tuple[list[float], list[float]]] = {}
+    for factor, (ma_name, rp_name, max_value) in THERMOMETER_FACTORS.items():
+        window_grids[factor] = (
+            _payload_grid(payload, ma_name, min_value=1, max_value=max_value),
+            _payload_grid(payload, rp_name, min_value=1, max_value=max_value),
         )
-        erp_ma_values = _moving_average(erp_values, ma_erp)
-        erp_pct_values = _rolling_percentiles(erp_ma_values, rp_erp)
-        erp_out: list[list[object]] = [
-            ["日期", "股权风险溢价", "平均移动", "分位", "十年国债收益率", "PE-TTM-S", "全A点位"]
-        ]
-        for index, date_text in enumerate(erp_dates):
-            if erp_pct_values[index] is None:
-                continue
-            erp_out.append(
+    weights = {
+        factor: _payload_grid(payload, name, integer=False) for factor, name in THERMOMETER_WEIGHTS.items()
+    }
+    smoothing = {factor: _payload_smoothing(payload, f"smoothing_{factor}") for factor in THERMOMETER_FACTORS}
+    max_error = _payload_percentile_error(payload)
+    raw_horizons = payload.get("horizons", [4, 13, 26, 52])
+    if not isinstance(raw_horizons, list) or not raw_horizons:
+        raise ValueError("horizons 必须为非空整数列表（单位：周）")
+    horizons = sorted({_payload_int({"horizons": item}, "horizons", min_value=1, max_value=520) for item in raw_horizons})
+    formats = _payload_formats(payload)
+
+    # 先由各网格的长度算出组合数并校验上限，再展开组合：窗口组合数为各因子 平均移动数×滚动周期数 之积；
+    # 权重组合需剔除权重之和超过 100% 的，逐个遍历候选计数，只保留上限以内的组合。
+    window_count = math.prod(len(ma_values) * len(rp_values) for ma_values, rp_values in window_grids.values())
+    if window_count > SCENARIO_MAX_COMBINATIONS:
+        raise ValueError(f"组合数过多：窗口组合已有 {window_count} 个（上限 {SCENARIO_MAX_COMBINATIONS}）")
+    weight_candidates = math.prod(len(values) for values in weights.values())
+    if weight_candidates > SCENARIO_MAX_WEIGHT_CANDIDATES:
+        raise ValueError(f"权重取值组合过多：{weight_candidates}（上限 {SCENARIO_MAX_WEIGHT_CANDIDATES}）")
+    weight_combos: list[tuple[float, ...]] = []
+    weight_count = 0
+    for combo in product(*weights.values()):
+        if sum(combo) > 100.0 + 1e-9:
+            continue
+        weight_count += 1
+        if window_count * weight_count <= SCENARIO_MAX_COMBINATIONS:
+            weight_combos.append(combo)
+    total = window_count * weight_count
+    if not weight_count:
+        raise ValueError("没有权重之和不超过 100% 的组合")
+    if total > SCENARIO_MAX_COMBINATIONS:
+        raise ValueError(f"组合数过多：{total}（上限 {SCENARIO_MAX_COMBINATIONS}）")
+    windows = {
+        factor: [(int(ma), int(rp)) for ma in ma_values for rp in rp_values]
+        for factor, (ma_values, rp_values) in window_grids.items()
+    }
+
+    dates = {factor: cached_parsed_dates(_thermometer_factor_series(factor)[0]) for factor in THERMOMETER_FACTORS}
+    _, _, _, _, erp_closes = _load_erp_series()
+
+    # 每个因子的每个不同窗口对只计算一次；多于一个任务时分发到工作进程池。
+    tasks = [(factor, pair) for factor, pairs in windows.items() for pair in dict.fromkeys(pairs)]
+    task_args = [(factor, ma, rp, smoothing[factor], max_error) for factor, (ma, rp) in tasks]
+    if len(tasks) == 1 or _in_worker_process():
+        task_results = [_scenario_factor_percentiles(*args) for args in task_args]
+    else:
+        futures = [_get_process_pool().submit(_scenario_factor_percentiles, *args) for args in task_args]
+        try:
+            task_results = [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    percentiles = dict(zip(tasks, task_results))
+
+    gdp_dates = dates["gdp"]
+    nearest = _thermometer_nearest_maps(dates)
+
+    cube_columns: list[tuple[int, int, list[float]]] = []
+    scenario_rows: list[list[object]] = []
+    for window_combo in product(*windows.values()):
+        factor_pct = {
+            factor: percentiles[(factor, pair)] for factor, pair in zip(THERMOMETER_FACTORS, window_combo)
+        }
+        first, last, components, closes = _align_thermometer(factor_pct, dates, nearest, erp_closes)
+        forward_returns = {
+            horizon: [closes[index + horizon] / closes[index] - 1.0 for index in range(len(closes) - horizon)]
+            for horizon in horizons
+        }
+
+        for weight_combo in weight_combos:
+            combo_temperatures = temperatures(components, weight_combo)
+            mean = math.fsum(combo_temperatures) / len(combo_temperatures)
+            stddev = math.sqrt(max(0.0, math.fsum((value - mean) ** 2 for value in combo_temperatures) / len(combo_temperatures)))
+            correlations = [
+                pearson(combo_temperatures[: len(returns)], returns) for horizon, returns in forward_returns.items()
+            ]
+            scenario_id = f"S{len(scenario_rows) + 1:04d}"
+            scenario_rows.append(
                 [
-                    date_text,
-                    erp_values[index],
-                    erp_ma_values[index],
-                    round(float(erp_pct_values[index]), 1),
-                    erp_yields[index],
-                    erp_pes[index],
-                    erp_closes[index],
+                    scenario_id,
+                    *(value for pair in window_combo for value in pair),
+                    *weight_combo,
+                    gdp_dates[first].isoformat(),
+                    gdp_dates[last].isoformat(),
+                    len(combo_temperatures),
+                    round(combo_temperatures[-1], 1),
+                    round(mean, 1),
+                    round(stddev, 1),
+                    *(None if value is None else round(value, 4) for value in correlations),
                 ]
             )
+            cube_columns.append((first, last, combo_temperatures))
+
+    header = [
+        "情景",
+        *(name for ma_name, rp_name, _ in THERMOMETER_FACTORS.values() for name in (ma_name, rp_name)),
+        *THERMOMETER_WEIGHTS.values(),
+        "起始日期",
+        "终止日期",
+        "样本数",
+        "最新温度",
+        "平均温度",
+        "温度标准差",
+        *(f"未来{horizon}周收益相关系数" for horizon in horizons),
+    ]
 
-        outputs = {
-            "ratio_gdp": "Ratio_GDP_Percentile.csv",
-            "ratio_volume": "Ratio_Volume_Percentile.csv",
-            "ratio_securities_lend": "Ratio_Securities_Lend_Percentile.csv",
-            "erp": "ERP_Percentile.csv",
+    def cube_rows() -> Iterator[list[object]]:
+        # 结果立方体：GDP 周频日期 × 情景，单元格为温度（1 位小数），情景区间外留空。
+        yield ["日期", *(row[0] for row in scenario_rows)]
+        begin = min(first for first, _, _ in cube_columns)
+        end = max(last for _, last, _ in cube_columns)
+        for position in range(begin, end + 1):
+            yield [
+                gdp_dates[position].isoformat(),
+                *(
+                    round(combo_temperatures[position - first], 1) if first <= position <= last else None
+                    for first, last, combo_temperatures in cube_columns
+                ),
+            ]
+
+    outputs = {"scenarios": "Thermometer_Scenarios.csv", "cube": "Thermometer_Scenario_Cube.csv"}
+    output_files = _write_outputs([header, *scenario_rows], OUTPUT_DIR / outputs["scenarios"], formats)
+    output_files += _write_outputs(cube_rows(), OUTPUT_DIR / outputs["cube"], formats)
+
+    # 温度越高、未来收益越低才说明温度计有效：按首个期限的相关系数从低到高取前几名。
+    first_corr = len(header) - len(horizons)
+    ranked = sorted(
+        (row for row in scenario_rows if row[first_corr] is not None), key=lambda row: row[first_corr]  # type: ignore[arg-type, return-value]
+    )
+    result: dict[str, object] = {
+        "combinations": len(scenario_rows),
+        "skipped_weight_combinations": weight_candidates - len(weight_combos),
+        "distinct_factor_windows": len(tasks),
+        "horizons": horizons,
+        "outputs": {f"{key}_csv": _csv_output(name, formats) for key, name in outputs.items()},
+        "output_files": output_files,
+        "top_scenarios": [dict(zip(header, row)) for row in ranked[:SCENARIO_TOP_COUNT]],
+    }
+    if max_error is not None:
+        result["percentile_error_bounds"] = {
+            factor: max(percentile_error_bounds(max_error, window=rp)["window"] for _, rp in pairs)
+            for factor, pairs in windows.items()
+        }
+        fallbacks = {
+            factor: exact_fallback_reason(max_error, [rp for _, rp in pairs]) for factor, pairs in windows.items()
         }
+        if any(fallbacks.values()):
+            result["percentile_exact_fallbacks"] = {factor: reason for factor, reason in fallbacks.items() if reason}
+    return result
+
+
+BACKTEST_MAX_VARIANTS = 20000
+BACKTEST_TOP_COUNT = 10
+BACKTEST_MAX_FOLDS = 20
+# 信号 → (买入阈值参数, 卖出阈值参数, 取值范围, 默认网格)；结果表的前两列即这两个参数名。
+BACKTEST_SIGNALS = {
+    "thermometer": ("entry", "exit", (0.0, 100.0), ({"start": 0, "stop": 50, "step": 1}, {"start": 50, "stop": 100, "step": 1})),
+    "erp_bands": (
+        "entry_z",
+        "exit_z",
+        (-10.0, 10.0),
+        ({"start": 0, "stop": 2.5, "step": 0.05}, {"start": -2.5, "stop": 1, "step": 0.05}),
+    ),
+}
+BACKTEST_METRICS_HEADER = ["总收益率%", "年化收益率%", "最大回撤%", "交易次数", "年换手率", "持仓比例%"]
+
+
+class _LogPriceTable:
+    # 对数点位的稀疏表：任意区间 [i, j] 的最小值、最大值与区间内最大回撤（对数）均可 O(log T) 求出，
+    # 每个持仓段只需一次查询，不必逐日推进净值。
+    def __init__(self, closes: Sequence[float]) -> None:
+        if any(close <= 0 for close in closes):
+            raise ValueError("全A点位必须为正数")
+        self.logs = array("d", (math.log(close) for close in closes))
+        self.mins = [self.logs]
+        self.maxs = [self.logs]
+        self.mdds = [array("d", bytes(8 * len(self.logs)))]
+        span = 1
+        while span * 2 <= len(self.logs):
+            mins, maxs, mdds = self.mins[-1], self.maxs[-1], self.mdds[-1]
+            count = len(self.logs) - span * 2 + 1
+            self.mins.append(array("d", (min(mins[i], mins[i + span]) for i in range(count))))
+            self.maxs.append(array("d", (max(maxs[i], maxs[i + span]) for i in range(count))))
+            self.mdds.append(
+                array("d", (max(mdds[i], mdds[i + span], maxs[i] - mins[i + span]) for i in range(count)))
+            )
+            span *= 2
+
+    def query(self, first: int, last: int) -> tuple[float, float, float]:
+        # 从左到右拼接互不重叠的 2^k 块，返回 (最小值, 最大值, 最大回撤)。
+        low = high = self.logs[first]
+        drawdown = 0.0
+        position = first
+        while position <= last:
+            level = (last - position + 1).bit_length() - 1
+            block_min = self.mins[level][position]
+            drawdown = max(drawdown, self.mdds[level][position], high - block_min)
+            low = min(low, block_min)
+            high = max(high, self.maxs[level][position])
+            position += 1 << level
+        return low, high, drawdown
+
+
+def _next_crossings(signal: Sequence[float], threshold: float, *, below: bool) -> array:
+    # next[t] 为 t 及之后首个满足条件（≤ 或 ≥ 阈值）的位置，找不到为 len(signal)；末尾多一个哨兵。
+    size = len(signal)
+    result = array("l", [size]) * (size + 1)
+    upcoming = size
+    for index in range(size - 1, -1, -1):
+        value = signal[index]
+        if (value <= threshold) if below else (value >= threshold):
+            upcoming = index
+        result[index] = upcoming
+    return result
+
+
+def _hysteresis_segments(next_entry: array, next_exit: array, size: int) -> list[tuple[int, int]]:
+    # 信号 ≤ 买入阈值时按收盘满仓，≥ 卖出阈值时按收盘清仓；直接在事件之间跳转，返回持仓段 (买入位置, 卖出位置)。
+    # 买入阈值低于卖出阈值，买入当天不会触发卖出，清仓当天也不会再次买入。
+    segments: list[tuple[int, int]] = []
+    position = 0
+    while True:
+        entry = next_entry[position]
+        if entry >= size - 1:
+            return segments
+        leave = min(next_exit[entry + 1], size - 1)
+        segments.append((entry, leave))
+        position = leave + 1
+        if position >= size:
+            return segments
+
+
+def _segment_metrics(
+    segments: Sequence[tuple[int, int]], table: _LogPriceTable, dates: list[dt.date], first: int, last: int
+) -> dict[str, float | int | None]:
+    # 在 [first, last] 区间内评估持仓段（区间外的部分裁掉，空仓收益计 0），收益与回撤均在对数空间累加。
+    logs = table.logs
+    equity = 0.0
+    peak = 0.0
+    drawdown = 0.0
+    trades = 0
+    held = 0
+    closed = 0
+    for entry, leave in segments:
+        if leave <= first or entry >= last:
+            continue
+        entry, leave = max(entry, first), min(leave, last)
+        low, high, inner = table.query(entry, leave)
+        base = logs[entry]
+        drawdown = max(drawdown, peak - equity + base - low, inner)
+        peak = max(peak, equity + high - base)
+        equity += logs[leave] - base
+        trades += 1
+        held += leave - entry
+        if leave < last:
+            closed += 1
+    years = (dates[last] - dates[first]).days / 365.25
+    growth = math.exp(equity)
+    return {
+        "total_return": round(100.0 * (growth - 1.0), 2),
+        "cagr": round(100.0 * (growth ** (1.0 / years) - 1.0), 2) if years > 0 else None,
+        "max_drawdown": round(100.0 * (1.0 - math.exp(-drawdown)), 2),
+        "trades": trades,
+        # 买入与清仓各算一次满仓换手。
+        "turnover": round((trades + closed) / years, 2) if years > 0 else None,
+        "exposure": round(100.0 * held / (last - first), 2) if last > first else 0.0,
+    }
+
+
+def _metrics_row(entry: float, exit_: float, metrics: dict[str, float | int | None]) -> list[object]:
+    return [entry, exit_, *(metrics[key] for key in ("total_return", "cagr", "max_drawdown", "trades", "turnover", "exposure"))]
+
+
+def _backtest_thermometer_signal(
+    payload: dict[str, object],
+) -> tuple[tuple[object, ...], list[dt.date], list[float], list[float]]:
+    # 与 _job_thermometer_merge 相同的参数与对齐规则，得到 GDP 周频日期上的温度与全A点位。
+    windows = {
+        factor: (
+            _payload_int(payload, ma_name, min_value=1, max_value=max_value),
+            _payload_int(payload, rp_name, min_value=1, max_value=max_value),
+        )
+        for factor, (ma_name, rp_name, max_value) in THERMOMETER_FACTORS.items()
+    }
+    weights = tuple(_payload_weight(payload, name) for name in THERMOMETER_WEIGHTS.values())
+    if sum(weights) > 100.0 + 1e-9:
+        raise ValueError("权重之和不能超过 100%")
+    smoothing = {factor: _payload_smoothing(payload, f"smoothing_{factor}") for factor in THERMOMETER_FACTORS}
+    max_error = _payload_percentile_error(payload)
+
+    dates = {factor: cached_parsed_dates(_thermometer_factor_series(factor)[0]) for factor in THERMOMETER_FACTORS}
+    _, _, _, _, erp_closes = _load_erp_series()
+    factor_pct = {
+        factor: _scenario_factor_percentiles(factor, *windows[factor], smoothing[factor], max_error)
+        for factor in THERMOMETER_FACTORS
+    }
+    first, last, components, closes = _align_thermometer(factor_pct, dates, _thermometer_nearest_maps(dates), erp_closes)
+    signal = temperatures(components, weights)
+    version = (
+        tuple(parts_fingerprint(_find_input_parts(stem)) for stem in _THERMOMETER_RATIO_STEMS.values()),
+        tuple(windows.items()),
+        weights,
+        tuple(smoothing.items()),
+        max_error,
+    )
+    return version, dates["gdp"][first : last + 1], signal, closes
+
+
+def _backtest_erp_band_signal(
+    payload: dict[str, object],
+) -> tuple[tuple[object, ...], list[dt.date], list[float], list[float]]:
+    # 信号为 ERP 偏离滚动中位数的标准差倍数 z；取负后与温度计一样“越低越该买入”。
+    n = _payload_int(payload, "n", min_value=1, max_value=4000) if "n" in payload else 2000
+    max_error = _payload_percentile_error(payload)
+    erp_dates, erp_values, _, _, erp_closes = _load_erp_series()
+    signal: list[float] = []
+    begin = len(erp_values)
+    for index, (value, stats) in enumerate(zip(erp_values, rolling_band_stats(erp_values, n, max_error=max_error))):
+        if stats is None:
+            continue
+        median, stddev, _ = stats
+        if stddev <= 0:
+            signal.append(0.0)
+        else:
+            signal.append(-(value - median) / stddev)
+        begin = min(begin, index)
+    if len(signal) < 2:
+        raise ValueError("数据不足：请检查滚动周期 n 是否过大")
+    return (n, max_error), cached_parsed_dates(erp_dates)[begin:], signal, erp_closes[begin:]
 
-        _write_csv(gdp_out, OUTPUT_DIR / outputs["ratio_gdp"])
-        _write_csv(vol_out, OUTPUT_DIR / outputs["ratio_volume"])
-        _write_csv(sec_out, OUTPUT_DIR / outputs["ratio_securities_lend"])
-        _write_csv(erp_out, OUTPUT_DIR / outputs["erp"])
 
-        return jsonify(
+def _run_backtest(
+    variants: list[tuple[float, float]],
+    dates: list[dt.date],
+    signal: list[float],
+    closes: list[float],
+    *,
+    sign: float,
+    folds: int,
+    names: tuple[str, str],
+) -> tuple[list[list[object]], dict[str, object]]:
+    size = len(signal)
+    table = _LogPriceTable(closes)
+    # 每个不同阈值只做一次反向扫描，所有规则变体共享这些“下一次触发位置”数组。
+    next_entry = {entry: _next_crossings(signal, sign * entry, below=True) for entry in dict.fromkeys(e for e, _ in variants)}
+    next_exit = {exit_: _next_crossings(signal, sign * exit_, below=False) for exit_ in dict.fromkeys(x for _, x in variants)}
+    segments = [_hysteresis_segments(next_entry[entry], next_exit[exit_], size) for entry, exit_ in variants]
+
+    last = size - 1
+    metrics = [_segment_metrics(parts, table, dates, 0, last) for parts in segments]
+    rows = [_metrics_row(entry, exit_, item) for (entry, exit_), item in zip(variants, metrics)]
+    keys = [*names, *BACKTEST_METRICS_HEADER]
+    ranked = sorted(rows, key=lambda row: -math.inf if row[3] is None else row[3], reverse=True)  # type: ignore[arg-type, return-value]
+    summary: dict[str, object] = {
+        "start_date": dates[0].isoformat(),
+        "end_date": dates[last].isoformat(),
+        "samples": size,
+        "variants": len(variants),
+        "benchmark": _segment_metrics([(0, last)], table, dates, 0, last),
+        "top_variants": [dict(zip(keys, row)) for row in ranked[:BACKTEST_TOP_COUNT]],
+    }
+    if folds <= 0:
+        return rows, summary
+    if last < folds + 1:
+        raise ValueError("样本过少，无法按 walk_forward_folds 切分")
+
+    # 扩张窗口：第 f 折用 [0, b_f] 选出年化收益最高的变体，在 [b_f, b_{f+1}] 上样本外评估；
+    # 规则只依赖当期及以前的信号，样本内结果即全区间持仓段在 b_f 处截断。
+    bounds = [round(fold * last / (folds + 1)) for fold in range(folds + 2)]
+    fold_reports: list[dict[str, object]] = []
+    stitched: list[tuple[int, int]] = []
+    for fold in range(1, folds + 1):
+        in_end, out_end = bounds[fold], bounds[fold + 1]
+        scores = [_segment_metrics(parts, table, dates, 0, in_end)["cagr"] for parts in segments]
+        best = max(range(len(variants)), key=lambda index: -math.inf if scores[index] is None else scores[index])  # type: ignore[return-value, operator]
+        for entry, leave in segments[best]:
+            if leave <= in_end or entry >= out_end:
+                continue
+            entry, leave = max(entry, in_end), min(leave, out_end)
+            if stitched and stitched[-1][1] == entry:
+                entry = stitched.pop()[0]
+            stitched.append((entry, leave))
+        fold_reports.append(
             {
-                "outputs": {
-                    "ratio_gdp_csv": outputs["ratio_gdp"],
-                    "ratio_volume_csv": outputs["ratio_volume"],
-                    "ratio_securities_lend_csv": outputs["ratio_securities_lend"],
-                    "erp_csv": outputs["erp"],
-                }
+                "in_sample": [dates[0].isoformat(), dates[in_end].isoformat()],
+                "out_of_sample": [dates[in_end].isoformat(), dates[out_end].isoformat()],
+                names[0]: variants[best][0],
+                names[1]: variants[best][1],
+                "in_sample_cagr": scores[best],
+                **_segment_metrics(segments[best], table, dates, in_end, out_end),
             }
         )
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
+    summary["walk_forward"] = {
+        "folds": fold_reports,
+        "out_of_sample": _segment_metrics(stitched, table, dates, bounds[1], last),
+        "benchmark": _segment_metrics([(bounds[1], last)], table, dates, bounds[1], last),
+    }
+    return rows, summary
+
+
+def _job_backtest(payload: dict[str, object]) -> dict[str, object]:
+    signal_name = str(payload.get("signal") or "thermometer").strip().lower()
+    if signal_name not in BACKTEST_SIGNALS:
+        raise ValueError(f"signal 不支持：{signal_name}（可选：{', '.join(BACKTEST_SIGNALS)}）")
+    entry_name, exit_name, (min_value, max_value), (entry_default, exit_default) = BACKTEST_SIGNALS[signal_name]
+    entries = _payload_grid(payload, entry_name, min_value=min_value, max_value=max_value, integer=False, default=entry_default)
+    exits = _payload_grid(payload, exit_name, min_value=min_value, max_value=max_value, integer=False, default=exit_default)
+    folds = 0
+    if "walk_forward_folds" in payload:
+        folds = _payload_int(payload, "walk_forward_folds", min_value=0, max_value=BACKTEST_MAX_FOLDS)
+    formats = _payload_formats(payload)
+
+    # ERP 信号取负，阈值也随之取负：内部统一为“信号 ≤ 买入阈值买入，≥ 卖出阈值清仓”。
+    sign = -1.0 if signal_name == "erp_bands" else 1.0
+    variants = [(entry, exit_) for entry in entries for exit_ in exits if sign * entry < sign * exit_]
+    skipped = len(entries) * len(exits) - len(variants)
+    if not variants:
+        raise ValueError(f"没有有效的阈值组合：{entry_name} 须{'高' if sign < 0 else '低'}于 {exit_name}")
+    if len(variants) > BACKTEST_MAX_VARIANTS:
+        raise ValueError(f"阈值组合过多：{len(variants)}（上限 {BACKTEST_MAX_VARIANTS}）")
+
+    if signal_name == "thermometer":
+        version, dates, signal, closes = _backtest_thermometer_signal(payload)
+    else:
+        version, dates, signal, closes = _backtest_erp_band_signal(payload)
+    if len(signal) < 2:
+        raise ValueError("回测区间过短")
+    cache_key = (
+        "backtest",
+        signal_name,
+        parts_fingerprint(_find_input_parts("data_PE")),
+        parts_fingerprint(_find_input_parts("data_bond")),
+        version,
+        tuple(variants),
+        folds,
+    )
+    cached = _cache_get(cache_key)
+    from_cache = cached is not None
+    if cached is None:
+        cached = _run_backtest(variants, dates, signal, closes, sign=sign, folds=folds, names=(entry_name, exit_name))
+        _cache_put(cache_key, cached)
+    rows, summary = cached  # type: ignore[misc]
+
+    csv_name = "Backtest_Results.csv"
+    output_files = _write_outputs([[entry_name, exit_name, *BACKTEST_METRICS_HEADER], *rows], OUTPUT_DIR / csv_name, formats)
+    return {
+        "signal": signal_name,
+        **summary,
+        "skipped_variants": skipped,
+        "cached": from_cache,
+        "output_csv": _csv_output(csv_name, formats),
+        "output_files": output_files,
+    }
 
 
-@app.post("/api/thermometer/merge")
-def generate_thermometer_merge() -> object:
-    payload = request.get_json(silent=True) or {}
+# 输入监视：轮询 input/ 下文件的修改时间与大小（不依赖 inotify 等第三方库），检测到变化后等待
+# WATCH_DEBOUNCE_SECONDS 内不再有新变化（复制大文件、连续替换多个文件）再合并为一次重算，
+# 只重跑依赖这些输入的任务，参数沿用各任务最近一次成功运行时的参数。
+WATCH_ENABLED = os.environ.get("DP_WATCH", "0").strip() == "1"
+WATCH_INTERVAL_SECONDS = _env_int("DP_WATCH_INTERVAL", 2)
+WATCH_DEBOUNCE_SECONDS = _env_int("DP_WATCH_DEBOUNCE", 5)
+# 任务 → (依赖的输入, 从未运行过时使用的参数)；按依赖顺序排列，ERP 在前，温度计清洗在分位与合并之前。
+# 默认参数为 None 的任务需要用户参数，只有运行过（本进程内或快照库中有记录）才会重算。
+_CONVERT_INPUT = "<filename>"
+WATCH_JOBS: dict[str, tuple[_Job, tuple[str, ...], dict[str, object] | None]] = {
+    "erp": (_job_erp, _pipeline_inputs("erp"), {}),
+    "erp_10year": (_job_erp_10year, _pipeline_inputs("erp_10year"), {}),
+    "erp_rolling": (_job_erp_rolling, _pipeline_inputs("erp_rolling"), None),
+    "erp_interval": (_job_erp_interval, _pipeline_inputs("erp_interval"), None),
+    "indices": (_job_indices, ("data_bond", INDICES_DIR_NAME), None),
+    "thermometer_clean": (_job_thermometer_clean, _pipeline_inputs("thermometer_clean"), {}),
+    "thermometer_percentiles": (_job_thermometer_percentiles, _pipeline_inputs("thermometer_percentiles"), None),
+    "thermometer_merge": (_job_thermometer_merge, _pipeline_inputs("thermometer_merge"), None),
+    "thermometer_scenarios": (
+        _job_thermometer_scenarios,
+        (*_THERMOMETER_RATIO_STEMS.values(), "data_PE", "data_bond"),
+        None,
+    ),
+    "backtest": (_job_backtest, (*_THERMOMETER_RATIO_STEMS.values(), "data_PE", "data_bond"), None),
+    # 格式转换只依赖它上次转换的那个文件。
+    "convert": (_job_convert, (_CONVERT_INPUT,), None),
+}
+
+
+def _input_snapshot() -> dict[str, tuple[int, int]]:
+    if not INPUT_DIR.exists():
+        return {}
+    snapshot: dict[str, tuple[int, int]] = {}
+    for path in INPUT_DIR.rglob("*"):
+        if path.name.startswith("~$") or path.name.endswith(".tmp"):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if path.is_file():
+            snapshot[path.relative_to(INPUT_DIR).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
 
-    def get_int(name: str, *, min_value: int, max_value: int) -> int:
-        raw = payload.get(name)
-        if isinstance(raw, str):
-            raw = raw.strip()
-            if not raw:
-                raise ValueError(f"缺少参数：{name}")
-            try:
-                raw = int(raw)
-            except ValueError as exc:
-                raise ValueError(f"{name} 必须为整数") from exc
-        if not isinstance(raw, int):
-            raise ValueError(f"{name} 必须为整数")
-        if raw < min_value or raw > max_value:
-            raise ValueError(f"{name} 超出范围（{min_value}-{max_value}）")
-        return raw
 
-    def get_weight(name: str) -> float:
-        raw = payload.get(name)
-        if isinstance(raw, str):
-            raw = raw.strip()
+def _last_job_payload(name: str) -> dict[str, object] | None:
+    # 本进程内的最近参数优先；服务重启后从快照库中该任务最新版本的参数恢复。
+    job, _, default = WATCH_JOBS[name]
+    payload = _last_payloads.get(job.__name__)
+    if payload is None and SNAPSHOTS_ENABLED and (SNAPSHOT_DIR / "snapshots.sqlite").exists():
         try:
-            value = float(raw)
-        except Exception as exc:
-            raise ValueError(f"{name} 必须为数值") from exc
-        if value < 0 or value > 100:
-            raise ValueError(f"{name} 超出范围（0-100）")
-        return value
+            connection = _snapshot_connect()
+            try:
+                found = connection.execute(
+                    "SELECT params FROM versions WHERE job = ? ORDER BY id DESC LIMIT 1", (name,)
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            found = None
+        if found is not None:
+            payload = json.loads(found[0])
+    return payload if payload is not None else default
+
+
+def _affected_jobs(changed: Iterable[str]) -> list[str]:
+    changed = list(changed)
+    affected: list[str] = []
+    for name, (_, inputs, _) in WATCH_JOBS.items():
+        for relative in changed:
+            path = Path(relative)
+            if _CONVERT_INPUT in inputs:
+                payload = _last_job_payload(name)
+                hit = payload is not None and relative == payload.get("filename")
+            elif path.parts[0] == INDICES_DIR_NAME:
+                hit = INDICES_DIR_NAME in inputs
+            else:
+                hit = (
+                    len(path.parts) == 1
+                    and path.suffix.lower() in INPUT_SUFFIXES
+                    and any(matches_input_stem(stem, path.stem) for stem in inputs if stem != INDICES_DIR_NAME)
+                )
+            if hit:
+                affected.append(name)
+                break
+    return affected
+
+
+class _InputWatcher:
+    def __init__(self, interval: float, debounce: float) -> None:
+        self.interval = interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._recompute_lock = threading.Lock()
+        self._status: dict[str, object] = {
+            "pending": [],
+            "last_scan": None,
+            "recomputing": False,
+            "recompute_requested": False,
+            "last_run": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="input-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self._thread = None
+
+    def status(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_seconds": self.interval,
+                "debounce_seconds": self.debounce,
+                **self._status,
+            }
 
-    def get_bool(name: str, default: bool) -> bool:
-        raw = payload.get(name)
-        if raw is None:
-            return default
-        if isinstance(raw, bool):
-            return raw
-        if isinstance(raw, str):
-            text = raw.strip().lower()
-            if text in ("1", "true", "yes", "y", "on"):
-                return True
-            if text in ("0", "false", "no", "n", "off"):
+    def _update(self, **values: object) -> None:
+        with self._lock:
+            self._status.update(values)
+
+    def _loop(self) -> None:
+        # 重算在本线程内同步进行；期间发生的变化在下一次扫描时与之前的快照比较得出，不会遗漏。
+        previous = _input_snapshot()
+        pending: set[str] = set()
+        last_change = 0.0
+        while not self._stop.wait(self.interval):
+            current = _input_snapshot()
+            changed = {name for name in previous.keys() | current.keys() if previous.get(name) != current.get(name)}
+            previous = current
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_change = now
+            self._update(pending=sorted(pending), last_scan=dt.datetime.now().isoformat(timespec="seconds"))
+            if pending and now - last_change >= self.debounce:
+                batch, pending = pending, set()
+                self._update(pending=[], recomputing=True)
+                try:
+                    self._update(last_run=self.recompute(batch))
+                finally:
+                    self._update(recomputing=False)
+
+    def request_recompute(self) -> bool:
+        # 在后台线程中按当前输入重算全部任务并立即返回，结果见 status() 的 last_run；
+        # 已有手动重算在排队或进行时不再启动新的，返回 False。
+        with self._lock:
+            if self._status["recompute_requested"]:
                 return False
-        raise ValueError(f"{name} 必须为布尔值")
+            self._status["recompute_requested"] = True
+        threading.Thread(target=self._requested_recompute, name="input-recompute", daemon=True).start()
+        return True
 
-    try:
-        ma_gdp = get_int("moving_average_gdp", min_value=1, max_value=1000)
-        rp_gdp = get_int("rolling_period_gdp", min_value=1, max_value=1000)
-        ma_volume = get_int("moving_average_volume", min_value=1, max_value=4000)
-        rp_volume = get_int("rolling_period_volume", min_value=1, max_value=4000)
-        ma_securities = get_int("moving_average_securities", min_value=1, max_value=4000)
-        rp_securities = get_int("rolling_period_securities", min_value=1, max_value=4000)
-        ma_erp = get_int("moving_erp", min_value=1, max_value=4000)
-        rp_erp = get_int("rolling_period_erp", min_value=1, max_value=4000)
-
-        weight_gdp = get_weight("weight_gdp")
-        weight_volume = get_weight("weight_volume")
-        weight_securities = get_weight("weight_securities_lend")
-        weight_erp = get_weight("weight_erp")
-        weight_sum = weight_gdp + weight_volume + weight_securities + weight_erp
-        if weight_sum > 100.0 + 1e-9:
-            raise ValueError("权重之和不能超过 100%")
-
-        include_gdp = get_bool("include_gdp_percentile", True)
-        include_volume = get_bool("include_volume_percentile", True)
-        include_securities = get_bool("include_securities_percentile", True)
-        include_erp = get_bool("include_erp", True)
-        include_yield = get_bool("include_bond_yield", True)
-
-        gdp_path = _find_input_xlsx("data_Ratio GDP")
-        volume_path = _find_input_xlsx("data_Ratio Volume")
-        lend_path = _find_input_xlsx("data_Ratio Securities Lend")
-
-        gdp_dates, gdp_values = _load_ratio_series(gdp_path)
-        vol_dates, vol_values = _load_ratio_series(volume_path)
-        sec_dates, sec_values = _load_ratio_series(lend_path)
-        erp_dates, erp_values, erp_yields, _, erp_closes = _load_erp_series()
-
-        gdp_records = _build_percentile_records(gdp_dates, gdp_values, ma_window=ma_gdp, rp_window=rp_gdp)
-        vol_records = _build_percentile_records(vol_dates, vol_values, ma_window=ma_volume, rp_window=rp_volume)
-        sec_records = _build_percentile_records(sec_dates, sec_values, ma_window=ma_securities, rp_window=rp_securities)
-        erp_records = _build_erp_percentile_records(
-            erp_dates,
-            erp_values,
-            erp_yields,
-            erp_closes,
-            ma_window=ma_erp,
-            rp_window=rp_erp,
-        )
+    def _requested_recompute(self) -> None:
+        try:
+            self._update(last_run=self.recompute(_input_snapshot()))
+        finally:
+            self._update(recompute_requested=False)
+
+    def recompute(self, changed: Iterable[str]) -> dict[str, object]:
+        # 手动重算与监视线程的重算互斥，避免同一输出被两个任务同时写出。
+        with self._recompute_lock:
+            return self._recompute(sorted(changed))
+
+    def _recompute(self, changed: list[str]) -> dict[str, object]:
+        report: dict[str, object] = {"started": dt.datetime.now().isoformat(timespec="seconds"), "changed": changed}
+        jobs: dict[str, object] = {}
+        for name in _affected_jobs(changed):
+            job = WATCH_JOBS[name][0]
+            payload = _last_job_payload(name)
+            if payload is None:
+                jobs[name] = {"status": "skipped", "reason": "尚未运行过，参数未知"}
+                continue
+            started = time.perf_counter()
+            try:
+                result = EXECUTION_BACKENDS[EXECUTION_BACKEND](job, payload)
+            except Exception as exc:
+                jobs[name] = {"status": "error", "error": str(exc), "seconds": round(time.perf_counter() - started, 3)}
+                continue
+            _last_payloads[job.__name__] = payload
+            jobs[name] = {
+                "status": "ok",
+                "seconds": round(time.perf_counter() - started, 3),
+                "snapshot_version": result.get("snapshot_version"),
+            }
+        report["jobs"] = jobs
+        report["finished"] = dt.datetime.now().isoformat(timespec="seconds")
+        return report
 
-        if not (gdp_records and vol_records and sec_records and erp_records):
-            raise ValueError("数据不足：请检查移动平均与滚动周期参数是否过大")
-
-        vol_start = vol_records[0][0]
-        sec_start = sec_records[0][0]
-        erp_start = erp_records[0]["date"]  # type: ignore[assignment]
-        assert isinstance(erp_start, dt.date)
-
-        date_begin = max(vol_start, sec_start, erp_start)
-        gdp_dates_only = [d for d, _ in gdp_records]
-        gdp_start_index = _nearest_index(gdp_dates_only, date_begin)
-        start_date_used = gdp_dates_only[gdp_start_index]
-
-        vol_end = vol_records[-1][0]
-        sec_end = sec_records[-1][0]
-        erp_end = erp_records[-1]["date"]  # type: ignore[assignment]
-        assert isinstance(erp_end, dt.date)
-        gdp_end = gdp_dates_only[-1]
-        date_end = min(gdp_end, vol_end, sec_end, erp_end)
-        gdp_end_index = bisect_right(gdp_dates_only, date_end) - 1
-        if gdp_end_index < gdp_start_index:
-            raise ValueError("合并失败：有效时间区间为空")
-
-        vol_dates_only = [d for d, _ in vol_records]
-        sec_dates_only = [d for d, _ in sec_records]
-        erp_dates_only = [record["date"] for record in erp_records]
-        assert all(isinstance(d, dt.date) for d in erp_dates_only)
-        erp_dates_only_typed: list[dt.date] = [d for d in erp_dates_only if isinstance(d, dt.date)]
-
-        header = ["日期", "股权风险溢价分位", "全A点位", "市场温度"]
-        if include_gdp:
-            header.insert(1, "市值/GDP分位")
-        if include_volume:
-            header.insert(2 if include_gdp else 1, "成交量/市值分位")
-        if include_securities:
-            insert_at = 3 if include_gdp and include_volume else 2 if (include_gdp or include_volume) else 1
-            header.insert(insert_at, "融资融券/市值分位")
-        if include_erp:
-            header.append("股权风险溢价")
-        if include_yield:
-            header.append("十年国债收益率")
-
-        rows: list[list[object]] = [header]
-        one_decimal_columns = {
-            "市值/GDP分位",
-            "成交量/市值分位",
-            "融资融券/市值分位",
-            "股权风险溢价分位",
-            "市场温度",
-            "全A点位",
+
+_input_watcher = _InputWatcher(WATCH_INTERVAL_SECONDS, WATCH_DEBOUNCE_SECONDS)
+
+
+def start_input_watcher() -> None:
+    _input_watcher.start()
+
+
+def stop_input_watcher() -> None:
+    _input_watcher.stop()
+
+
+def _build_outputs(task_payloads: dict[str, dict[str, object]], *, force: bool) -> dict[str, object]:
+    # 在一次流水线运行中生成给定的输出任务：输入只解析一次，中间序列在任务间共享。
+    # 缺少必需参数的任务跳过；某个任务出错时只影响依赖它的任务，出错的任务列在 failed 中。
+    targets: dict[str, dict[str, object]] = {}
+    tasks: dict[str, object] = {}
+    for name, task_payload in task_payloads.items():
+        task_payload = {key: value for key, value in task_payload.items() if key != "force"}
+        missing = [param for param in PIPELINE_TASKS[name].required if task_payload.get(param) in (None, "")]
+        if missing:
+            tasks[name] = {"status": "skipped", "reason": f"缺少参数：{'、'.join(missing)}"}
+            continue
+        targets[name] = task_payload
+
+    started = time.perf_counter()
+    computed: dict[str, float] = {}
+    errors: dict[str, str] = {}
+    results = _run_pipeline(targets, force=force, computed=computed, errors=errors)
+    for name, task_payload in targets.items():
+        if name in errors:
+            tasks[name] = {"status": "error", "error": errors[name]}
+            continue
+        _last_payloads[WATCH_JOBS[name][0].__name__] = task_payload
+        result: dict[str, object] = results[name]  # type: ignore[assignment]
+        tasks[name] = {
+            "status": "up_to_date" if result.get("up_to_date") else "ok",
+            "output_files": result.get("output_files", []),
         }
+    return {
+        "tasks": {name: tasks[name] for name in PIPELINE_TASKS if name in tasks},
+        "computed": computed,
+        "failed": [name for name in PIPELINE_TASKS if name in errors],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
 
-        def _get_percentile(records: list[tuple[dt.date, float]], dates_only: list[dt.date], target: dt.date) -> float:
-            idx = _nearest_index(dates_only, target)
-            return float(records[idx][1])
-
-        for gdp_idx in range(gdp_start_index, gdp_end_index + 1):
-            date_value = gdp_dates_only[gdp_idx]
-            gdp_pct = float(gdp_records[gdp_idx][1])
-            vol_pct = _get_percentile(vol_records, vol_dates_only, date_value)
-            sec_pct = _get_percentile(sec_records, sec_dates_only, date_value)
-
-            erp_idx = _nearest_index(erp_dates_only_typed, date_value)
-            erp_record = erp_records[erp_idx]
-            erp_pct = float(erp_record["erp_percentile"])
-            close_value = float(erp_record["close"])
-            erp_value = float(erp_record["erp"])
-            yield_value = float(erp_record["yield"])
-
-            temperature = (
-                weight_gdp * gdp_pct
-                + weight_volume * vol_pct
-                + weight_securities * sec_pct
-                + weight_erp * (100.0 - erp_pct)
-            ) / 100.0
-
-            row: dict[str, object] = {
-                "日期": date_value.isoformat(),
-                "市值/GDP分位": gdp_pct,
-                "成交量/市值分位": vol_pct,
-                "融资融券/市值分位": sec_pct,
-                "股权风险溢价分位": erp_pct,
-                "股权风险溢价": erp_value,
-                "十年国债收益率": yield_value,
-                "全A点位": close_value,
-                "市场温度": temperature,
-            }
-            output_row: list[object] = []
-            for col in header:
-                value = row.get(col, "")
-                if col in one_decimal_columns and isinstance(value, (int, float)) and not isinstance(value, bool):
-                    value = round(float(value), 1)
-                output_row.append(value)
-            rows.append(output_row)
-
-        output_name = "Market_Thermometer.csv"
-        _write_csv(rows, OUTPUT_DIR / output_name)
-        return jsonify(
-            {
-                "output_csv": output_name,
-                "date_begin": date_begin.isoformat(),
-                "date_begin_used": start_date_used.isoformat(),
-                "date_end": date_end.isoformat(),
-                "columns": header,
-            }
-        )
-    except FileNotFoundError as exc:
-        return jsonify({"error": str(exc)}), 404
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), 400
-    except Exception as exc:  # pragma: no cover
-        return jsonify({"error": f"生成失败：{exc}"}), 500
+
+def _job_build(payload: dict[str, object]) -> dict[str, object]:
+    # 一次生成全部输出：同一份参数（n、start_date/end_date、温度计窗口与权重、output_formats 等）
+    # 交给每个输出任务，各取所需。force 为真时忽略“已是最新”全部重算。
+    force = _payload_bool(payload, "force", False)
+    shared = {key: value for key, value in payload.items() if key != "force"}
+    return _build_outputs({name: shared for name, task in PIPELINE_TASKS.items() if task.outputs}, force=force)
+
+
+def _job_rebuild(payload: dict[str, object]) -> dict[str, object]:
+    # 重建全部输出：各任务沿用最近一次成功运行的参数，请求中的参数（如 output_formats）覆盖到每个任务上。
+    force = _payload_bool(payload, "force", False)
+    overrides = {key: value for key, value in payload.items() if key != "force"}
+    return _build_outputs(
+        {
+            name: {**(_last_job_payload(name) or {}), **overrides}
+            for name, task in PIPELINE_TASKS.items()
+            if task.outputs
+        },
+        force=force,
+    )
+
+
+def __getattr__(name: str) -> object:
+    # 兼容 `app:app` 形式的 WSGI 入口：首次访问 app.app 时才导入 Web 层（Flask）。
+    if name == "app":
+        from web import app as web_app
+
+        return web_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    debug = os.environ.get("DP_DEBUG") == "1"
-    app.run(host="127.0.0.1", port=5000, debug=debug, use_reloader=False)
+    # Web 层导入的是模块 app 而不是这里的 __main__，由它启动开发服务器。
+    import web
+
+    web.run_dev_server()
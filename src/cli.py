@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
+# 命令 → (app 中的任务函数, 说明)。参数解析不导入 app，--help 与参数错误立即返回。
+COMMANDS = {
+    "convert": ("_job_convert", "格式转换（Feature 1）：input/ 下的文件导出为 CSV/XLSX 等"),
+    "erp": ("_job_erp", "ERP（Feature 2）"),
+    "erp10y": ("_job_erp_10year", "ERP_10Year（Feature 3）"),
+    "rolling": ("_job_erp_rolling", "ERP_Rolling Calculation（Feature 4）"),
+    "interval": ("_job_erp_interval", "ERP_Interval（Feature 5）"),
+    "thermometer-clean": ("_job_thermometer_clean", "市场温度计数据清洗（Feature 7）"),
+    "thermometer-percentiles": ("_job_thermometer_percentiles", "市场温度计分位（Feature 8）"),
+    "thermometer-merge": ("_job_thermometer_merge", "市场温度计合并与温度（Feature 9）"),
+    "build": ("_job_build", "一次生成 ERP 与温度计的全部输出，每个输入只解析一次"),
+}
+_THERMOMETER_FACTORS = (
+    ("gdp", "moving_average_gdp", "rolling_period_gdp"),
+    ("volume", "moving_average_volume", "rolling_period_volume"),
+    ("securities", "moving_average_securities", "rolling_period_securities"),
+    ("erp", "moving_erp", "rolling_period_erp"),
+)
+_THERMOMETER_WEIGHTS = ("weight_gdp", "weight_volume", "weight_securities_lend", "weight_erp")
+_THERMOMETER_INCLUDES = (
+    "include_gdp_percentile",
+    "include_volume_percentile",
+    "include_securities_percentile",
+    "include_erp",
+    "include_bond_yield",
+)
+# 由命令行参数直接映射为请求参数的键（参数名中的 - 换成 _）。
+_PAYLOAD_KEYS: set[str] = set()
+
+
+def _payload_flag(parser: argparse.ArgumentParser, key: str, **kwargs: object) -> None:
+    _PAYLOAD_KEYS.add(key)
+    parser.add_argument(f"--{key.replace('_', '-')}", dest=key, default=None, **kwargs)  # type: ignore[arg-type]
+
+
+def _add_percentile_flags(parser: argparse.ArgumentParser) -> None:
+    _payload_flag(parser, "percentile_mode", metavar="exact|approx", help="滚动分位的计算方式（默认 exact）")
+    _payload_flag(parser, "percentile_max_error", type=float, metavar="X", help="approx 模式允许的分位误差（默认 1）")
+
+
+def _add_rolling_flags(parser: argparse.ArgumentParser, *, percentile: bool = True) -> None:
+    _payload_flag(parser, "n", type=int, metavar="N", help="滚动窗口（交易日，1-4000）")
+    if percentile:
+        _add_percentile_flags(parser)
+
+
+def _add_interval_flags(parser: argparse.ArgumentParser) -> None:
+    _payload_flag(parser, "start_date", metavar="YYYY-MM-DD", help="起始日期")
+    _payload_flag(parser, "end_date", metavar="YYYY-MM-DD", help="终止日期（默认今天）")
+
+
+def _add_thermometer_flags(parser: argparse.ArgumentParser, *, merge: bool) -> None:
+    for factor, moving_key, rolling_key in _THERMOMETER_FACTORS:
+        _payload_flag(parser, moving_key, type=int, metavar="N", help=f"{factor} 平均移动窗口")
+        _payload_flag(parser, rolling_key, type=int, metavar="N", help=f"{factor} 滚动分位周期")
+        _payload_flag(parser, f"smoothing_{factor}", metavar="METHOD", help=f"{factor} 平滑方式（默认 sma）")
+    _add_percentile_flags(parser)
+    if not merge:
+        return
+    for key in _THERMOMETER_WEIGHTS:
+        _payload_flag(parser, key, type=float, metavar="PCT", help="权重（0-100，合计不超过 100）")
+    for key in _THERMOMETER_INCLUDES:
+        _payload_flag(parser, key, action=argparse.BooleanOptionalAction, help="输出中是否包含该列（默认包含）")
+
+
+def _parse_value(text: str) -> object:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--jobs", type=int, default=None, metavar="N", help="并行度：流水线线程数与解析分卷的工作进程数")
+    common.add_argument("--incremental", action="store_true", help="输入、参数与代码都未变化且输出未被改动时跳过")
+    common.add_argument("--formats", default=None, metavar="csv,xlsx,…", help="输出格式（逗号分隔）")
+    common.add_argument("--params", type=Path, help="参数 JSON 文件，内容与对应接口的请求体相同")
+    common.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="设置单个参数（可重复，优先于其他参数）；VALUE 按 JSON 解析，解析失败时视为字符串",
+    )
+    common.add_argument("--input-dir", type=Path, help="输入目录（默认 input/）")
+    common.add_argument("--output-dir", type=Path, help="输出目录（默认 docs/data/）")
+
+    parser = argparse.ArgumentParser(
+        description="DataProcessing 命令行批处理：不启动 Web 服务，结果与各步耗时以 JSON 输出到标准输出"
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    subparsers = {
+        name: commands.add_parser(name, parents=[common], help=help_text) for name, (_, help_text) in COMMANDS.items()
+    }
+    subparsers["convert"].add_argument("files", nargs="*", metavar="FILE", help="input/ 下的文件名")
+    subparsers["convert"].add_argument("--all", action="store_true", help="转换 input/ 下的全部文件")
+    _add_rolling_flags(subparsers["rolling"])
+    _add_interval_flags(subparsers["interval"])
+    _add_thermometer_flags(subparsers["thermometer-percentiles"], merge=False)
+    _add_thermometer_flags(subparsers["thermometer-merge"], merge=True)
+    _add_thermometer_flags(subparsers["build"], merge=True)
+    _add_rolling_flags(subparsers["build"], percentile=False)
+    _add_interval_flags(subparsers["build"])
+    args = parser.parse_args(argv)
+
+    if args.jobs is not None and args.jobs <= 0:
+        parser.error("--jobs 必须为正整数")
+    if args.command == "convert" and not args.files and not args.all:
+        parser.error("convert 需要文件名或 --all")
+
+    payload: dict[str, object] = {}
+    if args.params is not None:
+        try:
+            loaded = json.loads(args.params.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            parser.error(f"无法读取参数文件 {args.params}：{exc}")
+        if not isinstance(loaded, dict):
+            parser.error("参数文件必须是 JSON 对象")
+        payload.update(loaded)
+    for key in _PAYLOAD_KEYS:
+        value = getattr(args, key, None)
+        if value is not None:
+            payload[key] = value
+    if args.formats is not None:
+        payload["output_formats"] = args.formats
+    for item in args.overrides:
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            parser.error(f"--set 格式必须为 KEY=VALUE：{item}")
+        payload[key.strip()] = _parse_value(value)
+    # 命令行默认总是重算（定时任务的预期）；--incremental 时已是最新的输出直接跳过。
+    payload["force"] = not args.incremental
+    args.payload = payload
+    return args
+
+
+def _report(name: str, started: float, result: dict[str, object] | None, error: str | None) -> dict[str, object]:
+    entry: dict[str, object] = {"name": name, "seconds": round(time.perf_counter() - started, 3)}
+    if error is None and result and result.get("failed"):
+        # build 中部分任务出错：其余输出照常写出，整体仍记为出错。
+        error = f"任务出错：{'、'.join(result['failed'])}"  # type: ignore[arg-type]
+    if error is not None:
+        entry.update(status="error", error=error)
+        if result is not None:
+            entry["result"] = result
+    else:
+        entry.update(status="up_to_date" if result and result.get("up_to_date") else "ok", result=result)
+    return entry
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    # app 在导入时读取并行度配置，因此必须先写入环境变量。
+    if args.jobs is not None:
+        os.environ["DP_PIPELINE_THREADS"] = str(args.jobs)
+        os.environ["DP_WORKERS"] = str(args.jobs)
+    import_started = time.perf_counter()
+    import app as app_module
+
+    import_seconds = time.perf_counter() - import_started
+    if args.input_dir is not None:
+        app_module.INPUT_DIR = args.input_dir.resolve()
+    if args.output_dir is not None:
+        app_module.OUTPUT_DIR = args.output_dir.resolve()
+
+    job = getattr(app_module, COMMANDS[args.command][0])
+    runs: list[tuple[str, dict[str, object]]] = [(args.command, args.payload)]
+    if args.command == "convert":
+        files = app_module._input_files() if args.all else args.files
+        runs = [(filename, {**args.payload, "filename": filename}) for filename in files]
+
+    reports: list[dict[str, object]] = []
+    try:
+        if args.command == "convert" and len(runs) > 1 and (args.jobs or 1) > 1:
+            # 多个文件的转换互不依赖，提交到工作进程池并行执行；各文件的耗时为提交到完成的时间。
+            started = time.perf_counter()
+            futures = []
+            for name, payload in runs:
+                try:
+                    app_module._checked_input_name(name)
+                except (FileNotFoundError, ValueError) as exc:
+                    futures.append((name, None, str(exc)))
+                    continue
+                futures.append((name, app_module._get_process_pool().submit(app_module._execute_job, job, payload), None))
+            for name, future, error in futures:
+                result = None
+                if future is not None:
+                    try:
+                        result = future.result()
+                    except (FileNotFoundError, ValueError) as exc:
+                        error = str(exc)
+                reports.append(_report(name, started, result, error))
+        else:
+            for name, payload in runs:
+                started = time.perf_counter()
+                result, error = None, None
+                try:
+                    if args.command == "convert":
+                        app_module._checked_input_name(name)
+                    result = app_module._execute_job(job, payload)
+                except (FileNotFoundError, ValueError) as exc:
+                    error = str(exc)
+                reports.append(_report(name, started, result, error))
+    finally:
+        app_module.shutdown_execution_backend(wait=True)
+
+    summary = {
+        "command": args.command,
+        "jobs": reports,
+        "import_seconds": round(import_seconds, 3),
+        "seconds": round(time.perf_counter() - _STARTED, 3),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if any(report["status"] == "error" for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
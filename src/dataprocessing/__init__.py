@@ -0,0 +1,80 @@
+# DataProcessing 计算引擎：不依赖 Web 层与 app 的目录配置，公开函数只接收显式的路径与序列。
+# 公开名称按需从所在子模块导入（import dataprocessing 本身不加载任何子模块），也可以直接导入子模块：
+#   io          输入查找、表格读取与多格式写出
+#   validation  单元格校验与格式转换的整表校验
+#   series      PE/国债/比率输入序列与 ERP
+#   rolling     滚动分位、平滑与 ERP 带宽
+#   thermometer 市场温度计的分位、对齐与温度
+from __future__ import annotations
+
+from importlib import import_module
+
+_EXPORTS = {
+    "INDICES_DIR_NAME": "io",
+    "INPUT_SUFFIXES": "io",
+    "OUTPUT_FORMATS": "io",
+    "UNSAFE_FILE_CHARS": "io",
+    "cell_to_text": "io",
+    "check_output_formats": "io",
+    "discover_indices": "io",
+    "file_fingerprint": "io",
+    "find_input_parts": "io",
+    "matches_input_stem": "io",
+    "parts_fingerprint": "io",
+    "round_for_output": "io",
+    "write_table": "io",
+    "MAX_VALIDATION_ERRORS": "validation",
+    "ValidationErrors": "validation",
+    "validate_table": "validation",
+    "ErpSeries": "series",
+    "erp_columns": "series",
+    "erp_from_pe": "series",
+    "erp_rows": "series",
+    "erp_series": "series",
+    "iter_bond": "series",
+    "iter_erp_rows": "series",
+    "iter_index_pe": "series",
+    "iter_pe": "series",
+    "iter_ratio_table": "series",
+    "merge_by_bond_dates": "series",
+    "ratio_columns": "series",
+    "read_bond": "series",
+    "read_index_pe": "series",
+    "read_pe": "series",
+    "read_ratio": "series",
+    "read_ratio_rows": "series",
+    "PERCENTILE_MAX_ERROR_LIMIT": "rolling",
+    "SMOOTHERS": "rolling",
+    "erp_interval_bands": "rolling",
+    "erp_rolling_bands": "rolling",
+    "exact_fallback_reason": "rolling",
+    "exact_fallbacks": "rolling",
+    "iter_erp_rolling_bands": "rolling",
+    "median_rank_error_bound": "rolling",
+    "moving_average": "rolling",
+    "percentile_error_bounds": "rolling",
+    "rolling_band_stats": "rolling",
+    "rolling_percentiles": "rolling",
+    "cached_erp_percentile_records": "thermometer",
+    "cached_parsed_dates": "thermometer",
+    "cached_percentile_records": "thermometer",
+    "cached_smoothed_percentiles": "thermometer",
+    "nearest_index": "thermometer",
+    "pearson": "thermometer",
+    "percentile_records": "thermometer",
+    "smoothed_percentiles": "thermometer",
+    "temperatures": "thermometer",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str) -> object:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f"{__name__}.{module}"), name)
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_EXPORTS})
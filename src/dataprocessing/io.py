@@ -0,0 +1,904 @@
+# 输入与输出：按扩展名打开 .xlsx/.csv/Parquet/Arrow 输入、解析日期、查找输入分卷、按日期排序与归并，
+# 以及把同一张表流式写成 CSV/XLSX/列式文件。所有函数都接收显式的路径，不依赖 app 的目录配置。
+from __future__ import annotations
+
+from array import array
+import codecs
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+import csv
+import datetime as dt
+import heapq
+from itertools import islice
+import math
+import os
+from pathlib import Path
+import re
+import sys
+from types import ModuleType
+from typing import IO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+OUTPUT_DECIMAL_PLACES = 6
+# 单个排序块的最大行数；超过后分块落盘并做外部归并排序。
+SORT_CHUNK_ROWS = 200_000
+
+
+def cell_to_text(value: object) -> str:
+    # CSV 输出的单元格文本：日期为 ISO 格式，浮点数按 OUTPUT_DECIMAL_PLACES 位小数并去掉末尾的 0。
+    if value is None:
+        return ""
+    if isinstance(value, (dt.date, dt.datetime, dt.time)):
+        return value.isoformat()
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return str(value)
+        rounded = round(value, OUTPUT_DECIMAL_PLACES)
+        text = f"{rounded:.{OUTPUT_DECIMAL_PLACES}f}"
+        return text.rstrip("0").rstrip(".")
+    return str(value)
+
+
+def round_for_output(value: object) -> object:
+    # XLSX 等类型化输出中的单元格值：浮点数按与 CSV 相同的位数舍入，其余原样。
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return value
+        return round(value, OUTPUT_DECIMAL_PLACES)
+    return value
+
+
+# Excel 1900 日期系统的序数起点（同 openpyxl.utils.datetime.WINDOWS_EPOCH）；CSV 与 Parquet/Arrow 输入按此解释数值日期。
+_WINDOWS_EPOCH = dt.datetime(1899, 12, 30)
+
+
+def _column_letter(index: int) -> str:
+    # 1 → A，27 → AA（同 openpyxl.utils.cell.get_column_letter）。
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _parse_date(value: object, *, epoch: dt.datetime) -> dt.date:
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date) and not isinstance(value, dt.datetime):
+        return value
+    if isinstance(value, bool):
+        raise ValueError("布尔类型不是有效日期")
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            raise ValueError("数值为 NaN/Inf")
+        from openpyxl.utils.datetime import from_excel
+
+        return from_excel(value, epoch=epoch).date()
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            raise ValueError("日期为空白")
+        candidates = (
+            "%Y-%m-%d",
+            "%Y/%m/%d",
+            "%Y.%m.%d",
+            "%Y%m%d",
+            "%Y-%m-%d %H:%M:%S",
+            "%Y/%m/%d %H:%M:%S",
+        )
+        for fmt in candidates:
+            try:
+                parsed = dt.datetime.strptime(text, fmt)
+                return parsed.date()
+            except ValueError:
+                continue
+        try:
+            return dt.date.fromisoformat(text)
+        except ValueError as exc:
+            raise ValueError(f"无法解析日期：{text}") from exc
+    raise ValueError(f"不支持的日期类型：{type(value).__name__}")
+
+
+def _fixed_width_date(text: str, sep: str) -> dt.date | None:
+    if len(text) != 10 or text[4] != sep or text[7] != sep or not text.isascii():
+        return None
+    year, month, day = text[0:4], text[5:7], text[8:10]
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+    try:
+        return dt.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _iso_date(text: str) -> dt.date | None:
+    if len(text) != 10 or text[4] != "-" or text[7] != "-" or not text.isascii():
+        return None
+    try:
+        return dt.date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _fixed_width_compact_date(text: str) -> dt.date | None:
+    if len(text) != 8 or not (text.isascii() and text.isdigit()):
+        return None
+    try:
+        return dt.date(int(text[0:4]), int(text[4:6]), int(text[6:8]))
+    except ValueError:
+        return None
+
+
+def _fixed_width_datetime(text: str, sep: str) -> dt.date | None:
+    if len(text) != 19 or text[10] != " " or text[13] != ":" or text[16] != ":" or not text.isascii():
+        return None
+    date = _fixed_width_date(text[:10], sep)
+    if date is None:
+        return None
+    hour, minute, second = text[11:13], text[14:16], text[17:19]
+    if not (hour.isdigit() and minute.isdigit() and second.isdigit()):
+        return None
+    try:
+        dt.time(int(hour), int(minute), int(second))
+    except ValueError:
+        return None
+    return date
+
+
+def _detect_date_text_parser(text: str) -> Callable[[str], dt.date | None] | None:
+    if len(text) == 10 and text[4] == "-" and text[7] == "-":
+        return _iso_date
+    if len(text) == 10 and text[4] in "/." and text[7] == text[4]:
+        sep = text[4]
+        return lambda value: _fixed_width_date(value, sep)
+    if len(text) == 8 and text.isdigit():
+        return _fixed_width_compact_date
+    if len(text) == 19 and text[4] in "-/" and text[7] == text[4]:
+        sep = text[4]
+        return lambda value: _fixed_width_datetime(value, sep)
+    return None
+
+
+def _make_date_parser(epoch: dt.datetime) -> Callable[[object], dt.date]:
+    # 一列日期几乎总是同一种写法：按首个文本单元格识别格式后走定宽快路径，
+    # Excel 序列号按值缓存；快路径不匹配时回退到 _parse_date 的完整格式级联。
+    serial_cache: dict[object, dt.date] = {}
+    text_parser: Callable[[str], dt.date | None] | None = None
+    detected = False
+
+    def parse(value: object) -> dt.date:
+        nonlocal text_parser, detected
+        value_type = type(value)
+        if value_type is dt.datetime:
+            return value.date()  # type: ignore[attr-defined]
+        if value_type is dt.date:
+            return value  # type: ignore[return-value]
+        if value_type is int or value_type is float:
+            cached = serial_cache.get(value)
+            if cached is None:
+                cached = _parse_date(value, epoch=epoch)
+                serial_cache[value] = cached
+            return cached
+        if value_type is str:
+            text = value.strip()  # type: ignore[attr-defined]
+            if not detected and text:
+                text_parser = _detect_date_text_parser(text)
+                detected = True
+            if text_parser is not None:
+                parsed = text_parser(text)
+                if parsed is not None:
+                    return parsed
+        return _parse_date(value, epoch=epoch)
+
+    return parse
+
+
+# 支持的输入格式，按优先级排列：同名文件有多种格式时优先读取列式文件，.xlsx 作为兜底。
+INPUT_SUFFIXES = (".parquet", ".arrow", ".feather", ".ipc", ".csv", ".xlsx")
+_ARROW_SUFFIXES = (".parquet", ".arrow", ".feather", ".ipc")
+
+
+def _preferred_input(paths: list[Path]) -> Path:
+    # 同名文件存在多种格式时按 INPUT_SUFFIXES 的顺序取一个；同一格式重复（如大小写不同）视为冲突。
+    paths = sorted(paths, key=lambda path: INPUT_SUFFIXES.index(path.suffix.lower()))
+    if len(paths) > 1 and paths[0].suffix.lower() == paths[1].suffix.lower():
+        raise FileNotFoundError(f"找到多个匹配文件：{paths[0].name}（请保留一个）")
+    return paths[0]
+
+
+def _normalize_stem(text: str) -> str:
+    return " ".join(text.strip().split()).lower()
+
+
+def matches_input_stem(stem: str, name: str) -> bool:
+    # name 为文件名去掉扩展名；stem 本身或其按年份拆分的分卷（如 data_PE_2005、data_PE 2006）都算匹配。
+    normalized = _normalize_stem(name)
+    return normalized == _normalize_stem(stem) or re.fullmatch(
+        re.escape(_normalize_stem(stem)) + r"[ _-]?\d{4}", normalized
+    ) is not None
+
+
+def find_input_parts(input_dir: Path, stem: str) -> list[Path]:
+    # 除 stem 本身外，也收集按年份拆分的分卷（如 data_PE_2005.xlsx、data_PE 2006.csv），按文件名排序返回。
+    if not input_dir.exists():
+        raise FileNotFoundError("input/ 目录不存在")
+
+    by_stem: dict[str, list[Path]] = {}
+    for path in input_dir.iterdir():
+        if not path.is_file():
+            continue
+        if path.name.startswith("~$"):
+            continue
+        if path.suffix.lower() not in INPUT_SUFFIXES:
+            continue
+        if matches_input_stem(stem, path.stem):
+            by_stem.setdefault(_normalize_stem(path.stem), []).append(path)
+
+    if not by_stem:
+        raise FileNotFoundError(f"未找到文件：{stem}.xlsx（也支持 .csv/.parquet/.arrow，请放入 input/）")
+
+    return [
+        _preferred_input(by_stem[name]) for name in sorted(by_stem, key=lambda name: (name != _normalize_stem(stem), name))
+    ]
+
+
+# 多指数批量：input/indices/ 下每个文件是一个指数的 PE 表（文件名即指数名），
+# 每个子目录是一个按年份拆分的指数（目录名即指数名，其中的文件为分卷）。
+INDICES_DIR_NAME = "indices"
+
+
+def _is_input_file(path: Path) -> bool:
+    return path.is_file() and path.suffix.lower() in INPUT_SUFFIXES and not path.name.startswith("~$")
+
+
+def _group_input_files(paths: Iterable[Path]) -> list[Path]:
+    by_stem: dict[str, list[Path]] = {}
+    for path in paths:
+        by_stem.setdefault(path.stem.strip().lower(), []).append(path)
+    return [_preferred_input(by_stem[stem]) for stem in sorted(by_stem)]
+
+
+def discover_indices(input_dir: Path, manifest: object = None) -> dict[str, list[Path]]:
+    # manifest 为 {指数名: 文件名或文件名列表}（相对 input_dir）时按清单读取，否则扫描 input_dir/indices/。
+    if manifest is not None:
+        if not isinstance(manifest, dict) or not manifest:
+            raise ValueError("indices 必须为非空的 {指数名: 文件名或文件名列表}")
+        indices: dict[str, list[Path]] = {}
+        input_root = input_dir.resolve()
+        for name, files in manifest.items():
+            if not isinstance(name, str) or not name.strip():
+                raise ValueError("indices 中的指数名不能为空")
+            file_names = [files] if isinstance(files, str) else files
+            if not isinstance(file_names, list) or not file_names or not all(isinstance(item, str) for item in file_names):
+                raise ValueError(f"indices[{name}] 必须为文件名或文件名列表")
+            paths: list[Path] = []
+            for file_name in file_names:
+                path = (input_dir / file_name).resolve()
+                if not path.is_relative_to(input_root) or path.suffix.lower() not in INPUT_SUFFIXES:
+                    raise ValueError(f"indices[{name}] 文件名不合法：{file_name}")
+                if not path.is_file():
+                    raise FileNotFoundError(f"未找到文件：{file_name}")
+                paths.append(path)
+            indices[name.strip()] = sorted(paths, key=lambda path: path.name)
+        return indices
+
+    directory = input_dir / INDICES_DIR_NAME
+    if not directory.is_dir():
+        raise FileNotFoundError(f"input/{INDICES_DIR_NAME}/ 目录不存在")
+    indices = {}
+    entries = sorted(directory.iterdir(), key=lambda path: path.name)
+    for path in _group_input_files(path for path in entries if _is_input_file(path)):
+        indices[path.stem.strip()] = [path]
+    for path in entries:
+        if path.is_dir():
+            parts = _group_input_files(part for part in path.iterdir() if _is_input_file(part))
+            if parts:
+                if path.name.strip() in indices:
+                    raise FileNotFoundError(f"指数 {path.name} 同时存在文件与目录（请保留一个）")
+                indices[path.name.strip()] = parts
+    if not indices:
+        raise FileNotFoundError(f"input/{INDICES_DIR_NAME}/ 中没有指数 PE 文件")
+    return indices
+
+
+def _is_blank_cell(value: object) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _iter_rows_values(sheet: object, *, last_col: int) -> Iterable[tuple[object, ...]]:
+    for row_values in sheet.iter_rows(values_only=True):
+        values = tuple(row_values[:last_col])
+        if len(values) < last_col:
+            values = values + (None,) * (last_col - len(values))
+        yield values
+
+
+def _import_openpyxl() -> ModuleType:
+    # openpyxl 只在读取 .xlsx 时导入，命令行与只处理 CSV/Parquet 的任务不承担其导入开销。
+    try:
+        import openpyxl
+    except ImportError as exc:
+        raise ValueError("读取 Excel 文件需要安装 openpyxl（pip install -r requirements.txt）") from exc
+    return openpyxl
+
+
+def _import_pyarrow() -> ModuleType:
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ValueError("读取/写出 Parquet、Arrow 文件需要安装 pyarrow（pip install pyarrow）") from exc
+    return pyarrow
+
+
+def _sniff_csv_encoding(source_path: Path) -> str:
+    # 厂商导出的 CSV 常见 UTF-8（含 BOM）与 GBK 两种编码，按文件开头判断。
+    with source_path.open("rb") as handle:
+        head = handle.read(1 << 20)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "gb18030"
+    return "utf-8-sig"
+
+
+class _CsvSheet:
+    # 以与 openpyxl 只读工作表相同的 iter_rows 接口逐行流式读取 CSV；空字符串视为空白单元格。
+    def __init__(self, source_path: Path) -> None:
+        self.source_path = source_path
+        self.encoding = _sniff_csv_encoding(source_path)
+
+    def _rows(self, max_col: int | None) -> Iterator[tuple[object, ...]]:
+        with self.source_path.open("r", encoding=self.encoding, newline="") as handle:
+            for row in csv.reader(handle):
+                yield tuple(cell if cell != "" else None for cell in row[:max_col])
+
+    def iter_rows(
+        self, *, max_row: int | None = None, max_col: int | None = None, values_only: bool = True
+    ) -> Iterator[tuple[object, ...]]:
+        return islice(self._rows(max_col), max_row)
+
+
+class _ArrowSheet:
+    # Parquet / Arrow IPC（Feather v2）：列名作为标题行，只读取前 max_col 列，按记录批次转换为行。
+    # Arrow IPC 文件通过内存映射读取，不复制列数据。
+    def __init__(self, source_path: Path) -> None:
+        self.pa = _import_pyarrow()
+        self.source_path = source_path
+        if source_path.suffix.lower() == ".parquet":
+            self.column_names = list(self.pa.parquet.read_schema(source_path).names)
+        else:
+            with self.pa.memory_map(str(source_path)) as source:
+                self.column_names = list(self.pa.ipc.open_file(source).schema.names)
+
+    def _batches(self, column_count: int) -> Iterator[list[object]]:
+        if self.source_path.suffix.lower() == ".parquet":
+            parquet_file = self.pa.parquet.ParquetFile(self.source_path)
+            for batch in parquet_file.iter_batches(columns=self.column_names[:column_count]):
+                yield batch.columns
+            return
+        with self.pa.memory_map(str(self.source_path)) as source:
+            reader = self.pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                yield [batch.column(position) for position in range(column_count)]
+
+    def _rows(self, max_col: int | None) -> Iterator[tuple[object, ...]]:
+        names = self.column_names[:max_col]
+        yield tuple(names)
+        float64 = self.pa.float64()
+        for columns in self._batches(len(names)):
+            values = [
+                (column.cast(float64) if self.pa.types.is_decimal(column.type) else column).to_pylist()
+                for column in columns
+            ]
+            yield from zip(*values)
+
+    def iter_rows(
+        self, *, max_row: int | None = None, max_col: int | None = None, values_only: bool = True
+    ) -> Iterator[tuple[object, ...]]:
+        return islice(self._rows(max_col), max_row)
+
+
+def _first_header_cell(sheet: object) -> str | None:
+    for row_values in sheet.iter_rows(max_row=1, max_col=1, values_only=True):
+        if row_values and not _is_blank_cell(row_values[0]):
+            return str(row_values[0]).strip()
+    return None
+
+
+@contextmanager
+def _open_data_sheets(
+    source_path: Path, *, label: str = ""
+) -> Iterator[tuple[list[tuple[str, object]], dt.datetime]]:
+    # 按扩展名选择读取方式：.csv 与 Parquet/Arrow 各视为单个工作表，其余按 .xlsx 读取。
+    # 工作簿中第一个工作表之外，A1 标题与之相同的工作表（如按年份分表）也一并返回，按工作簿中的顺序排列。
+    suffix = source_path.suffix.lower()
+    if suffix == ".csv":
+        yield [(source_path.stem, _CsvSheet(source_path))], _WINDOWS_EPOCH
+        return
+    if suffix in _ARROW_SUFFIXES:
+        yield [(source_path.stem, _ArrowSheet(source_path))], _WINDOWS_EPOCH
+        return
+
+    workbook = _import_openpyxl().load_workbook(source_path, data_only=True, read_only=True)
+    try:
+        sheet_names = workbook.sheetnames
+        if not sheet_names:
+            raise ValueError(f"{label}：未找到可用工作表" if label else "未找到可用工作表")
+        sheets = [(sheet_names[0], workbook[sheet_names[0]])]
+        if len(sheet_names) > 1:
+            first_header = _first_header_cell(sheets[0][1])
+            if first_header is not None:
+                for sheet_name in sheet_names[1:]:
+                    sheet = workbook[sheet_name]
+                    if _first_header_cell(sheet) == first_header:
+                        sheets.append((sheet_name, sheet))
+        yield sheets, workbook.epoch
+    finally:
+        workbook.close()
+
+
+def _row_date(row: Sequence[object]) -> object:
+    return row[0]
+
+
+def _spill_run(rows: list[tuple[object, ...]]) -> IO[bytes]:
+    import pickle
+    import tempfile
+
+    handle = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(handle, protocol=pickle.HIGHEST_PROTOCOL)
+    for row in rows:
+        pickler.dump(row)
+    handle.seek(0)
+    return handle
+
+
+def _iter_run(handle: IO[bytes]) -> Iterator[tuple[object, ...]]:
+    import pickle
+
+    unpickler = pickle.Unpickler(handle)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
+
+
+def _sorted_by_date(
+    rows: Iterable[tuple[object, ...]],
+    *,
+    chunk_size: int = SORT_CHUNK_ROWS,
+) -> Iterator[tuple[object, ...]]:
+    # 已按日期升序的前缀原样收下、不排序也不落盘（常见情况下就是整张表）；从第一条乱序行起，
+    # 其余行按块排序、落盘，最后与前缀做稳定的 k 路归并。后面的行可能排在前缀之前，因此前缀须等输入读完才能输出。
+    rows = iter(rows)
+    prefix: list[tuple[object, ...]] = []
+    for row in rows:
+        if prefix and row[0] < prefix[-1][0]:
+            break
+        prefix.append(row)
+    else:
+        yield from prefix
+        return
+
+    chunk = [row]
+    runs: list[IO[bytes]] = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                chunk.sort(key=_row_date)
+                runs.append(_spill_run(chunk))
+                chunk = []
+        chunk.sort(key=_row_date)
+        yield from heapq.merge(prefix, *(_iter_run(handle) for handle in runs), chunk, key=_row_date)
+    finally:
+        for handle in runs:
+            handle.close()
+
+
+def _read_sorted_part(
+    reader: Callable[..., Iterable[tuple[object, ...]]], source_path: Path, label: str
+) -> list[tuple[object, ...]]:
+    return list(_sorted_by_date(reader(source_path, label=label)))
+
+
+def _read_parts(
+    reader: Callable[..., Iterable[tuple[object, ...]]],
+    source_paths: Sequence[Path],
+    *,
+    label: str,
+    executor: Executor | None = None,
+) -> list[Iterable[tuple[object, ...]]]:
+    # 单个文件保持流式读取；多个分卷各自解析并排序，给出 executor 时并行提交（reader 须可跨进程传递）。
+    if len(source_paths) == 1:
+        return [_sorted_by_date(reader(source_paths[0], label=label))]
+    if executor is None:
+        return [_read_sorted_part(reader, path, path.name) for path in source_paths]
+
+    futures = [executor.submit(_read_sorted_part, reader, path, path.name) for path in source_paths]
+    try:
+        return [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def _merge_sorted_parts(parts: Sequence[Iterable[tuple[object, ...]]]) -> Iterator[tuple[object, ...]]:
+    # 对已排序的分卷做 k 路堆归并；同一日期出现在多个分卷中时，保留排在后面的分卷（较新的文件）中的行。
+    if len(parts) == 1:
+        yield from parts[0]
+        return
+
+    pending: tuple[object, ...] | None = None
+    for row in heapq.merge(*parts, key=_row_date):
+        if pending is not None and row[0] != pending[0]:
+            yield pending
+        pending = row
+    if pending is not None:
+        yield pending
+
+
+def parts_fingerprint(source_paths: Sequence[Path]) -> tuple[tuple[str, int, int], ...]:
+    # 各分卷的 (路径, 修改时间, 大小)，任一分卷变化即视为新版本。
+    return tuple(file_fingerprint(path) for path in source_paths)
+
+
+def file_fingerprint(path: Path) -> tuple[str, int, int]:
+    # 文件版本以 (路径, 修改时间, 大小) 计，不读取内容。
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def _temp_path(path: Path) -> Path:
+    # 每次写出使用独立的临时文件（同目录，以 .tmp 结尾）：同一输出被并发写出时各自替换，最后完成的生效。
+    import tempfile
+
+    handle, name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    os.close(handle)
+    # mkstemp 创建的文件仅属主可读，输出目录可能由其他静态服务读取，恢复为常规权限。
+    os.chmod(name, 0o644)
+    return Path(name)
+
+
+@contextmanager
+def _csv_sink(path: Path) -> Iterator[Callable[[Sequence[object]], None]]:
+    # 先写临时文件再原子替换：流式上游中途报错时不会留下半截 CSV。
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        with tmp_path.open("w", encoding="utf-8-sig", newline="") as file_handle:
+            writer = csv.writer(file_handle)
+            yield lambda row: writer.writerow([cell_to_text(value) for value in row])
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_csv(rows: Iterable[Sequence[object]], path: Path) -> None:
+    with _csv_sink(path) as append:
+        for row in rows:
+            append(row)
+
+
+# 轻量 XLSX 写出：直接把工作表 XML 流式写入 zip，不经过 openpyxl 的单元格对象，内存占用与行数无关。
+_XLSX_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_XLSX_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_XLSX_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_XLSX_PKG_REL_NS}">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_XLSX_PKG_REL_NS}">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<styleSheet xmlns="{_XLSX_MAIN_NS}">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        "</styleSheet>"
+    ),
+}
+# XML 1.0 不允许的控制字符（openpyxl 同样拒绝写入这些字符）。
+_XLSX_ILLEGAL_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_XLSX_INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+XLSX_FLUSH_ROWS = 1000
+
+
+def _xlsx_text_cell(ref: str, text: str) -> str:
+    text = _XLSX_ILLEGAL_CHARS.sub("", text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+def _xlsx_row_xml(row_number: int, row: Sequence[object], letters: list[str]) -> str:
+    cells: list[str] = []
+    for position, value in enumerate(row):
+        if value is None or (isinstance(value, float) and not math.isfinite(value)):
+            continue
+        if position >= len(letters):
+            letters.append(_column_letter(position + 1))
+        ref = f"{letters[position]}{row_number}"
+        value = round_for_output(value)
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, int):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        elif isinstance(value, float):
+            cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+        else:
+            cells.append(_xlsx_text_cell(ref, cell_to_text(value)))
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+@contextmanager
+def _xlsx_sink(path: Path, sheet_title: str) -> Iterator[Callable[[Sequence[object]], None]]:
+    # 单工作表、冻结首行首列（B2）；行按块拼接后写入压缩流。
+    title = _XLSX_INVALID_TITLE_CHARS.sub("_", sheet_title)[:31] or "Sheet1"
+    title = title.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    import zipfile
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in _XLSX_STATIC_PARTS.items():
+                archive.writestr(name, content)
+            archive.writestr(
+                "xl/workbook.xml",
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<workbook xmlns="{_XLSX_MAIN_NS}" xmlns:r="{_XLSX_REL_NS}">'
+                f'<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets></workbook>',
+            )
+            with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet_xml:
+                sheet_xml.write(
+                    (
+                        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                        f'<worksheet xmlns="{_XLSX_MAIN_NS}" xmlns:r="{_XLSX_REL_NS}">'
+                        '<sheetViews><sheetView workbookViewId="0">'
+                        '<pane xSplit="1" ySplit="1" topLeftCell="B2" activePane="bottomRight" state="frozen"/>'
+                        '<selection pane="bottomRight" activeCell="B2" sqref="B2"/>'
+                        "</sheetView></sheetViews><sheetData>"
+                    ).encode("utf-8")
+                )
+                letters: list[str] = []
+                pending: list[str] = []
+                row_number = 0
+
+                def append(row: Sequence[object]) -> None:
+                    nonlocal row_number
+                    row_number += 1
+                    pending.append(_xlsx_row_xml(row_number, row, letters))
+                    if len(pending) >= XLSX_FLUSH_ROWS:
+                        sheet_xml.write("".join(pending).encode("utf-8"))
+                        pending.clear()
+
+                yield append
+                sheet_xml.write(("".join(pending) + "</sheetData></worksheet>").encode("utf-8"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_xlsx(rows: Iterable[Sequence[object]], path: Path, sheet_title: str) -> None:
+    with _xlsx_sink(path, sheet_title) as append:
+        for row in rows:
+            append(row)
+
+
+# 输出格式：csv/xlsx 之外可选列式文件，下游可直接内存映射读取而无需解析文本。
+# parquet/feather/arrow 需要 pyarrow；npy 为每列一个 .npy 文件，不依赖第三方库。
+OUTPUT_FORMATS = ("csv", "xlsx", "parquet", "feather", "arrow", "npy")
+_PYARROW_OUTPUT_FORMATS = ("parquet", "feather", "arrow")
+
+
+def check_output_formats(formats: Sequence[str]) -> None:
+    # 在计算之前校验格式名；需要 pyarrow 的格式在 pyarrow 不可用时同样提前报错。
+    unknown = [output_format for output_format in formats if output_format not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"不支持的输出格式：{'、'.join(unknown)}（可选 {'/'.join(OUTPUT_FORMATS)}）")
+    if any(output_format in _PYARROW_OUTPUT_FORMATS for output_format in formats):
+        _import_pyarrow()
+
+
+def _is_iso_date_text(value: object) -> bool:
+    if type(value) is not str or len(value) != 10 or value[4] != "-":  # type: ignore[index]
+        return False
+    try:
+        dt.date.fromisoformat(value)  # type: ignore[arg-type]
+    except ValueError:
+        return False
+    return True
+
+
+def _typed_columns(rows: Sequence[Sequence[object]]) -> tuple[list[str], list[tuple[str, list[object]]]]:
+    # 按列推断类型：ISO 日期文本 → date，全为数值 → float（缺失为 None），其余按文本输出。
+    # 空表没有列；只有标题行时各列为空的 float 列。
+    if not rows:
+        return [], []
+    header = [str(value) for value in rows[0]]
+    data_rows = rows[1:]
+    columns: list[tuple[str, list[object]]] = []
+    for position in range(len(header)):
+        values = [row[position] if position < len(row) else None for row in data_rows]
+        present = [value for value in values if value is not None and value != ""]
+        if present and all(_is_iso_date_text(value) or type(value) is dt.date for value in present):
+            columns.append(
+                ("date", [None if value is None or value == "" else dt.date.fromisoformat(str(value)) for value in values])
+            )
+        elif all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+            columns.append(
+                ("float", [None if value is None or value == "" else round_for_output(float(value)) for value in values])  # type: ignore[arg-type]
+            )
+        else:
+            columns.append(("str", [cell_to_text(value) for value in values]))
+    return header, columns
+
+
+def _replace_atomically(path: Path, write: Callable[[Path], None]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _arrow_table(rows: Sequence[Sequence[object]]) -> object:
+    pa = _import_pyarrow()
+    header, columns = _typed_columns(rows)
+    arrow_types = {"date": pa.date32(), "float": pa.float64(), "str": pa.string()}
+    arrays = [pa.array(values, type=arrow_types[kind]) for kind, values in columns]
+    return pa.table(arrays, names=header)
+
+
+def _write_parquet(rows: Sequence[Sequence[object]], path: Path) -> None:
+    pa = _import_pyarrow()
+    table = _arrow_table(rows)
+    _replace_atomically(path, lambda tmp_path: pa.parquet.write_table(table, tmp_path))
+
+
+def _write_arrow_ipc(rows: Sequence[Sequence[object]], path: Path) -> None:
+    # 不压缩的 Arrow IPC 文件（即 Feather v2），读取端可零拷贝内存映射。
+    pa = _import_pyarrow()
+    table = _arrow_table(rows)
+
+    def write(tmp_path: Path) -> None:
+        with pa.ipc.new_file(str(tmp_path), table.schema) as writer:
+            writer.write_table(table)
+
+    _replace_atomically(path, write)
+
+
+def _npy_bytes(kind: str, values: list[object]) -> bytes:
+    # 手写 .npy（格式版本 1.0）：float → <f8（缺失为 NaN），date → <M8[D]（缺失为 NaT），文本 → <U 定长。
+    if kind == "float":
+        data = array("d", (math.nan if value is None else value for value in values))  # type: ignore[misc]
+        descr = "f8"
+    elif kind == "date":
+        epoch_ordinal = dt.date(1970, 1, 1).toordinal()
+        data = array("q", (-(2**63) if value is None else value.toordinal() - epoch_ordinal for value in values))  # type: ignore[attr-defined]
+        descr = "M8[D]"
+    else:
+        width = max([1, *(len(str(value)) for value in values)])
+        raw = "".join(str(value).ljust(width, "\0") for value in values).encode("utf-32-le")
+        descr = f"U{width}"
+    if kind != "str":
+        if sys.byteorder == "big":
+            data.byteswap()
+        raw = data.tobytes()
+    header = f"{{'descr': '<{descr}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    header += " " * (63 - (10 + len(header)) % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1") + raw
+
+
+# 文件名中不安全的字符（路径分隔符、Windows 保留字符与空白），替换为下划线后用作文件或目录名。
+UNSAFE_FILE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _write_npy_columns(rows: Sequence[Sequence[object]], directory: Path) -> None:
+    # 每列一个文件：<序号>_<列名>.npy；目录中上一次输出遗留的 .npy 会被清理。
+    header, columns = _typed_columns(rows)
+    directory.mkdir(parents=True, exist_ok=True)
+    written: set[str] = set()
+    for position, (name, (kind, values)) in enumerate(zip(header, columns)):
+        file_name = f"{position:02d}_{UNSAFE_FILE_CHARS.sub('_', name)}.npy"
+        payload = _npy_bytes(kind, values)
+        _replace_atomically(directory / file_name, lambda tmp_path: tmp_path.write_bytes(payload))
+        written.add(file_name)
+    for stale in directory.glob("*.npy"):
+        if stale.name not in written:
+            stale.unlink(missing_ok=True)
+
+
+def _output_path(csv_path: Path, output_format: str) -> Path:
+    if output_format == "npy":
+        return csv_path.with_name(f"{csv_path.stem}_npy")
+    return csv_path.with_suffix(f".{output_format}")
+
+
+def write_table(
+    rows: Iterable[Sequence[object]],
+    csv_path: Path,
+    formats: Sequence[str] = ("csv",),
+    *,
+    xlsx_path: Path | None = None,
+    sheet_title: str | None = None,
+    sinks: Sequence[AbstractContextManager[Callable[[Sequence[object]], None]]] = (),
+) -> list[str]:
+    # 按 formats 写出同一张表，返回写出的文件名。CSV 与 XLSX 在同一遍中流式写出；
+    # 需要列式输出时才收集行，流式写完后再一次性写出列式文件。sinks 中的接收器（如快照库）在同一遍中收到每一行。
+    if tuple(formats) == ("csv",) and not sinks:
+        _write_csv(rows, csv_path)
+        return [csv_path.name]
+
+    paths = {
+        output_format: xlsx_path if output_format == "xlsx" and xlsx_path is not None else _output_path(csv_path, output_format)
+        for output_format in formats
+    }
+    collected: list[Sequence[object]] = []
+    with ExitStack() as stack:
+        appenders: list[Callable[[Sequence[object]], None]] = []
+        if "csv" in formats:
+            appenders.append(stack.enter_context(_csv_sink(paths["csv"])))
+        if "xlsx" in formats:
+            appenders.append(stack.enter_context(_xlsx_sink(paths["xlsx"], sheet_title or csv_path.stem[:31])))
+        if any(output_format not in ("csv", "xlsx") for output_format in formats):
+            appenders.append(collected.append)
+        for sink in sinks:
+            appenders.append(stack.enter_context(sink))
+        for row in rows:
+            for append in appenders:
+                append(row)
+
+    for output_format in formats:
+        if output_format == "parquet":
+            _write_parquet(collected, paths[output_format])
+        elif output_format in ("feather", "arrow"):
+            _write_arrow_ipc(collected, paths[output_format])
+        elif output_format == "npy":
+            _write_npy_columns(collected, paths[output_format])
+    return [paths[output_format].name for output_format in formats]
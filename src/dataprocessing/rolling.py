@@ -0,0 +1,631 @@
+# 滚动计算：滚动分位（精确与近似摘要）、平滑方式，以及 ERP 的滚动与区间带宽。
+# 只依赖轻量标准库，导入约数毫秒；只需要这些函数的脚本与工作进程不必加载表格读写与存储相关模块。
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+import datetime as dt
+import heapq
+import math
+
+
+def _rolling_percentile(sorted_window: list[float], value: float) -> float:
+    window_size = len(sorted_window)
+    if window_size <= 0:
+        raise ValueError("窗口为空")
+    if window_size == 1:
+        return 50.0
+    left = bisect_left(sorted_window, value)
+    right = bisect_right(sorted_window, value)
+    rank_low = left + 1
+    rank_high = right
+    avg_rank = (rank_low + rank_high) / 2.0
+    return 100.0 * (avg_rank - 1.0) / (window_size - 1.0)
+
+
+def _moving_average(values: list[float], window: int) -> list[float | None]:
+    if window <= 0:
+        raise ValueError("移动平均窗口必须为正整数")
+    out: list[float | None] = []
+    q: deque[float] = deque()
+    sum_values = 0.0
+    for value in values:
+        q.append(value)
+        sum_values += value
+        if len(q) > window:
+            sum_values -= q.popleft()
+        if len(q) == window:
+            out.append(sum_values / window)
+        else:
+            out.append(None)
+    return out
+
+
+def _exponential_moving_average(values: list[float], window: int) -> list[float | None]:
+    # alpha = 2/(N+1)，以前 N 个值的简单平均作为初值，之后每步 O(1)；前 N-1 个位置与 SMA 一样留空。
+    if window <= 0:
+        raise ValueError("移动平均窗口必须为正整数")
+    out: list[float | None] = [None] * len(values)
+    if len(values) < window:
+        return out
+    alpha = 2.0 / (window + 1.0)
+    current = math.fsum(values[:window]) / window
+    out[window - 1] = current
+    for index in range(window, len(values)):
+        current += alpha * (values[index] - current)
+        out[index] = current
+    return out
+
+
+def _weighted_moving_average(values: list[float], window: int) -> list[float | None]:
+    # 线性加权（最新值权重为 N）：维护窗口和 S 与加权和 W，滑动一步 W += N*新值 - S_旧，S += 新值 - 移出值。
+    if window <= 0:
+        raise ValueError("移动平均窗口必须为正整数")
+    out: list[float | None] = [None] * len(values)
+    if len(values) < window:
+        return out
+    denominator = window * (window + 1) / 2.0
+    sum_values = math.fsum(values[:window])
+    weighted_sum = math.fsum((position + 1) * value for position, value in enumerate(values[:window]))
+    out[window - 1] = weighted_sum / denominator
+    for index in range(window, len(values)):
+        value = values[index]
+        weighted_sum += window * value - sum_values
+        sum_values += value - values[index - window]
+        out[index] = weighted_sum / denominator
+    return out
+
+
+def _moving_median(values: list[float], window: int) -> list[float | None]:
+    # 有序窗口上取中位数：插入/移除为二分定位，对异常跳点比均值更稳健。
+    if window <= 0:
+        raise ValueError("移动平均窗口必须为正整数")
+    out: list[float | None] = [None] * len(values)
+    sorted_window: list[float] = []
+    for index, value in enumerate(values):
+        insort(sorted_window, value)
+        if index >= window:
+            sorted_window.pop(bisect_left(sorted_window, values[index - window]))
+        if index >= window - 1:
+            out[index] = _rolling_median(sorted_window)
+    return out
+
+
+# 各因子可选的平滑方式（请求参数 smoothing_*），默认 sma 与原有输出一致。
+SMOOTHERS: dict[str, Callable[[list[float], int], list[float | None]]] = {
+    "sma": _moving_average,
+    "ema": _exponential_moving_average,
+    "wma": _weighted_moving_average,
+    "median": _moving_median,
+}
+
+
+def _rolling_percentiles(values: list[float | None], window: int) -> list[float | None]:
+    if window <= 0:
+        raise ValueError("滚动窗口必须为正整数")
+
+    first_valid = 0
+    while first_valid < len(values) and values[first_valid] is None:
+        first_valid += 1
+
+    out: list[float | None] = [None] * len(values)
+    if first_valid >= len(values):
+        return out
+
+    sorted_window: list[float] = []
+    q: deque[float] = deque()
+
+    for index in range(first_valid, len(values)):
+        current = values[index]
+        if current is None:
+            out[index] = None
+            continue
+
+        insort(sorted_window, float(current))
+        q.append(float(current))
+        if len(q) > window:
+            leaving = q.popleft()
+            remove_index = bisect_left(sorted_window, leaving)
+            if remove_index >= len(sorted_window) or sorted_window[remove_index] != leaving:
+                raise ValueError("内部错误：滚动窗口移除失败")
+            sorted_window.pop(remove_index)
+
+        if len(q) < window:
+            out[index] = None
+            continue
+
+        out[index] = _rolling_percentile(sorted_window, float(current))
+
+    return out
+
+
+# 近似分位：滑动窗口分块摘要（Arasu & Manku 的分块思路）。窗口按到达顺序切成大小为 b 的块，
+# 正在填充的块保留原值（有序），已满的块只保留 k 个等距分位样本；各块摘要可直接合并，
+# 中间块的样本常驻一个合并后的有序表，最老的块按仍在窗口内的比例折算计数。
+# 秩误差上界（按个数）：中间块每块 ≤ b/(2k)，最老块 ≤ a(b-a)/b + a/(2k)（a 为其仍在窗口内的个数）。
+PERCENTILE_MAX_ERROR_LIMIT = 10.0
+
+
+def _sketch_parameters(window: int, max_error: float) -> tuple[int, int] | None:
+    # 把允许的分位误差（0-100 分位点）换算为块大小 b 与每块样本数 k：误差预算在最老块与摘要之间
+    # 按若干比例试分，取常驻值个数（摘要样本 + 原值块）最少的一组。窗口太短、摘要省不下内存时返回 None，
+    # 调用方改走精确路径（误差为 0）。
+    budget = max_error / 100.0 * max(window - 1, 1)
+    best: tuple[int, int, int] | None = None
+    for share in (0.2, 0.35, 0.5, 0.65, 0.8):
+        block_size = max(1, min(window, int(4 * share * budget)))
+        summary_budget = (1.0 - share) * budget
+        samples = block_size if summary_budget <= 0 else min(block_size, math.ceil((window + block_size) / (2 * summary_budget)))
+        stored = (window // block_size + 1) * samples + block_size
+        if best is None or stored < best[0]:
+            best = (stored, block_size, samples)
+    assert best is not None
+    if best[0] >= window:
+        return None
+    return best[1], best[2]
+
+
+def _sketch_rank_error(window: int, block_size: int, samples: int) -> float:
+    summary_error = 0.0 if samples >= block_size else (window + block_size) / (2.0 * samples)
+    oldest_error = (block_size // 2) * ((block_size + 1) // 2) / block_size
+    return summary_error + oldest_error
+
+
+class _SlidingQuantileSketch:
+    def __init__(self, window: int, max_error: float) -> None:
+        if window <= 0:
+            raise ValueError("滚动窗口必须为正整数")
+        self.window = window
+        self.block_size, self.samples = _sketch_parameters(window, max_error) or (1, 1)
+        self.rank_error = _sketch_rank_error(window, self.block_size, self.samples)
+        self.seen = 0
+        self.fresh: list[float] = []
+        self.blocks: deque[list[float]] = deque()
+        self.merged: list[float] = []
+
+    @property
+    def size(self) -> int:
+        return min(self.seen, self.window)
+
+    @property
+    def stored_values(self) -> int:
+        return len(self.fresh) + len(self.merged) + (len(self.blocks[0]) if self.blocks else 0)
+
+    def _summarize(self, block: list[float]) -> list[float]:
+        if self.samples >= len(block):
+            return block
+        step = len(block) / self.samples
+        return [block[int((index + 0.5) * step)] for index in range(self.samples)]
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        insort(self.fresh, value)
+        if len(self.fresh) == self.block_size:
+            summary = self._summarize(self.fresh)
+            self.fresh = []
+            if self.blocks:
+                self.merged = list(heapq.merge(self.merged, summary))
+            self.blocks.append(summary)
+        while self.blocks and self._oldest_alive() <= 0:
+            self.blocks.popleft()
+            if self.blocks:
+                self._drop_from_merged(self.blocks[0])
+
+    def _oldest_alive(self) -> int:
+        return self.size - len(self.fresh) - (len(self.blocks) - 1) * self.block_size
+
+    def _drop_from_merged(self, summary: list[float]) -> None:
+        # summary 与 merged 均有序：一次线性扫描移除这组样本。
+        kept: list[float] = []
+        position = 0
+        for value in self.merged:
+            if position < len(summary) and value == summary[position]:
+                position += 1
+                continue
+            kept.append(value)
+        self.merged = kept
+
+    def _count(self, value: float, locate: Callable[[list[float], float], int]) -> float:
+        count = float(locate(self.fresh, value))
+        if self.blocks:
+            weight = self.block_size / len(self.blocks[0])
+            count += locate(self.merged, value) * weight
+            count += locate(self.blocks[0], value) * weight * self._oldest_alive() / self.block_size
+        return count
+
+    def percentile_of(self, value: float) -> float:
+        size = self.size
+        if size <= 0:
+            raise ValueError("窗口为空")
+        if size == 1:
+            return 50.0
+        avg_rank = (self._count(value, bisect_left) + 1 + self._count(value, bisect_right)) / 2.0
+        return min(100.0, max(0.0, 100.0 * (avg_rank - 1.0) / (size - 1.0)))
+
+    def quantile(self, fraction: float) -> float:
+        # 在三组有序值（原值块、合并样本、最老块样本）中分别二分，取估计秩达到目标的最小候选值。
+        target = fraction * self.size
+        candidates: list[float] = []
+        for values in (self.fresh, self.merged, self.blocks[0] if self.blocks else []):
+            low, high = 0, len(values)
+            while low < high:
+                middle = (low + high) // 2
+                if self._count(values[middle], bisect_right) >= target:
+                    high = middle
+                else:
+                    low = middle + 1
+            if low < len(values):
+                candidates.append(values[low])
+        if not candidates:
+            raise ValueError("窗口为空")
+        return min(candidates)
+
+
+def _approximate_rolling_percentiles(
+    values: list[float | None], window: int, max_error: float
+) -> list[float | None]:
+    # 与 _rolling_percentiles 相同的输出形状：首个有效值之后满窗才出分位，窗口内的 None 不计数。
+    if _sketch_parameters(window, max_error) is None:
+        return _rolling_percentiles(values, window)
+    sketch = _SlidingQuantileSketch(window, max_error)
+    out: list[float | None] = [None] * len(values)
+    for index, current in enumerate(values):
+        if current is None:
+            continue
+        sketch.add(float(current))
+        if sketch.seen >= window:
+            out[index] = sketch.percentile_of(float(current))
+    return out
+
+
+def _percentile_error_bounds(max_error: float, **windows: int) -> dict[str, float]:
+    # 响应中报告的各因子分位误差上界（分位点），由实际采用的块参数算出，不超过 max_error。
+    bounds: dict[str, float] = {}
+    for name, window in windows.items():
+        parameters = _sketch_parameters(window, max_error)
+        if parameters is None or window <= 1:
+            bounds[name] = 0.0
+            continue
+        bound = min(100.0, 100.0 * _sketch_rank_error(window, *parameters) / (window - 1))
+        bounds[name] = math.ceil(bound * 10_000) / 10_000
+    return bounds
+
+
+def _sketch_min_window(max_error: float) -> int:
+    # 给定误差下启用近似摘要的最小窗口（二分查找；摘要是否省内存随窗口增大单调变化，个别边界处仅作提示）。
+    low, high = 2, 2
+    while _sketch_parameters(high, max_error) is None:
+        low, high = high, high * 2
+    while low < high:
+        middle = (low + high) // 2
+        if _sketch_parameters(middle, max_error) is None:
+            low = middle + 1
+        else:
+            high = middle
+    return high
+
+
+def exact_fallback_reason(max_error: float, windows: Sequence[int]) -> str | None:
+    # 近似模式下改走精确路径的窗口及原因；windows 全部走近似摘要时返回 None。
+    fallen = sorted({window for window in windows if window <= 1 or _sketch_parameters(window, max_error) is None})
+    if not fallen:
+        return None
+    return (
+        f"窗口 {'、'.join(str(window) for window in fallen)} 小于误差 {max_error:g} 时启用近似摘要所需的最小窗口 "
+        f"{_sketch_min_window(max_error)}（摘要省不下内存），已按精确分位计算（误差为 0）；调大 percentile_max_error 可在更短的窗口上启用近似"
+    )
+
+
+def exact_fallbacks(max_error: float, **windows: int) -> dict[str, str]:
+    # 按名称（因子）报告改走精确路径的窗口及原因，全部走近似摘要时为空字典。
+    fallbacks: dict[str, str] = {}
+    for name, window in windows.items():
+        reason = exact_fallback_reason(max_error, [window])
+        if reason is not None:
+            fallbacks[name] = reason
+    return fallbacks
+
+
+def _rolling_median(sorted_window: list[float]) -> float:
+    size = len(sorted_window)
+    if size == 0:
+        raise ValueError("窗口为空")
+    mid = size // 2
+    if size % 2 == 1:
+        return float(sorted_window[mid])
+    return (float(sorted_window[mid - 1]) + float(sorted_window[mid])) / 2.0
+
+
+def _rolling_stddevp(sum_values: float, sum_squares: float, size: int) -> float:
+    if size <= 0:
+        raise ValueError("窗口为空")
+    mean = sum_values / size
+    variance = (sum_squares / size) - (mean * mean)
+    if variance < 0 and variance > -1e-12:
+        variance = 0.0
+    if variance < 0:
+        raise ValueError("方差为负数（数值异常）")
+    return math.sqrt(variance)
+
+
+def rolling_band_stats(
+    values: Iterable[float],
+    window_size: int,
+    *,
+    include_percentile: bool = False,
+    max_error: float | None = None,
+) -> Iterator[tuple[float, float, float | None] | None]:
+    # 逐值产出 (中位数, 总体标准差, 当前值分位)，满窗前产出 None；每消费一个值恰好产出一项。
+    # 精确模式维护有序窗口；近似模式中位数与分位取自滑动分块摘要，标准差仍精确，移出值取自 array('d') 环形缓冲。
+    if max_error is not None and _sketch_parameters(window_size, max_error) is not None:
+        sketch = _SlidingQuantileSketch(window_size, max_error)
+        ring = array("d", bytes(8 * window_size))
+        sum_values = 0.0
+        sum_squares = 0.0
+        count = 0
+        for value in values:
+            slot = count % window_size
+            if count >= window_size:
+                leaving = ring[slot]
+                sum_values -= leaving
+                sum_squares -= leaving * leaving
+            ring[slot] = value
+            count += 1
+            sketch.add(value)
+            sum_values += value
+            sum_squares += value * value
+            if count < window_size:
+                yield None
+                continue
+            yield (
+                sketch.quantile(0.5),
+                _rolling_stddevp(sum_values, sum_squares, window_size),
+                sketch.percentile_of(value) if include_percentile else None,
+            )
+        return
+
+    sorted_window: list[float] = []
+    queue: deque[float] = deque()
+    sum_values = 0.0
+    sum_squares = 0.0
+    for value in values:
+        insort(sorted_window, value)
+        queue.append(value)
+        sum_values += value
+        sum_squares += value * value
+
+        if len(queue) > window_size:
+            leaving = queue.popleft()
+            sum_values -= leaving
+            sum_squares -= leaving * leaving
+            remove_index = bisect_left(sorted_window, leaving)
+            if remove_index >= len(sorted_window) or sorted_window[remove_index] != leaving:
+                raise ValueError("内部错误：滚动窗口移除失败")
+            sorted_window.pop(remove_index)
+
+        if len(queue) < window_size:
+            yield None
+            continue
+        yield (
+            _rolling_median(sorted_window),
+            _rolling_stddevp(sum_values, sum_squares, window_size),
+            _rolling_percentile(sorted_window, value) if include_percentile else None,
+        )
+
+
+def iter_erp_rolling_bands(
+    erp_rows: Iterable[Sequence[object]],
+    *,
+    window: int = 2000,
+    include_percentile: bool = False,
+    max_error: float | None = None,
+) -> Iterator[list[object]]:
+    if not isinstance(window, int) or window <= 0:
+        raise ValueError("滚动窗口 n 必须为正整数")
+
+    rows_iter = iter(erp_rows)
+    header = next(rows_iter, None)
+    if header is None:
+        raise ValueError("ERP 数据为空")
+    if len(header) < 5 or header[4] != "股权风险溢价":
+        raise ValueError("ERP 表头不符合预期")
+
+    header = ["日期", "十年国债收益率", "PE-TTM-S", str(header[3]), "股权风险溢价"]
+    if include_percentile:
+        header.append("股权风险溢价分位")
+    header.extend(["+2σ", "+1σ", "中位数", "-1σ", "-2σ"])
+    yield header
+
+    current: list[Sequence[object]] = []
+    row_count = 0
+
+    def erp_values() -> Iterator[float]:
+        nonlocal row_count
+        for index, row in enumerate(rows_iter):
+            row_count += 1
+            erp_value = row[4]
+            if not isinstance(erp_value, (int, float)):
+                raise ValueError(f"ERP 第 {index + 2} 行数值类型不合法")
+            current[:] = [row]
+            yield float(erp_value)
+
+    stats_iter = rolling_band_stats(erp_values(), window, include_percentile=include_percentile, max_error=max_error)
+    for stats in stats_iter:
+        if stats is None:
+            continue
+        median, stddevp, percentile = stats
+        row = current[0]
+        erp_float = float(row[4])  # type: ignore[arg-type]
+        row_out: list[object] = [row[0], row[1], row[2], row[3], erp_float]
+        if include_percentile:
+            row_out.append(round(percentile, 1))  # type: ignore[arg-type]
+        row_out.extend([median + 2 * stddevp, median + stddevp, median, median - stddevp, median - 2 * stddevp])
+        yield row_out
+
+    if row_count == 0:
+        raise ValueError("ERP 数据为空")
+    if row_count < window:
+        raise ValueError(f"数据不足：至少需要 {window} 行交易日数据")
+
+
+def _compute_erp_interval_bands(
+    erp_rows: Iterable[Sequence[object]],
+    *,
+    start_date: dt.date,
+    end_date: dt.date,
+    earliest: dt.date | None = None,
+    latest: dt.date | None = None,
+) -> tuple[dt.date, dt.date, dt.date, dt.date, list[list[object]], float, float]:
+    # 给出 earliest/latest 时，erp_rows 可以只含区间内的行（来自序列库的区间查询）。
+    rows_iter = iter(erp_rows)
+    header = next(rows_iter, None)
+    if header is None:
+        raise ValueError("ERP 数据为空")
+    if len(header) < 5 or header[4] != "股权风险溢价":
+        raise ValueError("ERP 表头不符合预期")
+
+    # 单次扫描：只保留区间内的行，其余行读过即丢。
+    bounds_known = earliest is not None and latest is not None
+    interval_rows: list[Sequence[object]] = []
+    erp_values: list[float] = []
+    sum_values = 0.0
+    sum_squares = 0.0
+    for index, row in enumerate(rows_iter, start=2):
+        try:
+            row_date = dt.date.fromisoformat(str(row[0]))
+        except ValueError as exc:
+            raise ValueError(f"ERP 第 {index} 行日期无法解析") from exc
+        if not bounds_known:
+            if earliest is None:
+                earliest = row_date
+            latest = row_date
+        if row_date < start_date or row_date > end_date:
+            continue
+
+        value = row[4]
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"ERP 第 {index} 行数值类型不合法")
+        value_float = float(value)
+        interval_rows.append(row)
+        erp_values.append(value_float)
+        sum_values += value_float
+        sum_squares += value_float * value_float
+
+    if earliest is None or latest is None:
+        raise ValueError("ERP 数据为空")
+
+    if start_date < earliest:
+        raise ValueError(f"起始日期过早：最早日期为 {earliest.isoformat()}")
+    if start_date > latest:
+        raise ValueError(f"起始日期过晚：最近日期为 {latest.isoformat()}")
+    if end_date < earliest:
+        raise ValueError(f"终止日期过早：最早日期为 {earliest.isoformat()}")
+    if end_date > latest:
+        raise ValueError(f"终止日期过晚：最近日期为 {latest.isoformat()}")
+
+    if not interval_rows:
+        raise ValueError("起始日期不能晚于终止日期（自动调整后）")
+    actual_start = dt.date.fromisoformat(str(interval_rows[0][0]))
+    actual_end = dt.date.fromisoformat(str(interval_rows[-1][0]))
+
+    sorted_values = sorted(erp_values)
+    median = _rolling_median(sorted_values)
+    stddevp = _rolling_stddevp(sum_values, sum_squares, len(erp_values))
+    upper2 = median + 2 * stddevp
+    upper1 = median + stddevp
+    lower1 = median - stddevp
+    lower2 = median - 2 * stddevp
+
+    output: list[list[object]] = [
+        [
+            "日期",
+            "十年国债收益率",
+            "PE-TTM-S",
+            "全A点位",
+            "股权风险溢价",
+            "股权风险溢价分位",
+            "+2σ",
+            "+1σ",
+            "中位数",
+            "-1σ",
+            "-2σ",
+        ]
+    ]
+    for row in interval_rows:
+        erp_value = float(row[4])
+        percentile = round(_rolling_percentile(sorted_values, erp_value), 1)
+        output.append([row[0], row[1], row[2], row[3], erp_value, percentile, upper2, upper1, median, lower1, lower2])
+
+    return earliest, latest, actual_start, actual_end, output, median, stddevp
+
+
+# 公开接口：参数为显式的序列，返回新列表。max_error 为 None 时为精确分位，否则为近似分位
+#（分位误差不超过 max_error 个百分点，见 percentile_error_bounds）。
+
+
+def moving_average(values: Sequence[float], window: int, *, smoothing: str = "sma") -> list[float | None]:
+    # smoothing：sma（简单平均）、ema、wma 或 median；前 window-1 个位置为 None。
+    smoother = SMOOTHERS.get(smoothing)
+    if smoother is None:
+        raise ValueError(f"smoothing 必须为 {'、'.join(SMOOTHERS)} 之一")
+    if not isinstance(window, int) or window <= 0:
+        raise ValueError("平均窗口必须为正整数")
+    return smoother(list(values), window)
+
+
+def rolling_percentiles(
+    values: Sequence[float | None], window: int, *, max_error: float | None = None
+) -> list[float | None]:
+    # 每个位置在其前 window 个值（含自身）中的百分位（0-100）；窗口未满或值为 None 的位置为 None。
+    if not isinstance(window, int) or window <= 0:
+        raise ValueError("滚动窗口必须为正整数")
+    if max_error is None:
+        return _rolling_percentiles(list(values), window)
+    if not 0 < max_error <= PERCENTILE_MAX_ERROR_LIMIT:
+        raise ValueError(f"max_error 超出范围（0-{PERCENTILE_MAX_ERROR_LIMIT:g}）")
+    return _approximate_rolling_percentiles(list(values), window, max_error)
+
+
+def percentile_error_bounds(max_error: float, **windows: int) -> dict[str, float]:
+    # 近似分位在给定窗口下实际保证的误差上界（百分点），键同 windows。
+    return _percentile_error_bounds(max_error, **windows)
+
+
+def median_rank_error_bound(window: int, max_error: float) -> float:
+    # 近似模式下滚动中位数的秩误差上界（窗口长度的百分比，不超过 50）：所取值在窗口中的排位
+    # 与真实中位数相差不超过该比例；窗口改走精确路径时为 0。
+    parameters = _sketch_parameters(window, max_error)
+    rank_error = 0.0 if parameters is None else _sketch_rank_error(window, *parameters)
+    return math.ceil(min(50.0, 100.0 * rank_error / window) * 10_000) / 10_000
+
+
+def erp_rolling_bands(
+    erp_rows: Iterable[Sequence[object]],
+    *,
+    window: int = 2000,
+    include_percentile: bool = False,
+    max_error: float | None = None,
+) -> list[list[object]]:
+    # erp_rows 为含标题行的 ERP 表（见 series.erp_rows）；返回带 ±1σ/±2σ 与中位数的滚动带宽表（Feature 3/4）。
+    return list(
+        iter_erp_rolling_bands(
+            erp_rows, window=window, include_percentile=include_percentile, max_error=max_error
+        )
+    )
+
+
+def erp_interval_bands(
+    erp_rows: Iterable[Sequence[object]],
+    *,
+    start_date: dt.date,
+    end_date: dt.date,
+    earliest: dt.date | None = None,
+    latest: dt.date | None = None,
+) -> tuple[dt.date, dt.date, dt.date, dt.date, list[list[object]], float, float]:
+    # 区间统计（Feature 5）：返回 (数据最早日期, 数据最晚日期, 区间实际起点, 区间实际终点, 含标题行的表, 中位数, 标准差)。
+    # 给出整张表的 earliest/latest 时，erp_rows 可以只含区间内的行。
+    return _compute_erp_interval_bands(
+        erp_rows, start_date=start_date, end_date=end_date, earliest=earliest, latest=latest
+    )
@@ -0,0 +1,365 @@
+# 输入序列：读取 data_PE、data_bond、指数 PE 与比率表（可为多个按年份拆分的分卷），对齐日期并计算 ERP。
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+import datetime as dt
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dataprocessing.io import (
+    _is_blank_cell,
+    _iter_rows_values,
+    _make_date_parser,
+    _merge_sorted_parts,
+    _open_data_sheets,
+    _read_parts,
+)
+from dataprocessing.validation import (
+    _coerce_float,
+    _coerce_pe,
+    _RowRef,
+    _validate_columns,
+    _validate_expected_header,
+    _validate_header_cell,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+def _read_ratio_header(rows_iter: Iterator[tuple[object, ...]], *, label: str) -> str:
+    header = next(rows_iter, None)
+    if not header:
+        raise ValueError(f"{label}：未找到标题行")
+
+    header_a = _validate_header_cell(header[0])
+    _ = _validate_header_cell(header[3])
+    if "日期" not in header_a and header_a.lower() != "date":
+        raise ValueError(f"{label}：A1 标题应为“日期”")
+    return header_a
+
+
+def _iter_ratio_rows(source_path: Path, *, label: str) -> Iterator[tuple[dt.date, float, str]]:
+    # 行末附带 A1 标题文本，供导出时沿用原表头。
+    with _open_data_sheets(source_path, label=label) as (sheets, epoch):
+        parse_date = _make_date_parser(epoch)
+        for sheet_name, sheet in sheets:
+            rows_iter = _iter_rows_values(sheet, last_col=4)  # A-D
+            header_a = _read_ratio_header(rows_iter, label=label if len(sheets) == 1 else f"{label}[{sheet_name}]")
+            for values in rows_iter:
+                try:
+                    date = parse_date(values[0])
+                    ratio = _coerce_float(values[3])
+                except Exception:
+                    continue
+                yield date, ratio, header_a
+
+
+def read_ratio_rows(
+    source_paths: Sequence[Path], *, executor: Executor | None = None
+) -> list[tuple[dt.date, float, str]]:
+    # 比率表的 (日期, 比率, A1 标题) 行，按日期排序。
+    label = source_paths[0].name
+    rows = list(_merge_sorted_parts(_read_parts(_iter_ratio_rows, source_paths, label=label, executor=executor)))
+    if not rows:
+        raise ValueError(f"{label}：清洗后没有可用数据行")
+    return rows  # type: ignore[return-value]
+
+
+_PE_FILL_DATES = [
+    "2018-08-03",
+    "2018-08-06",
+    "2018-08-07",
+    "2018-08-08",
+    "2018-08-09",
+    "2018-08-10",
+    "2018-08-13",
+    "2018-08-14",
+    "2018-08-15",
+    "2018-08-16",
+    "2018-08-17",
+    "2018-08-20",
+    "2018-08-21",
+    "2018-08-22",
+    "2018-08-23",
+    "2018-08-24",
+]
+_PE_FILL_CLOSES = [
+    3892.88,
+    3828.14,
+    3933.12,
+    3871.35,
+    3963.8,
+    3979.61,
+    3978.56,
+    3962.88,
+    3876.46,
+    3846.75,
+    3785.01,
+    3814.7,
+    3870.75,
+    3838.79,
+    3856.65,
+    3854.99,
+]
+# 2018-08-03 至 2018-08-24 的收盘点位在数据源中缺失，按内置清单补齐。
+PE_CLOSE_FILL_BY_DATE = {
+    dt.date.fromisoformat(date): value for date, value in zip(_PE_FILL_DATES, _PE_FILL_CLOSES)
+}
+
+
+def _iter_data_pe(
+    source_path: Path, *, label: str = "data_PE", fill_close: bool = True
+) -> Iterator[tuple[dt.date, float, float]]:
+    with _open_data_sheets(source_path, label=label) as (sheets, epoch):
+        last_col = 8
+        parse_date = _make_date_parser(epoch)
+        multi_sheet = len(sheets) > 1
+
+        def filled_rows() -> Iterator[tuple[_RowRef, tuple[object, ...]]]:
+            for sheet_name, sheet in sheets:
+                rows_iter = _iter_rows_values(sheet, last_col=last_col)
+                header = next(rows_iter, None)
+                if not header:
+                    raise ValueError(f"{label}：未找到标题行")
+
+                sheet_prefix = f"{sheet_name}!" if multi_sheet else ""
+                _validate_expected_header(header[0], "日期", f"{sheet_prefix}A1")
+                _validate_expected_header(header[3], "PE-TTM-S", f"{sheet_prefix}D1")
+                _validate_expected_header(header[7], "收盘点位", f"{sheet_prefix}H1")
+
+                for row_index, values in enumerate(rows_iter, start=2):
+                    if all(_is_blank_cell(value) for value in values):
+                        continue
+                    if fill_close and _is_blank_cell(values[7]):
+                        try:
+                            fill_value = PE_CLOSE_FILL_BY_DATE.get(parse_date(values[0]))
+                        except ValueError:
+                            fill_value = None
+                        if fill_value is not None:
+                            values = values[:7] + (fill_value,)
+                    yield ((sheet_name, row_index) if multi_sheet else row_index), values
+
+        row_count = 0
+        for _, (date, pe, close) in _validate_columns(
+            filled_rows(),
+            [(1, parse_date), (4, _coerce_pe), (8, _coerce_float)],
+            prefix=f"{label} ",
+            unique_column=1,
+        ):
+            row_count += 1
+            yield date, pe, close  # type: ignore[misc]
+
+    if not row_count:
+        raise ValueError(f"{label}：没有可用数据行")
+
+
+def iter_pe(
+    source_paths: Sequence[Path], *, executor: Executor | None = None
+) -> Iterator[tuple[dt.date, float, float]]:
+    # read_pe 的流式版本：按日期顺序逐行产出，不收集为列表。
+    return _merge_sorted_parts(_read_parts(_iter_data_pe, source_paths, label="data_PE", executor=executor))  # type: ignore[return-value]
+
+
+def _iter_index_pe(source_path: Path, *, label: str) -> Iterator[tuple[dt.date, float, float]]:
+    # 其他指数与 data_PE 同表头，但收盘点位的补缺数据只属于全A，不做补齐。
+    return _iter_data_pe(source_path, label=label, fill_close=False)
+
+
+def iter_index_pe(
+    source_paths: Sequence[Path], *, label: str, executor: Executor | None = None
+) -> Iterator[tuple[dt.date, float, float]]:
+    # read_index_pe 的流式版本。
+    return _merge_sorted_parts(_read_parts(_iter_index_pe, source_paths, label=label, executor=executor))  # type: ignore[return-value]
+
+
+def _iter_data_bond(source_path: Path, *, label: str = "data_bond") -> Iterator[tuple[dt.date, float, float]]:
+    with _open_data_sheets(source_path, label=label) as (sheets, epoch):
+        last_col = 5
+        parse_date = _make_date_parser(epoch)
+        multi_sheet = len(sheets) > 1
+
+        def non_blank_rows() -> Iterator[tuple[_RowRef, tuple[object, ...]]]:
+            for sheet_name, sheet in sheets:
+                rows_iter = _iter_rows_values(sheet, last_col=last_col)
+                header = next(rows_iter, None)
+                if not header:
+                    raise ValueError(f"{label}：未找到标题行")
+
+                sheet_prefix = f"{sheet_name}!" if multi_sheet else ""
+                _validate_expected_header(header[0], "日期", f"{sheet_prefix}A1")
+                _validate_expected_header(header[4], "十年期收益率", f"{sheet_prefix}E1")
+
+                for row_index, values in enumerate(rows_iter, start=2):
+                    if not all(_is_blank_cell(value) for value in values):
+                        yield ((sheet_name, row_index) if multi_sheet else row_index), values
+
+        row_count = 0
+        for _, (date, yield_raw) in _validate_columns(
+            non_blank_rows(),
+            [(1, parse_date), (5, _coerce_float)],
+            prefix=f"{label} ",
+            unique_column=1,
+        ):
+            row_count += 1
+            yield date, yield_raw, _normalize_yield(yield_raw)  # type: ignore[misc, arg-type]
+
+    if not row_count:
+        raise ValueError(f"{label}：没有可用数据行")
+
+
+def iter_bond(
+    source_paths: Sequence[Path], *, executor: Executor | None = None
+) -> Iterator[tuple[dt.date, float, float]]:
+    # read_bond 的流式版本。
+    return _merge_sorted_parts(_read_parts(_iter_data_bond, source_paths, label="data_bond", executor=executor))  # type: ignore[return-value]
+
+
+def iter_ratio_table(rows: Sequence[tuple[dt.date, float, str]], *, metric_header: str) -> Iterator[list[object]]:
+    # rows 来自 read_ratio_rows（非空）；表头沿用首行附带的 A1 标题。
+    yield [rows[0][2], metric_header]
+    for date, ratio, _ in rows:
+        yield [date.isoformat(), ratio]
+
+
+def _normalize_yield(yield_raw: float) -> float:
+    if yield_raw > 1.0:
+        return yield_raw / 100.0
+    return yield_raw
+
+
+def merge_by_bond_dates(
+    bond_rows: Iterable[tuple[dt.date, float, float]],
+    pe_rows: Iterable[tuple[dt.date, float, float]],
+) -> Iterator[tuple[dt.date, float, float, float]]:
+    # 以国债日期为准对齐 PE（取不早于该日的第一条），产出 (日期, 收益率原值, PE, 收盘点位)。
+    pe_iter = iter(pe_rows)
+    merged_count = 0
+
+    for bond_date, bond_yield_raw, _ in bond_rows:
+        pe_row = next(pe_iter, None)
+        while pe_row is not None and pe_row[0] < bond_date:
+            pe_row = next(pe_iter, None)
+
+        if pe_row is None:
+            raise ValueError("合并失败：data_PE 数据不足，无法继续对齐日期")
+
+        _, pe_value, pe_close = pe_row
+        merged_count += 1
+        yield bond_date, bond_yield_raw, pe_value, pe_close
+
+    if not merged_count:
+        raise ValueError("合并失败：未生成任何对齐行")
+
+
+def erp_from_pe(pe_value: float, bond_yield_decimal: float) -> float:
+    # 股权风险溢价：(1 + 1/PE) / (1 + 小数收益率) - 1。
+    return (1.0 + 1.0 / pe_value) / (1.0 + bond_yield_decimal) - 1.0
+
+
+def iter_erp_rows(
+    merged_rows: Iterable[tuple[dt.date, float, float, float]],
+    *,
+    close_header: str = "全A点位",
+) -> Iterator[list[object]]:
+    # erp_rows 的流式版本，输入为 merge_by_bond_dates 的输出。
+    yield ["日期", "十年国债收益率", "PE-TTM-S", close_header, "股权风险溢价"]
+
+    for date, yield_raw, pe_value, close_value in merged_rows:
+        yield [date.isoformat(), yield_raw, pe_value, close_value, erp_from_pe(pe_value, _normalize_yield(yield_raw))]
+
+
+def ratio_columns(rows: Sequence[tuple[dt.date, float, str]]) -> tuple[list[str], list[float]]:
+    # read_ratio_rows 的行转为 (ISO 日期列表, 比率列表)。
+    return [date.isoformat() for date, _, _ in rows], [metric for _, metric, _ in rows]
+
+
+# ERP 序列按列存放：(日期, 股权风险溢价, 十年国债收益率, PE-TTM-S, 收盘点位)。
+ErpSeries = tuple[list[str], list[float], list[float], list[float], list[float]]
+
+
+def erp_columns(erp_rows: Iterable[Sequence[object]]) -> ErpSeries:
+    # 校验 iter_erp_rows 的输出（含表头）并转为列。
+    erp_rows = iter(erp_rows)
+    next(erp_rows, None)
+
+    dates: list[str] = []
+    erp_values: list[float] = []
+    bond_yield_values: list[float] = []
+    pe_values: list[float] = []
+    close_values: list[float] = []
+    for row_index, row in enumerate(erp_rows, start=2):
+        try:
+            date_text = str(row[0])
+            _ = dt.date.fromisoformat(date_text)
+            value = row[4]
+            if not isinstance(value, (int, float)):
+                raise ValueError("数值类型不合法")
+            dates.append(date_text)
+            erp_values.append(float(value))
+
+            yield_value = row[1]
+            if not isinstance(yield_value, (int, float)):
+                raise ValueError("十年期收益率类型不合法")
+            bond_yield_values.append(float(yield_value))
+
+            pe_value = row[2]
+            if not isinstance(pe_value, (int, float)):
+                raise ValueError("PE 类型不合法")
+            pe_values.append(float(pe_value))
+
+            close_value = row[3]
+            if not isinstance(close_value, (int, float)):
+                raise ValueError("收盘点位类型不合法")
+            close_values.append(float(close_value))
+        except Exception as exc:
+            raise ValueError(f"ERP 第 {row_index} 行数据不合法：{exc}") from exc
+
+    if not dates:
+        raise ValueError("ERP 数据为空")
+    return dates, erp_values, bond_yield_values, pe_values, close_values
+
+
+# 公开接口：参数为显式的文件路径（同一张表可为多个按年份拆分的分卷），返回按日期排序的列表。
+# 给出 executor（如 ProcessPoolExecutor）时多个分卷并行解析；同一日期出现在多个分卷中时以文件名靠后者为准。
+
+
+def read_pe(paths: Sequence[Path], *, executor: Executor | None = None) -> list[tuple[dt.date, float, float]]:
+    # data_PE：(日期, PE-TTM-S, 收盘点位)，缺失的收盘点位按内置的已知值补齐。
+    return list(iter_pe(paths, executor=executor))
+
+
+def read_index_pe(
+    paths: Sequence[Path], *, label: str, executor: Executor | None = None
+) -> list[tuple[dt.date, float, float]]:
+    # 单个指数的 PE 表：列同 read_pe，不补齐收盘点位；label 用于错误信息。
+    return list(iter_index_pe(paths, label=label, executor=executor))
+
+
+def read_bond(paths: Sequence[Path], *, executor: Executor | None = None) -> list[tuple[dt.date, float, float]]:
+    # data_bond：(日期, 十年期收益率原值, 换算为小数的收益率)。
+    return list(iter_bond(paths, executor=executor))
+
+
+def read_ratio(paths: Sequence[Path], *, executor: Executor | None = None) -> tuple[list[str], list[float]]:
+    # 比率表（GDP、成交量、融券等）：(ISO 日期列表, 比率列表)，无法解析的行直接跳过。
+    return ratio_columns(read_ratio_rows(paths, executor=executor))
+
+
+def erp_rows(
+    pe_rows: Iterable[tuple[dt.date, float, float]],
+    bond_rows: Iterable[tuple[dt.date, float, float]],
+    *,
+    close_header: str = "全A点位",
+) -> list[list[object]]:
+    # 以国债日期为准对齐 PE（取不早于该日的第一条），返回含标题行的 ERP 表（Feature 2 的输出内容）。
+    return list(iter_erp_rows(merge_by_bond_dates(bond_rows, pe_rows), close_header=close_header))
+
+
+def erp_series(
+    pe_paths: Sequence[Path], bond_paths: Sequence[Path], *, executor: Executor | None = None
+) -> ErpSeries:
+    # 读取两张输入表并计算 ERP，按列返回，见 ErpSeries。
+    return erp_columns(
+        erp_rows(read_pe(pe_paths, executor=executor), read_bond(bond_paths, executor=executor))
+    )
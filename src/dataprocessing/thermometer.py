@@ -0,0 +1,193 @@
+# 市场温度计：因子的平滑与滚动分位（按输入序列记忆化）、按日期对齐、加权温度与相关系数。
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+import datetime as dt
+import math
+
+from dataprocessing.rolling import (
+    SMOOTHERS,
+    _approximate_rolling_percentiles,
+    _rolling_percentiles,
+    moving_average,
+    rolling_percentiles,
+)
+
+
+# 平滑序列与滚动分位按“输入序列对象 + 窗口参数”记忆化。输入序列来自 app 的 _series_cache，
+# 同一数据版本下始终是同一个列表对象（缓存条目持有其引用，id 不会被复用），
+# 因此拖动滑块、或在分位/合并接口之间切换时，参数相同的因子不再重复计算。
+# 下面 cached_ 开头的公开函数走这个缓存：传入的列表在计算后不得原地修改，返回的列表只读。
+PERCENTILE_CACHE_SIZE = 128
+
+
+_percentile_cache: dict[tuple[object, ...], tuple[object, object]] = {}
+
+
+def _memoized(kind: str, source: object, params: tuple[object, ...], compute: Callable[[], object]) -> object:
+    key = (kind, id(source), *params)
+    entry = _percentile_cache.get(key)
+    if entry is not None and entry[0] is source:
+        return entry[1]
+    result = compute()
+    while len(_percentile_cache) >= PERCENTILE_CACHE_SIZE:
+        _percentile_cache.pop(next(iter(_percentile_cache)), None)
+    _percentile_cache[key] = (source, result)
+    return result
+
+
+def cached_smoothed_percentiles(
+    values: list[float],
+    *,
+    ma_window: int,
+    rp_window: int,
+    smoothing: str = "sma",
+    max_error: float | None = None,
+) -> tuple[list[float | None], list[float | None]]:
+    # 返回的列表由多个请求共享，调用方只读。max_error 为 None 时为精确分位，否则走近似分位。
+    smoother = SMOOTHERS[smoothing]
+    ma_values = _memoized(f"ma:{smoothing}", values, (ma_window,), lambda: smoother(values, ma_window))
+    if max_error is None:
+        compute_pct = lambda: _rolling_percentiles(ma_values, rp_window)  # type: ignore[arg-type]  # noqa: E731
+    else:
+        compute_pct = lambda: _approximate_rolling_percentiles(ma_values, rp_window, max_error)  # type: ignore[arg-type]  # noqa: E731
+    pct_values = _memoized(f"pct:{smoothing}", values, (ma_window, rp_window, max_error), compute_pct)
+    return ma_values, pct_values  # type: ignore[return-value]
+
+
+def cached_parsed_dates(dates: list[str]) -> list[dt.date]:
+    # ISO 日期文本列表解析为日期列表。
+    return _memoized("dates", dates, (), lambda: [dt.date.fromisoformat(text) for text in dates])  # type: ignore[return-value]
+
+
+def cached_percentile_records(
+    dates: list[str],
+    values: list[float],
+    *,
+    ma_window: int,
+    rp_window: int,
+    smoothing: str = "sma",
+    max_error: float | None = None,
+) -> list[tuple[dt.date, float]]:
+    # 同 percentile_records，日期为 ISO 文本列表。
+    _, pct_values = cached_smoothed_percentiles(
+        values, ma_window=ma_window, rp_window=rp_window, smoothing=smoothing, max_error=max_error
+    )
+    parsed_dates = cached_parsed_dates(dates)
+    out: list[tuple[dt.date, float]] = []
+    for index, pct in enumerate(pct_values):
+        if pct is None:
+            continue
+        out.append((parsed_dates[index], float(pct)))
+    return out
+
+
+def cached_erp_percentile_records(
+    dates: list[str],
+    erp_values: list[float],
+    yields: list[float],
+    closes: list[float],
+    *,
+    ma_window: int,
+    rp_window: int,
+    smoothing: str = "sma",
+    max_error: float | None = None,
+) -> list[dict[str, object]]:
+    # ERP 因子的分位记录，附带当日的 ERP、国债收益率与收盘点位。
+    _, pct_values = cached_smoothed_percentiles(
+        erp_values, ma_window=ma_window, rp_window=rp_window, smoothing=smoothing, max_error=max_error
+    )
+    parsed_dates = cached_parsed_dates(dates)
+    out: list[dict[str, object]] = []
+    for index, pct in enumerate(pct_values):
+        if pct is None:
+            continue
+        out.append(
+            {
+                "date": parsed_dates[index],
+                "erp_percentile": float(pct),
+                "erp": float(erp_values[index]),
+                "yield": float(yields[index]),
+                "close": float(closes[index]),
+            }
+        )
+    return out
+
+
+# 以下公开接口不经过上面的记忆化缓存（调用方可以原地修改列表后再次计算）。
+
+
+def smoothed_percentiles(
+    values: Sequence[float],
+    *,
+    ma_window: int,
+    rp_window: int,
+    smoothing: str = "sma",
+    max_error: float | None = None,
+) -> tuple[list[float | None], list[float | None]]:
+    # 先平滑再取滚动分位，返回 (平滑后的序列, 分位序列)。
+    ma_values = moving_average(values, ma_window, smoothing=smoothing)
+    return ma_values, rolling_percentiles(ma_values, rp_window, max_error=max_error)
+
+
+def percentile_records(
+    dates: Sequence[dt.date],
+    values: Sequence[float],
+    *,
+    ma_window: int,
+    rp_window: int,
+    smoothing: str = "sma",
+    max_error: float | None = None,
+) -> list[tuple[dt.date, float]]:
+    # 单个因子的 (日期, 分位) 记录，跳过窗口未满的日期。
+    _, pct_values = smoothed_percentiles(
+        values, ma_window=ma_window, rp_window=rp_window, smoothing=smoothing, max_error=max_error
+    )
+    return [(date, float(pct)) for date, pct in zip(dates, pct_values) if pct is not None]
+
+
+def nearest_index(dates: Sequence[dt.date], target: dt.date) -> int:
+    # 已排序的 dates 中与 target 最接近的位置，距离相同时取较早的日期。
+    if not dates:
+        raise ValueError("日期序列为空")
+    index = bisect_left(dates, target)
+    if index <= 0:
+        return 0
+    if index >= len(dates):
+        return len(dates) - 1
+    before = dates[index - 1]
+    after = dates[index]
+    diff_before = abs((target - before).days)
+    diff_after = abs((after - target).days)
+    if diff_before <= diff_after:
+        return index - 1
+    return index
+
+
+def temperatures(components: dict[str, Sequence[float]], weights: Sequence[float]) -> list[float]:
+    # components 为已按日期对齐的 gdp、volume、securities、erp 分位序列，weights 为对应的百分比权重；
+    # ERP 分位越高市场越“冷”，因此按 100 - 分位计入。
+    weight_gdp, weight_volume, weight_securities, weight_erp = weights
+    return [
+        (weight_gdp * gdp_pct + weight_volume * vol_pct + weight_securities * sec_pct + weight_erp * (100.0 - erp_pct))
+        / 100.0
+        for gdp_pct, vol_pct, sec_pct, erp_pct in zip(
+            components["gdp"], components["volume"], components["securities"], components["erp"]
+        )
+    ]
+
+
+def pearson(xs: Sequence[float], ys: Sequence[float]) -> float | None:
+    # 皮尔逊相关系数；样本少于 3 个或任一序列为常数时为 None。
+    size = len(xs)
+    if size < 3:
+        return None
+    mean_x = math.fsum(xs) / size
+    mean_y = math.fsum(ys) / size
+    cov = math.fsum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = math.fsum((x - mean_x) ** 2 for x in xs)
+    var_y = math.fsum((y - mean_y) ** 2 for y in ys)
+    if var_x <= 0 or var_y <= 0:
+        return None
+    return cov / math.sqrt(var_x * var_y)
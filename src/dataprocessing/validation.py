@@ -0,0 +1,384 @@
+# 单元格校验：乱码检测、文本/数值/标题校验、分块逐列校验并汇总出错单元格，以及格式转换（Feature 1）的整表校验。
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator, Sequence
+import datetime as dt
+import math
+from pathlib import Path
+import re
+
+from dataprocessing.io import _column_letter, _CsvSheet, _make_date_parser, _open_data_sheets
+
+
+# 乱码判定：替换字符 U+FFFD，或除 \t \n \r 以外的 C0 控制字符。
+_GARBLED_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffd]")
+# 整列扫描时用 \x00 拼接单元格，因此拼接串上的正则不含 \x00。
+_GARBLED_CHARS_JOINED = re.compile("[\x01-\x08\x0b\x0c\x0e-\x1f\ufffd]")
+GARBLED_CACHE_SIZE = 65536
+
+# 共享字符串（重复出现的表头、单位、占位符等）的判定结果缓存。
+_garbled_cache: dict[str, bool] = {}
+
+
+def _is_garbled_text(text: str) -> bool:
+    cached = _garbled_cache.get(text)
+    if cached is None:
+        cached = _GARBLED_CHARS.search(text) is not None
+        if len(_garbled_cache) >= GARBLED_CACHE_SIZE:
+            _garbled_cache.clear()
+        _garbled_cache[text] = cached
+    return cached
+
+
+def _find_garbled(texts: Sequence[str]) -> list[int]:
+    # 整列以 \x00 拼接后只做一次正则扫描，再按分隔符计数把命中位置映射回单元格下标。
+    if not texts:
+        return []
+    joined = "\x00".join(texts)
+    if joined.count("\x00") != len(texts) - 1:
+        return [index for index, text in enumerate(texts) if _is_garbled_text(text)]
+
+    flagged: list[int] = []
+    index = 0
+    position = 0
+    for match in _GARBLED_CHARS_JOINED.finditer(joined):
+        index += joined.count("\x00", position, match.start())
+        position = match.start()
+        if not flagged or flagged[-1] != index:
+            flagged.append(index)
+    return flagged
+
+
+def _validate_text_or_number(value: object, *, check_garbled: bool = True) -> object:
+    if value is None:
+        raise ValueError("内容空白")
+    if isinstance(value, bool):
+        raise ValueError("不支持布尔类型")
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            raise ValueError("内容空白")
+        if check_garbled and _is_garbled_text(text):
+            raise ValueError("疑似乱码/控制字符")
+        return text
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            raise ValueError("数值为 NaN/Inf")
+        return value
+    raise ValueError(f"不支持的类型：{type(value).__name__}")
+
+
+# 文本类型输入（CSV）中按数值输出的单元格：十进制数，可带符号与指数；有前导零的（如代码 000001）仍按文本保留。
+_NUMERIC_TEXT = re.compile(r"[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+
+
+def _validate_text_or_numeric_text(value: object, *, check_garbled: bool = True) -> object:
+    # CSV 单元格都是文本：数值文本转为 int/float，与 .xlsx 输入中的数值单元格输出相同的类型。
+    normalized = _validate_text_or_number(value, check_garbled=check_garbled)
+    if type(normalized) is not str or _NUMERIC_TEXT.fullmatch(normalized) is None:
+        return normalized
+    if normalized.lstrip("+-").isdigit():
+        return int(normalized)
+    number = float(normalized)
+    return number if math.isfinite(number) else normalized
+
+
+def _validate_header_cell(value: object) -> str:
+    if value is None:
+        raise ValueError("标题空白")
+    if not isinstance(value, str):
+        raise ValueError("标题必须为文本")
+    text = value.strip()
+    if not text:
+        raise ValueError("标题空白")
+    if _is_garbled_text(text):
+        raise ValueError("标题疑似乱码/控制字符")
+    return text
+
+
+# 校验引擎按列批量检查整张表，收集所有错误（附单元格坐标）后一次性报告，
+# 而不是遇到第一个错误就中断；超过上限的错误只计数不列出。
+MAX_VALIDATION_ERRORS = 200
+VALIDATION_CHUNK_ROWS = 4096
+
+# 单元格所在行：单工作表时为行号，多工作表时为 (工作表名, 行号)。
+_RowRef = int | tuple[str, int]
+
+
+class ValidationErrors(ValueError):
+    def __init__(self, errors: list[dict[str, str]], total: int) -> None:
+        self.errors = errors
+        self.total = total
+        lines = [error["message"] for error in errors]
+        if total == 1:
+            message = lines[0]
+        else:
+            message = f"共发现 {total} 处数据错误：\n" + "\n".join(lines)
+            if total > len(errors):
+                message += f"\n……其余 {total - len(errors)} 处未列出"
+        super().__init__(message)
+
+    def __reduce__(self) -> tuple[object, ...]:
+        return self.__class__, (self.errors, self.total)
+
+
+def _validate_column(
+    values: Sequence[object], validator: Callable[[object], object]
+) -> tuple[list[object], list[tuple[int, str]]]:
+    normalized: list[object] = []
+    failures: list[tuple[int, str]] = []
+    garbled_message = _GARBLED_MESSAGES.get(validator)
+    if garbled_message is None:
+        for offset, value in enumerate(values):
+            try:
+                normalized.append(validator(value))
+            except ValueError as exc:
+                normalized.append(None)
+                failures.append((offset, str(exc)))
+        return normalized, failures
+
+    # 整列文本一次性批量扫描乱码，逐格校验时跳过重复的逐字符检查。
+    text_offsets = [offset for offset, value in enumerate(values) if type(value) is str]
+    garbled = _find_garbled([values[offset].strip() for offset in text_offsets])  # type: ignore[union-attr]
+    garbled_offsets = {text_offsets[index] for index in garbled}
+    for offset, value in enumerate(values):
+        if garbled_offsets and offset in garbled_offsets:
+            normalized.append(None)
+            failures.append((offset, garbled_message))
+            continue
+        try:
+            normalized.append(validator(value, check_garbled=False))  # type: ignore[call-arg]
+        except ValueError as exc:
+            normalized.append(None)
+            failures.append((offset, str(exc)))
+    return normalized, failures
+
+
+def _chunked(items: Iterable[object], size: int) -> Iterator[list[object]]:
+    chunk: list[object] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _cell_ref(letter: str, row_ref: _RowRef) -> str:
+    if isinstance(row_ref, tuple):
+        sheet_name, row_number = row_ref
+        return f"{sheet_name}!{letter}{row_number}"
+    return f"{letter}{row_ref}"
+
+
+def _validate_columns(
+    rows: Iterable[tuple[_RowRef, Sequence[object]]],
+    columns: Sequence[tuple[int, Callable[[object], object]]],
+    *,
+    prefix: str = "",
+    unique_column: int | None = None,
+    max_errors: int = MAX_VALIDATION_ERRORS,
+) -> Iterator[tuple[_RowRef, list[object]]]:
+    # rows 为 (行号, 单元格值) 序列，多工作表时行号为 (工作表名, 行号)；columns 为 (列号, 校验函数)，列号从 1 开始。
+    # 逐块转置为列后整列校验；unique_column 指定的列（列号）还会检查重复值。
+    errors: list[dict[str, str]] = []
+    total = 0
+    first_seen: dict[object, _RowRef] = {}
+    unique_position = next(
+        (position for position, (col, _) in enumerate(columns) if col == unique_column), None
+    )
+
+    def record(cell: str, message: str) -> None:
+        nonlocal total
+        total += 1
+        if len(errors) < max_errors:
+            errors.append({"cell": cell, "message": f"{prefix}{cell} {message}"})
+
+    for chunk in _chunked(rows, VALIDATION_CHUNK_ROWS):
+        row_refs = [row_ref for row_ref, _ in chunk]  # type: ignore[misc]
+        chunk_failures: list[tuple[int, int, str, str]] = []
+        normalized_columns: list[list[object]] = []
+        for position, (col, validator) in enumerate(columns):
+            letter = _column_letter(col)
+            normalized, failures = _validate_column([values[col - 1] for _, values in chunk], validator)  # type: ignore[misc]
+            for offset, message in failures:
+                chunk_failures.append((offset, position, _cell_ref(letter, row_refs[offset]), message))
+            normalized_columns.append(normalized)
+
+        if unique_position is not None:
+            bad_offsets = {offset for offset, _, _, _ in chunk_failures}
+            letter = _column_letter(unique_column)  # type: ignore[arg-type]
+            for offset, value in enumerate(normalized_columns[unique_position]):
+                if offset in bad_offsets:
+                    continue
+                row_ref = row_refs[offset]
+                first_ref = first_seen.setdefault(value, row_ref)
+                if first_ref != row_ref:
+                    chunk_failures.append(
+                        (
+                            offset,
+                            unique_position,
+                            _cell_ref(letter, row_ref),
+                            f"日期重复（与 {_cell_ref(letter, first_ref)} 相同）",
+                        )
+                    )
+
+        chunk_failures.sort(key=lambda failure: (failure[0], failure[1]))
+        for _, _, cell, message in chunk_failures:
+            record(cell, f"内容错误：{message}")
+
+        if total:
+            continue
+        for offset, row_ref in enumerate(row_refs):
+            yield row_ref, [column[offset] for column in normalized_columns]
+
+    if total:
+        raise ValidationErrors(errors, total)
+
+
+def validate_table(source_path: Path) -> list[list[object]]:
+    # 格式转换（Feature 1）的读取与校验：去掉第 2-4 列，逐格校验后按日期排序，返回含标题行的整张表。
+    with _open_data_sheets(source_path) as (sheets, epoch):
+        rows_iter = sheets[0][1].iter_rows(values_only=True)
+        header_values = next(rows_iter, None)
+        if not header_values:
+            raise ValueError("未找到标题行")
+
+        def _is_blank(value: object) -> bool:
+            return value is None or (isinstance(value, str) and not value.strip())
+
+        last_col = 0
+        for column_index, value in enumerate(header_values, start=1):
+            if not _is_blank(value):
+                last_col = column_index
+
+        if last_col == 0:
+            raise ValueError("标题行为空")
+
+        columns_to_keep: list[int] = [col for col in range(1, last_col + 1) if col not in (2, 3, 4)]
+        if 1 not in columns_to_keep:
+            columns_to_keep.insert(0, 1)
+
+        output_rows: list[list[object]] = []
+        row_dates: list[dt.date] = []
+
+        header_errors: list[dict[str, str]] = []
+        kept_header: list[str] = []
+        for col in columns_to_keep:
+            value = header_values[col - 1] if col - 1 < len(header_values) else None
+            coordinate = f"{_column_letter(col)}1"
+            try:
+                kept_header.append(_validate_header_cell(value))
+            except ValueError as exc:
+                header_errors.append({"cell": coordinate, "message": f"{coordinate} 标题错误：{exc}"})
+
+        output_rows.append(kept_header)
+        check_extra_headers = not header_errors
+        multi_sheet = len(sheets) > 1
+
+        parse_date = _make_date_parser(epoch)
+        validate_value = (
+            _validate_text_or_numeric_text if isinstance(sheets[0][1], _CsvSheet) else _validate_text_or_number
+        )
+
+        def non_blank_rows() -> Iterator[tuple[_RowRef, list[object]]]:
+            # 同一工作簿中标题相同的后续工作表（如按年份分表）视为同一张表继续读取。
+            for sheet_index, (sheet_name, sheet) in enumerate(sheets):
+                sheet_rows = rows_iter
+                if sheet_index:
+                    sheet_rows = sheet.iter_rows(values_only=True)
+                    extra_header = next(sheet_rows, None) or ()
+                    for col, expected in zip(columns_to_keep, kept_header):
+                        if not check_extra_headers:
+                            break
+                        coordinate = f"{sheet_name}!{_column_letter(col)}1"
+                        try:
+                            _validate_expected_header(
+                                extra_header[col - 1] if col - 1 < len(extra_header) else None, expected, coordinate
+                            )
+                        except ValueError as exc:
+                            header_errors.append({"cell": coordinate, "message": str(exc)})
+                for row_offset, row_values in enumerate(sheet_rows, start=2):
+                    values = list(row_values[:last_col])
+                    if len(values) < last_col:
+                        values.extend([None] * (last_col - len(values)))
+                    if all(_is_blank(values[col - 1]) for col in columns_to_keep):
+                        continue
+                    yield ((sheet_name, row_offset) if multi_sheet else row_offset), values
+
+        validators: list[tuple[int, Callable[[object], object]]] = [
+            (col, parse_date if position == 0 else validate_value)
+            for position, col in enumerate(columns_to_keep)
+        ]
+        try:
+            for _, normalized_row in _validate_columns(
+                non_blank_rows(),
+                validators,
+                unique_column=columns_to_keep[0],
+                max_errors=MAX_VALIDATION_ERRORS - len(header_errors),
+            ):
+                row_dates.append(normalized_row[0])  # type: ignore[arg-type]
+                normalized_row[0] = normalized_row[0].isoformat()  # type: ignore[union-attr]
+                output_rows.append(normalized_row)
+        except ValidationErrors as exc:
+            raise ValidationErrors(header_errors + exc.errors, len(header_errors) + exc.total) from None
+        if header_errors:
+            raise ValidationErrors(header_errors, len(header_errors))
+
+    if len(output_rows) <= 1:
+        raise ValueError("没有可导出的数据行")
+
+    data_rows = output_rows[1:]
+    if len(data_rows) != len(row_dates):
+        raise ValueError("内部错误：行数不一致")
+
+    sorted_data_rows = [row for _, row in sorted(zip(row_dates, data_rows), key=lambda item: item[0])]
+    return [output_rows[0], *sorted_data_rows]
+
+
+def _coerce_float(value: object, *, check_garbled: bool = True) -> float:
+    if isinstance(value, bool):
+        raise ValueError("不支持布尔类型")
+    if value is None:
+        raise ValueError("内容空白")
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            raise ValueError("数值为 NaN/Inf")
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            raise ValueError("内容空白")
+        if check_garbled and _is_garbled_text(text):
+            raise ValueError("疑似乱码/控制字符")
+        cleaned = text.replace(",", "")
+        if cleaned.endswith("%"):
+            cleaned = cleaned[:-1].strip()
+        try:
+            return float(cleaned)
+        except ValueError as exc:
+            raise ValueError(f"无法解析为数值：{text}") from exc
+    raise ValueError(f"不支持的类型：{type(value).__name__}")
+
+
+def _coerce_pe(value: object, *, check_garbled: bool = True) -> float:
+    pe = _coerce_float(value, check_garbled=check_garbled)
+    if pe <= 0:
+        raise ValueError("PE 必须为正数")
+    return pe
+
+
+# 支持 check_garbled 参数的校验函数及其乱码提示；_validate_column 对这些列改为整列批量扫描。
+_GARBLED_MESSAGES: dict[Callable[..., object], str] = {
+    _validate_text_or_number: "疑似乱码/控制字符",
+    _validate_text_or_numeric_text: "疑似乱码/控制字符",
+    _coerce_float: "疑似乱码/控制字符",
+    _coerce_pe: "疑似乱码/控制字符",
+}
+
+
+def _validate_expected_header(actual: object, expected: str, coordinate: str) -> None:
+    text = _validate_header_cell(actual)
+    if text != expected:
+        raise ValueError(f"{coordinate} 标题不匹配：期望“{expected}”，实际“{text}”")
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+from functools import partial
+import os
+import signal
+import sys
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DataProcessing 生产模式服务（waitress + 工作进程池）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口（默认 5000）")
+    parser.add_argument("--threads", type=int, default=8, help="处理 HTTP 请求的线程数（默认 8）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="计算工作进程数（默认 CPU 核数）")
+    parser.add_argument(
+        "--job-concurrency",
+        type=int,
+        default=None,
+        help="每个计算接口的并发上限（默认 workers/2，至少 1）",
+    )
+    parser.add_argument("--timeout", type=int, default=300, help="单个计算任务的执行超时秒数（默认 300）")
+    parser.add_argument("--slot-wait", type=int, default=5, help="计算接口繁忙时等待并发名额的秒数，超时返回 503（默认 5）")
+    parser.add_argument("--watch", action="store_true", help="监视 input/ 变化并在后台重算受影响的输出")
+    parser.add_argument("--shutdown-timeout", type=int, default=30, help="收到停止信号后等待在途请求完成的秒数（默认 30）")
+    args = parser.parse_args(argv)
+    for name in ("threads", "workers", "timeout", "slot_wait", "shutdown_timeout"):
+        if getattr(args, name) <= 0:
+            parser.error(f"--{name.replace('_', '-')} 必须为正整数")
+    if args.job_concurrency is not None and args.job_concurrency <= 0:
+        parser.error("--job-concurrency 必须为正整数")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+
+    # app 在导入时读取执行后端配置，因此必须先写入环境变量。
+    os.environ["DP_BACKEND"] = "process"
+    os.environ["DP_WORKERS"] = str(args.workers)
+    os.environ["DP_JOB_TIMEOUT"] = str(args.timeout)
+    os.environ["DP_SLOT_WAIT"] = str(args.slot_wait)
+    if args.job_concurrency is not None:
+        os.environ["DP_JOB_CONCURRENCY"] = str(args.job_concurrency)
+
+    try:
+        from waitress.server import create_server
+    except ImportError as exc:  # pragma: no cover - runtime dependency check
+        raise SystemExit("缺少依赖：waitress。请先安装 requirements.txt 后再运行生产模式。") from exc
+
+    import app as app_module
+    import web
+
+    server = create_server(
+        web.app,
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        channel_timeout=args.slot_wait + args.timeout + 30,
+    )
+    # 停止时不再接受新连接，在途请求最多等待 shutdown_timeout 秒。
+    server.task_dispatcher.shutdown = partial(  # type: ignore[method-assign]
+        server.task_dispatcher.shutdown, cancel_pending=False, timeout=args.shutdown_timeout
+    )
+
+    def _request_stop(signum: int, frame: object) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    if args.watch or app_module.WATCH_ENABLED:
+        app_module.start_input_watcher()
+
+    print(
+        f"DataProcessing 生产模式：http://{args.host}:{args.port} "
+        f"（threads={args.threads}, workers={args.workers}, job_concurrency={app_module.JOB_CONCURRENCY}）",
+        flush=True,
+    )
+    try:
+        server.run()
+    finally:
+        server.close()
+        app_module.stop_input_watcher()
+        app_module.shutdown_execution_backend(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import threading
+
+from flask import Flask, jsonify, request
+
+import app as core
+from dataprocessing import ValidationErrors
+
+# Web 层：Flask 应用与 HTTP 接口。计算、序列库、快照与监视都在 app 模块中，
+# 命令行与工作进程只导入 app，不加载 Flask。
+app = Flask(__name__, static_folder=str(core.DOCS_DIR), static_url_path="")
+
+_job_slots: dict[str, threading.BoundedSemaphore] = {}
+_job_slots_lock = threading.Lock()
+
+
+def _run_job(
+    job: core._Job,
+    payload: dict[str, object],
+    *,
+    failure_message: str = "生成失败",
+) -> object:
+    with _job_slots_lock:
+        slot = _job_slots.setdefault(job.__name__, threading.BoundedSemaphore(core.JOB_CONCURRENCY))
+    if not slot.acquire(timeout=core.JOB_SLOT_WAIT_SECONDS):
+        return jsonify({"error": "服务繁忙：同类计算任务过多，请稍后重试"}), 503
+    release = True
+    try:
+        result = core.EXECUTION_BACKENDS[core.EXECUTION_BACKEND](job, payload)
+        core._last_payloads[job.__name__] = payload
+        return jsonify(result)
+    except TimeoutError as exc:
+        if isinstance(exc, core._JobStillRunning):
+            # 工作进程仍在计算：名额保留到任务真正结束，后续任务不会叠加到忙碌的工作进程上。
+            exc.future.add_done_callback(lambda _: slot.release())
+            release = False
+        return jsonify({"error": f"计算超时（超过 {core.JOB_TIMEOUT_SECONDS} 秒）"}), 504
+    except core._WorkerPoolBroken as exc:
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": "1"}
+    except FileNotFoundError as exc:
+        return jsonify({"error": str(exc)}), 404
+    except ValidationErrors as exc:
+        return jsonify({"error": str(exc), "errors": exc.errors, "error_count": exc.total}), 400
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:  # pragma: no cover - surfaced to UI
+        return jsonify({"error": f"{failure_message}：{exc}"}), 500
+    finally:
+        if release:
+            slot.release()
+
+
+@app.get("/")
+def index() -> object:
+    return app.send_static_file("index.html")
+
+
+@app.get("/api/files")
+def list_files() -> object:
+    return jsonify({"files": core._input_files()})
+
+
+@app.get("/api/snapshots")
+def list_snapshots() -> object:
+    args = request.args
+    try:
+        limit = core._payload_int({"limit": args.get("limit", "50")}, "limit", min_value=1, max_value=core.SNAPSHOT_LIST_LIMIT)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    as_of = args.get("as_of") or None
+    if as_of is not None:
+        try:
+            dt.datetime.fromisoformat(as_of)
+        except ValueError:
+            return jsonify({"error": "as_of 必须为 ISO 日期或时间"}), 400
+    versions = core._snapshot_versions(
+        job=args.get("job") or None,
+        output=args.get("output") or None,
+        fingerprint=args.get("fingerprint") or None,
+        as_of=as_of,
+        limit=limit,
+    )
+    return jsonify({"versions": versions, "input_fingerprint": core._input_fingerprint()})
+
+
+@app.get("/api/snapshots/<int:version_id>/<path:name>")
+def read_snapshot(version_id: int, name: str) -> object:
+    try:
+        return jsonify(
+            core._snapshot_rows(version_id, name, start=request.args.get("start") or None, end=request.args.get("end") or None)
+        )
+    except FileNotFoundError as exc:
+        return jsonify({"error": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+@app.get("/api/watch")
+def watch_status() -> object:
+    return jsonify(core._input_watcher.status())
+
+
+@app.post("/api/watch")
+def watch_control() -> object:
+    # {"enabled": true/false} 启停监视；{"recompute": true} 立即按当前输入重算全部任务（不等待文件变化），
+    # 重算在后台线程中进行，返回 202，结果通过 GET /api/watch 的 last_run 查看。
+    payload = request.get_json(silent=True) or {}
+    try:
+        if "enabled" in payload:
+            if core._payload_bool(payload, "enabled", False):
+                core.start_input_watcher()
+            else:
+                core.stop_input_watcher()
+        if core._payload_bool(payload, "recompute", False):
+            started = core._input_watcher.request_recompute()
+            return jsonify({**core._input_watcher.status(), "recompute_started": started}), 202
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(core._input_watcher.status())
+
+
+@app.get("/api/pipeline")
+def pipeline_status() -> object:
+    tasks: dict[str, object] = {}
+    for name, task in core.PIPELINE_TASKS.items():
+        entry: dict[str, object] = {"deps": list(task.deps), "inputs": list(core._pipeline_inputs(name))}
+        if task.outputs:
+            state = core._pipeline_state(name)
+            entry["outputs"] = list(task.outputs)
+            entry["required"] = list(task.required)
+            entry["last_fingerprint"] = None if state is None else state[0]
+        tasks[name] = entry
+    return jsonify({"tasks": tasks, "threads": core.PIPELINE_THREADS})
+
+
+@app.post("/api/build")
+def build_all() -> object:
+    return _run_job(core._job_build, request.get_json(silent=True) or {})
+
+
+@app.post("/api/pipeline/rebuild")
+def rebuild_pipeline() -> object:
+    return _run_job(core._job_rebuild, request.get_json(silent=True) or {})
+
+
+@app.post("/api/convert")
+def convert_file() -> object:
+    payload = request.get_json(silent=True) or {}
+    try:
+        safe_name = core._checked_input_name(payload.get("filename"))
+    except FileNotFoundError as exc:
+        return jsonify({"error": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    job_payload = {"filename": safe_name, "output_formats": payload.get("output_formats")}
+    if "force" in payload:
+        job_payload["force"] = payload["force"]
+    return _run_job(core._job_convert, job_payload, failure_message="转换失败")
+
+
+@app.post("/api/erp")
+def generate_erp() -> object:
+    return _run_job(core._job_erp, request.get_json(silent=True) or {})
+
+
+@app.post("/api/erp10y")
+def generate_erp_10year() -> object:
+    return _run_job(core._job_erp_10year, request.get_json(silent=True) or {})
+
+
+@app.post("/api/erprolling")
+def generate_erp_rolling() -> object:
+    return _run_job(core._job_erp_rolling, request.get_json(silent=True) or {})
+
+
+@app.post("/api/erpinterval")
+def generate_erp_interval() -> object:
+    return _run_job(core._job_erp_interval, request.get_json(silent=True) or {})
+
+
+@app.post("/api/indices")
+def generate_indices() -> object:
+    return _run_job(core._job_indices, request.get_json(silent=True) or {})
+
+
+@app.post("/api/thermometer/clean")
+def generate_thermometer_clean() -> object:
+    return _run_job(core._job_thermometer_clean, request.get_json(silent=True) or {})
+
+
+@app.post("/api/thermometer/percentiles")
+def generate_thermometer_percentiles() -> object:
+    return _run_job(core._job_thermometer_percentiles, request.get_json(silent=True) or {})
+
+
+@app.post("/api/thermometer/merge")
+def generate_thermometer_merge() -> object:
+    return _run_job(core._job_thermometer_merge, request.get_json(silent=True) or {})
+
+
+@app.post("/api/thermometer/scenarios")
+def generate_thermometer_scenarios() -> object:
+    return _run_job(core._job_thermometer_scenarios, request.get_json(silent=True) or {})
+
+
+@app.post("/api/backtest")
+def generate_backtest() -> object:
+    return _run_job(core._job_backtest, request.get_json(silent=True) or {})
+
+
+def run_dev_server() -> None:
+    debug = os.environ.get("DP_DEBUG") == "1"
+    if core.WATCH_ENABLED:
+        core.start_input_watcher()
+    app.run(host="127.0.0.1", port=5000, debug=debug, use_reloader=False)
+
+
+if __name__ == "__main__":
+    run_dev_server()
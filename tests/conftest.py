@@ -0,0 +1,8 @@
+import os
+from pathlib import Path
+import sys
+
+# 测试不写仓库下的 snapshots/ 与 store/；进程池的工作进程同样继承这些环境变量与 sys.path。
+os.environ.setdefault("DP_SNAPSHOTS", "0")
+os.environ.setdefault("DP_SERIES_STORE", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import app
+import web
+
+
+# 进程池按引用传递任务函数：定义在模块顶层，工作进程按模块名导入。
+def _job_crash(payload: dict[str, object]) -> dict[str, object]:
+    os._exit(1)
+
+
+def _job_echo(payload: dict[str, object]) -> dict[str, object]:
+    return {"pid": os.getpid(), **payload}
+
+
+@pytest.fixture
+def process_backend(monkeypatch: pytest.MonkeyPatch, tmp_path: object) -> object:
+    monkeypatch.setattr(app, "EXECUTION_BACKEND", "process")
+    monkeypatch.setattr(app, "EXECUTION_WORKERS", 1)
+    monkeypatch.setattr(app, "OUTPUT_DIR", tmp_path)
+    app.shutdown_execution_backend()
+    yield
+    app.shutdown_execution_backend()
+
+
+def test_broken_pool_is_discarded_and_rebuilt(process_backend: object) -> None:
+    first = app._run_in_process_pool(_job_echo, {"value": 1})
+    broken = app._process_pool
+    assert broken is not None
+
+    with pytest.raises(app._WorkerPoolBroken):
+        app._run_in_process_pool(_job_crash, {})
+    assert app._process_pool is None
+
+    second = app._run_in_process_pool(_job_echo, {"value": 2})
+    assert second["value"] == 2
+    assert second["pid"] != first["pid"]
+    assert app._process_pool is not None and app._process_pool is not broken
+
+
+def test_worker_crash_returns_retryable_503(process_backend: object) -> None:
+    with web.app.test_request_context():
+        response = web.app.make_response(web._run_job(_job_crash, {}))
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert "请重试" in response.get_json()["error"]
+
+        retried = web.app.make_response(web._run_job(_job_echo, {"value": 3}))
+        assert retried.status_code == 200
+        assert retried.get_json()["value"] == 3
@@ -0,0 +1,76 @@
+import datetime as dt
+
+import pytest
+
+from dataprocessing.io import _WINDOWS_EPOCH, _make_date_parser, _parse_date
+
+# Mac 版 Excel 的 1904 日期系统（同 openpyxl.utils.datetime.CALENDAR_MAC_1904）。
+_MAC_EPOCH = dt.datetime(1904, 1, 1)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2020-01-02",
+        "2020/01/02",
+        "2020.01.02",
+        "20200102",
+        "2020-01-02 15:30:00",
+        "2020/01/02 15:30:00",
+        " 2020-01-02 ",
+        dt.date(2020, 1, 2),
+        dt.datetime(2020, 1, 2, 15, 30),
+        43832,
+        43832.75,
+    ],
+)
+def test_parse_date_accepts_supported_forms(value: object) -> None:
+    assert _parse_date(value, epoch=_WINDOWS_EPOCH) == dt.date(2020, 1, 2)
+
+
+def test_parse_date_uses_workbook_epoch_for_serials() -> None:
+    assert _parse_date(42370, epoch=_MAC_EPOCH) == dt.date(2020, 1, 2)
+
+
+@pytest.mark.parametrize(
+    ("value", "message"),
+    [
+        (True, "布尔类型不是有效日期"),
+        (float("nan"), "NaN/Inf"),
+        ("   ", "日期为空白"),
+        ("2020-02-30", "无法解析日期：2020-02-30"),
+        ("next monday", "无法解析日期"),
+        (None, "不支持的日期类型：NoneType"),
+    ],
+)
+def test_parse_date_rejects_invalid_values(value: object, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        _parse_date(value, epoch=_WINDOWS_EPOCH)
+
+
+def test_date_parser_matches_parse_date() -> None:
+    values = ["2020-01-02", "2020-01-03", 43834, dt.datetime(2020, 1, 6, 9), dt.date(2020, 1, 7), " 2020-01-08"]
+    parse = _make_date_parser(_WINDOWS_EPOCH)
+    assert [parse(value) for value in values] == [_parse_date(value, epoch=_WINDOWS_EPOCH) for value in values]
+
+
+def test_date_parser_falls_back_when_format_changes() -> None:
+    # 按首个文本单元格识别的快路径不匹配时走完整的格式级联，而不是报错或误解析。
+    parse = _make_date_parser(_WINDOWS_EPOCH)
+    assert parse("2020-01-02") == dt.date(2020, 1, 2)
+    assert parse("2020/01/03") == dt.date(2020, 1, 3)
+    assert parse("20200106") == dt.date(2020, 1, 6)
+
+
+def test_date_parser_rejects_invalid_dates_on_fast_path() -> None:
+    parse = _make_date_parser(_WINDOWS_EPOCH)
+    assert parse("2020-01-02") == dt.date(2020, 1, 2)
+    with pytest.raises(ValueError, match="无法解析日期：2020-02-30"):
+        parse("2020-02-30")
+
+
+def test_date_parser_caches_serials_per_epoch() -> None:
+    windows = _make_date_parser(_WINDOWS_EPOCH)
+    mac = _make_date_parser(_MAC_EPOCH)
+    assert windows(43832) == windows(43832) == dt.date(2020, 1, 2)
+    assert mac(43832) == dt.date(2024, 1, 3)
@@ -0,0 +1,62 @@
+from bisect import bisect_left, bisect_right, insort
+import random
+
+import pytest
+
+from dataprocessing import exact_fallback_reason, percentile_error_bounds, rolling_percentiles
+from dataprocessing.rolling import _SlidingQuantileSketch, _sketch_parameters
+
+
+def _series(length: int, seed: int) -> list[float]:
+    # 随机游走并保留一位小数：含重复值，覆盖并列排名。
+    rng = random.Random(seed)
+    value = 0.0
+    out: list[float] = []
+    for _ in range(length):
+        value += rng.gauss(0.0, 1.0)
+        out.append(round(value, 1))
+    return out
+
+
+@pytest.mark.parametrize(("window", "max_error"), [(600, 5.0), (1500, 2.0)])
+def test_approximate_percentiles_stay_within_reported_bound(window: int, max_error: float) -> None:
+    assert _sketch_parameters(window, max_error) is not None
+    values = _series(4 * window, seed=window)
+    exact = rolling_percentiles(values, window)
+    approx = rolling_percentiles(values, window, max_error=max_error)
+    bound = percentile_error_bounds(max_error, window=window)["window"]
+    assert 0 < bound <= max_error
+    assert [value is None for value in approx] == [value is None for value in exact]
+    worst = max(abs(a - e) for a, e in zip(approx, exact) if a is not None and e is not None)  # type: ignore[operator]
+    assert worst <= bound + 1e-9
+
+
+@pytest.mark.parametrize(("window", "max_error"), [(600, 5.0), (1500, 2.0)])
+def test_sketch_median_rank_stays_within_rank_error(window: int, max_error: float) -> None:
+    values = _series(3 * window, seed=window + 1)
+    sketch = _SlidingQuantileSketch(window, max_error)
+    sorted_window: list[float] = []
+    for index, value in enumerate(values):
+        sketch.add(value)
+        insort(sorted_window, value)
+        if index >= window:
+            sorted_window.pop(bisect_left(sorted_window, values[index - window]))
+        if index < window - 1:
+            continue
+        median = sketch.quantile(0.5)
+        low, high = bisect_left(sorted_window, median), bisect_right(sorted_window, median)
+        target = window / 2.0
+        deviation = 0.0 if low <= target <= high else min(abs(low - target), abs(high - target))
+        assert deviation <= sketch.rank_error + 1e-9
+    # 摘要只保留窗口的一部分值，否则近似模式没有意义。
+    assert sketch.stored_values < window
+
+
+def test_short_windows_fall_back_to_exact() -> None:
+    values = _series(400, seed=7)
+    assert _sketch_parameters(100, 1.0) is None
+    assert rolling_percentiles(values, 100, max_error=1.0) == rolling_percentiles(values, 100)
+    assert percentile_error_bounds(1.0, window=100) == {"window": 0.0}
+    reason = exact_fallback_reason(1.0, [100, 6000])
+    assert reason is not None and "100" in reason and "6000" not in reason
+    assert exact_fallback_reason(1.0, [6000]) is None
@@ -0,0 +1,51 @@
+import pytest
+
+import app
+import web
+
+_WEIGHTS = {name: 25 for name in app.THERMOMETER_WEIGHTS.values()}
+
+
+def _windows(value: object) -> dict[str, object]:
+    return {name: value for ma_name, rp_name, _ in app.THERMOMETER_FACTORS.values() for name in (ma_name, rp_name)}
+
+
+@pytest.fixture(autouse=True)
+def _no_series(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 组合数在读取任何序列之前校验；超限的请求不应走到这里。
+    def fail(*args: object, **kwargs: object) -> object:
+        raise AssertionError("超限的请求不应读取序列")
+
+    monkeypatch.setattr(app, "_thermometer_factor_series", fail)
+    monkeypatch.setattr(app, "_load_erp_series", fail)
+
+
+def test_window_grid_limit_is_checked_from_grid_lengths() -> None:
+    # 每个窗口参数取满全部取值：组合数约 10^28，只能由各网格长度算出，不能展开。
+    payload = {
+        name: {"start": 1, "stop": max_value, "step": 1}
+        for ma_name, rp_name, max_value in app.THERMOMETER_FACTORS.values()
+        for name in (ma_name, rp_name)
+    }
+    with pytest.raises(ValueError, match=f"窗口组合已有 {1000**2 * 4000**6} 个（上限 {app.SCENARIO_MAX_COMBINATIONS}）"):
+        app._job_thermometer_scenarios({**payload, **_WEIGHTS})
+
+
+def test_weight_candidate_limit() -> None:
+    weights = {name: {"start": 0, "stop": 100, "step": 1} for name in app.THERMOMETER_WEIGHTS.values()}
+    with pytest.raises(ValueError, match=f"权重取值组合过多：{101**4}"):
+        app._job_thermometer_scenarios({**_windows(5), **weights})
+
+
+def test_total_limit_counts_only_weight_combos_within_100() -> None:
+    # 每个权重 0-95 步长 5：20^4 个候选中权重之和不超过 100% 的有 10622 个。
+    weights = {name: {"start": 0, "stop": 95, "step": 5} for name in app.THERMOMETER_WEIGHTS.values()}
+    with pytest.raises(ValueError, match=f"组合数过多：10622（上限 {app.SCENARIO_MAX_COMBINATIONS}）"):
+        app._job_thermometer_scenarios({**_windows(5), **weights})
+
+
+def test_oversized_grid_is_rejected_with_400() -> None:
+    payload = {**_windows([5, 10, 20, 30, 40]), **_WEIGHTS}
+    response = web.app.test_client().post("/api/thermometer/scenarios", json=payload)
+    assert response.status_code == 400
+    assert "组合数过多" in response.get_json()["error"]
@@ -0,0 +1,69 @@
+import datetime as dt
+
+import pytest
+
+from dataprocessing import validation
+from dataprocessing.io import _WINDOWS_EPOCH, _make_date_parser
+from dataprocessing.validation import ValidationErrors, _coerce_float, _validate_columns
+
+
+def _validate(rows: list[tuple[object, tuple[object, ...]]], **options: object) -> list[tuple[object, list[object]]]:
+    columns = [(1, _make_date_parser(_WINDOWS_EPOCH)), (3, _coerce_float)]
+    return list(_validate_columns(iter(rows), columns, unique_column=1, **options))  # type: ignore[arg-type]
+
+
+def test_valid_rows_are_normalized() -> None:
+    rows = [(2, ("2020-01-02", "skip", "1.5")), (3, (43833, None, 2))]
+    assert _validate(rows) == [(2, [dt.date(2020, 1, 2), 1.5]), (3, [dt.date(2020, 1, 3), 2.0])]
+
+
+def test_all_errors_are_collected_in_row_order() -> None:
+    rows = [
+        (2, ("2020-01-02", None, 1.5)),
+        (3, ("bad", None, "x")),
+        (4, ("2020-01-02", None, 2.0)),
+        (5, (None, None, None)),
+    ]
+    with pytest.raises(ValidationErrors) as info:
+        _validate(rows, prefix="data_bond ")
+    assert info.value.total == 5
+    assert [error["cell"] for error in info.value.errors] == ["A3", "C3", "A4", "A5", "C5"]
+    assert info.value.errors[0]["message"] == "data_bond A3 内容错误：无法解析日期：bad"
+    assert info.value.errors[2]["message"] == "data_bond A4 内容错误：日期重复（与 A2 相同）"
+    assert str(info.value).startswith("共发现 5 处数据错误：\n")
+
+
+def test_single_error_message_is_the_cell_message() -> None:
+    with pytest.raises(ValidationErrors) as info:
+        _validate([(2, ("2020-01-02", None, "x"))])
+    assert str(info.value) == "C2 内容错误：无法解析为数值：x"
+
+
+def test_error_list_is_capped_but_total_is_exact() -> None:
+    rows = [(row, ("bad", None, "x")) for row in range(2, 12)]
+    with pytest.raises(ValidationErrors) as info:
+        _validate(rows, max_errors=3)
+    assert info.value.total == 20
+    assert len(info.value.errors) == 3
+    assert str(info.value).endswith("……其余 17 处未列出")
+
+
+def test_multi_sheet_rows_use_sheet_qualified_refs() -> None:
+    rows = [
+        (("2019", 2), ("2019-12-31", None, 1.0)),
+        (("2020", 2), ("2019-12-31", None, 2.0)),
+        (("2020", 3), ("oops", None, "")),
+    ]
+    with pytest.raises(ValidationErrors) as info:
+        _validate(rows)
+    assert [error["cell"] for error in info.value.errors] == ["2020!A2", "2020!A3", "2020!C3"]
+    assert info.value.errors[0]["message"] == "2020!A2 内容错误：日期重复（与 2019!A2 相同）"
+
+
+def test_duplicates_are_found_across_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    # 逐块转置校验时，重复日期的检查跨越块边界。
+    monkeypatch.setattr(validation, "VALIDATION_CHUNK_ROWS", 2)
+    rows = [(row, (date, None, 1.0)) for row, date in enumerate(["2020-01-02", "2020-01-03", "2020-01-04", "2020-01-02"], start=2)]
+    with pytest.raises(ValidationErrors) as info:
+        _validate(rows)
+    assert info.value.errors == [{"cell": "A5", "message": "A5 内容错误：日期重复（与 A2 相同）"}]